@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Compare tail latency with and without hedging against a heavy-tailed stub."""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import threading
+import time
+from typing import Callable, List, Sequence, Tuple
+
+try:
+    from .concurrency import percentile
+    from .hedging import Hedger
+except ImportError:  # pragma: no cover
+    from concurrency import percentile
+    from hedging import Hedger
+
+
+def pareto_stub(scale: float, alpha: float, seed: int) -> Callable[[str], Tuple[str, None]]:
+    """Return a fake API call whose latency is ``scale * Pareto(alpha)`` seconds."""
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def call(prompt: str) -> Tuple[str, None]:
+        with lock:
+            delay = scale * rng.paretovariate(alpha)
+        time.sleep(min(delay, 5.0))
+        return prompt, None
+
+    return call
+
+
+def run(call: Callable[[str], Tuple[str, None]], n: int) -> List[float]:
+    latencies = []
+    for i in range(n):
+        start = time.monotonic()
+        call(f"p{i}")
+        latencies.append(time.monotonic() - start)
+    return latencies
+
+
+def summary(name: str, latencies: Sequence[float]) -> str:
+    lat = list(latencies)
+    return (
+        f"{name:<10} p50 {percentile(lat, 50) * 1000:7.1f} ms  "
+        f"p99 {percentile(lat, 99) * 1000:7.1f} ms  "
+        f"total {sum(lat):6.2f} s"
+    )
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--scale", type=float, default=0.005, help="Minimum stub latency in seconds")
+    parser.add_argument("--alpha", type=float, default=1.2, help="Pareto shape (lower = heavier tail)")
+    parser.add_argument("--percentile", type=float, default=95.0)
+    parser.add_argument("--budget", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    baseline = run(pareto_stub(args.scale, args.alpha, args.seed), args.requests)
+    hedger = Hedger(
+        pareto_stub(args.scale, args.alpha, args.seed),
+        percentile=args.percentile,
+        budget=args.budget,
+    )
+    try:
+        hedged = run(hedger.call, args.requests)
+    finally:
+        hedger.close()
+
+    print(summary("baseline", baseline))
+    print(summary("hedged", hedged))
+    m = hedger.metrics()
+    print(
+        f"hedges {m['hedges']} / {m['requests']} requests "
+        f"({m['hedges'] / m['requests']:.1%}, budget {args.budget:.0%}), "
+        f"hedge wins {m['hedge_wins']}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Measure cold-start time of the lightweight CLI commands with ``-X importtime``."""
+
+from __future__ import annotations
+
+import argparse
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+CLI = ROOT / "scripts" / "encyclopedia.py"
+HEAVY_MODULES = ("pandas", "openai", "toml", "dotenv", "numpy", "weasyprint", "pypdf")
+LIGHT_COMMANDS: List[List[str]] = [
+    ["--help"],
+    ["generate", "--help"],
+    ["compile", "--dry-run", "--quiet"],
+    ["validate", "--quiet"],
+]
+BUDGET_MS = 100.0
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def wall_time(args: Sequence[str]) -> float:
+    """Run the CLI once and return its wall time in milliseconds."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, str(CLI), *args], capture_output=True, cwd=ROOT)
+    return (time.perf_counter() - start) * 1000
+
+
+def import_profile(args: Sequence[str]) -> Dict[str, Tuple[int, bool]]:
+    """Return ``module -> (cumulative us, is_top_level)`` from ``-X importtime``."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", str(CLI), *args],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+    )
+    modules: Dict[str, Tuple[int, bool]] = {}
+    for line in proc.stderr.splitlines():
+        m = IMPORTTIME_RE.match(line)
+        if m:
+            modules[m.group(4)] = (int(m.group(2)), len(m.group(3)) == 1)
+    return modules
+
+
+def heavy_imports(modules: Dict[str, Tuple[int, bool]]) -> List[str]:
+    return sorted(
+        name for name in modules if name.split(".")[0] in HEAVY_MODULES
+    )
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="Runs per command (best is reported)")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="Fail if a command exceeds this")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for command in LIGHT_COMMANDS:
+        best_wall = min(wall_time(command) for _ in range(args.runs))
+        modules = import_profile(command)
+        heavy = heavy_imports(modules)
+        imports_ms = sum(us for us, top in modules.values() if top) / 1000
+        ok = best_wall <= args.budget_ms and not heavy
+        failed |= not ok
+        print(
+            f"{'ok  ' if ok else 'FAIL'} encyclopedia {' '.join(command):<28} "
+            f"wall {best_wall:6.1f} ms, imports {imports_ms:6.1f} ms"
+            + (f", heavy: {', '.join(heavy)}" if heavy else "")
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""Pre-flight token, cost and wall-time projections and budget-bounded runs."""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .registry import TemplateRegistry
+except ImportError:  # pragma: no cover
+    from registry import TemplateRegistry
+
+#: output tokens assumed for a prompt type with no history and no max_tokens
+DEFAULT_OUTPUT_TOKENS = 1024
+#: generation speed assumed for a prompt type with no latency history
+DEFAULT_TOKENS_PER_SECOND = 50.0
+#: heuristic used when tiktoken is not installed
+CHARS_PER_TOKEN = 4
+#: tokens added by the chat format around a single user message
+MESSAGE_OVERHEAD = 7
+
+_ENCODERS: Dict[str, object] = {}
+
+
+def _encoder(model: str) -> object:
+    """tiktoken encoding for *model*, or ``None`` if tiktoken is unavailable."""
+    if model not in _ENCODERS:
+        try:
+            import tiktoken
+        except ImportError:
+            _ENCODERS[model] = None
+        else:
+            try:
+                _ENCODERS[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _ENCODERS[model] = tiktoken.get_encoding("o200k_base")
+            except Exception:  # encodings are downloaded on first use
+                _ENCODERS[model] = None
+    return _ENCODERS[model]
+
+
+def tokenizer_name(model: str) -> str:
+    return "tiktoken" if _encoder(model) is not None else "heuristic"
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Prompt tokens of *text* for *model*, with tiktoken or ~4 chars a token."""
+    encoder = _encoder(model)
+    if encoder is None:
+        tokens = -(-len(text) // CHARS_PER_TOKEN)
+    else:
+        tokens = len(encoder.encode(text, disallowed_special=()))  # type: ignore[attr-defined]
+    return tokens + MESSAGE_OVERHEAD
+
+
+@dataclass
+class RowEstimate:
+    """Projected usage of one API call."""
+
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    cost: Optional[float]
+    seconds: float
+
+    @property
+    def tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+def estimate_prompt(
+    prompt: str,
+    prompt_type: str,
+    registry: TemplateRegistry,
+    stats: Dict[str, dict],
+    default_model: str,
+) -> RowEstimate:
+    """Project one call from its prompt and the history of its prompt type.
+
+    Output length and latency are the medians recorded for the prompt type
+    (see :meth:`history.RunHistory.prompt_type_stats`). Without history the
+    tier's ``max_tokens`` (or :data:`DEFAULT_OUTPUT_TOKENS`) is assumed.
+    The first model of the tier's cascade is priced.
+    """
+    tier = registry.tier(prompt_type)
+    model = tier.models[0] if tier and tier.models else default_model
+    seen = stats.get(prompt_type, {})
+    completion = seen.get("completion_tokens")
+    if completion is None:
+        completion = tier.max_tokens if tier and tier.max_tokens else DEFAULT_OUTPUT_TOKENS
+    completion = int(round(completion))
+    prompt_tokens = count_tokens(prompt, model)
+    seconds = seen.get("latency")
+    if seconds is None:
+        seconds = completion / DEFAULT_TOKENS_PER_SECOND
+    return RowEstimate(
+        model=model,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion,
+        cost=registry.cost(model, prompt_tokens, completion),
+        seconds=float(seconds),
+    )
+
+
+def project(
+    planned: Iterable[dict],
+    registry: TemplateRegistry,
+    stats: Dict[str, dict],
+    *,
+    default_model: str,
+    workers: int = 1,
+) -> Tuple[dict, Dict[str, RowEstimate]]:
+    """Project tokens, cost and wall time of *planned* rows.
+
+    Identical prompts are coalesced into one call, as during the run.
+    Returns the totals and the estimate for each distinct prompt.
+    """
+    estimates: Dict[str, RowEstimate] = {}
+    rows = 0
+    for item in planned:
+        if item["duplicate"]:
+            continue
+        rows += 1
+        if item["prompt"] not in estimates:
+            estimates[item["prompt"]] = estimate_prompt(
+                item["prompt"], item["row"]["prompt_type"], registry, stats, default_model
+            )
+    calls = list(estimates.values())
+    costs = [e.cost for e in calls if e.cost is not None]
+    busy = sum(e.seconds for e in calls)
+    summary = {
+        "rows": rows,
+        "calls": len(calls),
+        "prompt_tokens": sum(e.prompt_tokens for e in calls),
+        "completion_tokens": sum(e.completion_tokens for e in calls),
+        "cost": round(sum(costs), 4) if costs else None,
+        "unpriced_calls": len(calls) - len(costs),
+        "seconds": round(max(busy / max(workers, 1), max((e.seconds for e in calls), default=0.0)), 1),
+        "workers": workers,
+        "tokenizer": tokenizer_name(default_model),
+        "history": sorted(stats),
+    }
+    return summary, estimates
+
+
+def format_projection(summary: dict) -> str:
+    minutes, seconds = divmod(int(summary["seconds"]), 60)
+    cost = f"${summary['cost']:.4f}" if summary["cost"] is not None else "unknown cost"
+    if summary["unpriced_calls"] and summary["cost"] is not None:
+        cost += f" (+{summary['unpriced_calls']} unpriced calls)"
+    history = ", ".join(summary["history"]) or "none"
+    return (
+        f"Projected: {summary['calls']} calls for {summary['rows']} rows, "
+        f"{summary['prompt_tokens']:,} prompt + {summary['completion_tokens']:,} completion tokens, "
+        f"{cost}, ~{minutes}m{seconds:02d}s at {summary['workers']} in flight "
+        f"(tokenizer: {summary['tokenizer']}; output history: {history})"
+    )
+
+
+def attempts_usage(attempts: List[dict]) -> Tuple[Optional[int], Optional[float]]:
+    """Tokens and cost actually recorded for a row's model attempts."""
+    tokens = [
+        (a.get("prompt_tokens") or 0) + (a.get("completion_tokens") or 0)
+        for a in attempts
+        if a.get("prompt_tokens") is not None or a.get("completion_tokens") is not None
+    ]
+    costs = [a["cost"] for a in attempts if a.get("cost") is not None]
+    return (sum(tokens) if tokens else None), (sum(costs) if costs else None)
+
+
+class BudgetExhausted(Exception):
+    """Raised instead of making a call that :class:`Budget` did not admit."""
+
+
+class Budget:
+    """Admit calls while their projected spend fits under a cost or token limit.
+
+    Each admitted call reserves its estimate; when it finishes the
+    reservation is replaced by what it actually used (or kept, if the call
+    reported no usage). The first call that would overrun a limit exhausts
+    the budget: no later call is admitted, while calls already running
+    finish normally.
+    """
+
+    def __init__(self, *, max_cost: Optional[float] = None, max_tokens: Optional[int] = None) -> None:
+        self.max_cost = max_cost
+        self.max_tokens = max_tokens
+        self.cost = 0.0
+        self.tokens = 0
+        self.admitted = 0
+        self.refused = 0
+        self.exhausted = False
+        self._lock = threading.Lock()
+
+    def admit(self, estimate: RowEstimate) -> bool:
+        with self._lock:
+            cost = estimate.cost or 0.0
+            over = (self.max_cost is not None and self.cost + cost > self.max_cost) or (
+                self.max_tokens is not None and self.tokens + estimate.tokens > self.max_tokens
+            )
+            if self.exhausted or over:
+                self.exhausted = True
+                self.refused += 1
+                return False
+            self.cost += cost
+            self.tokens += estimate.tokens
+            self.admitted += 1
+            return True
+
+    def settle(self, estimate: RowEstimate, tokens: Optional[int], cost: Optional[float]) -> None:
+        with self._lock:
+            if tokens is not None:
+                self.tokens += tokens - estimate.tokens
+            if cost is not None:
+                self.cost += cost - (estimate.cost or 0.0)
+
+    def metrics(self) -> dict:
+        return {
+            "max_cost": self.max_cost,
+            "max_tokens": self.max_tokens,
+            "cost": round(self.cost, 6),
+            "tokens": self.tokens,
+            "admitted": self.admitted,
+            "refused": self.refused,
+            "exhausted": self.exhausted,
+        }
@@ -1,20 +1,37 @@
 import argparse
-import subprocess
 import sys
-from pathlib import Path
+import traceback
+from typing import Callable, Sequence
 
-ROOT = Path(__file__).resolve().parent
 
+def run_step(step: Callable[[], int]) -> int:
+    """Run a pipeline step in this interpreter, reporting crashes as failures."""
+    try:
+        return step()
+    except Exception:
+        traceback.print_exc()
+        return 1
 
-def run_step(script: str) -> int:
-    """Run a script using the current Python executable."""
-    result = subprocess.run([sys.executable, str(ROOT / script)])
-    return result.returncode
 
+def run_generate() -> int:
+    try:
+        from . import generate
+    except ImportError:  # pragma: no cover
+        import generate
+    return generate.cli([])
 
-def main() -> int:
+
+def run_compile() -> int:
+    try:
+        from . import compile_pdf
+    except ImportError:  # pragma: no cover
+        import compile_pdf
+    return compile_pdf.main([])
+
+
+def main(argv: Sequence[str] | None = None, prog: str | None = None) -> int:
     parser = argparse.ArgumentParser(
-        description="Run generation then compilation"
+        prog=prog, description="Run generation then compilation"
     )
     group = parser.add_mutually_exclusive_group()
     group.add_argument(
@@ -27,18 +44,17 @@ def main() -> int:
         action="store_true",
         help="Run only the compilation step",
     )
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     if args.generate_only:
-        return run_step("generate.py")
+        return run_step(run_generate)
     if args.compile_only:
-        return run_step("compile_pdf.py")
+        return run_step(run_compile)
 
-    gen_rc = run_step("generate.py")
-    comp_rc = run_step("compile_pdf.py")
+    gen_rc = run_step(run_generate)
+    comp_rc = run_step(run_compile)
     return gen_rc or comp_rc
 
 
 if __name__ == "__main__":
     sys.exit(main())
-
@@ -0,0 +1,100 @@
+"""Snapshot the topic catalogue and diff it against the previous run."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+SNAPSHOT_VERSION = 1
+
+
+def entry_hash(prompt_type: str, prompt: str) -> str:
+    """Content hash of a row: its prompt type and fully rendered prompt."""
+    digest = hashlib.sha256(f"{prompt_type}\0{prompt}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def build_snapshot(planned: Iterable[dict]) -> Dict[str, dict]:
+    """Map each planned output (by file stem) to its row identity and hash."""
+    snapshot: Dict[str, dict] = {}
+    for item in planned:
+        if item["duplicate"]:
+            continue
+        row = item["row"]
+        snapshot[item["filename"].stem] = {
+            "id": str(row.get("id", "")),
+            "domain": row["domain"],
+            "topic": row["topic"],
+            "subtopic": row["subtopic"],
+            "prompt_type": row["prompt_type"],
+            "hash": entry_hash(row["prompt_type"], item["prompt"]),
+        }
+    return snapshot
+
+
+def load_snapshot(path: Path) -> Optional[Dict[str, dict]]:
+    """Return the saved snapshot, or ``None`` if there is none."""
+    if not path.exists():
+        return None
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if data.get("version") != SNAPSHOT_VERSION:
+        return None
+    return data["entries"]
+
+
+def save_snapshot(path: Path, snapshot: Dict[str, dict]) -> None:
+    """Atomically write *snapshot* to *path*."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(
+        json.dumps({"version": SNAPSHOT_VERSION, "entries": snapshot}, indent=1, sort_keys=True),
+        encoding="utf-8",
+    )
+    os.replace(tmp, path)
+
+
+def diff_snapshots(
+    previous: Optional[Dict[str, dict]],
+    current: Dict[str, dict],
+    output_dir: Path,
+    suffix: str = ".tex",
+) -> Dict[str, List[str]]:
+    """Classify entries of *current* against *previous*.
+
+    Returns sorted key lists for ``added``, ``changed`` (hash differs),
+    ``missing`` (unchanged but the output file is gone), ``unchanged`` and
+    ``removed`` (in *previous* only). Without a previous snapshot, entries
+    whose output already exists are adopted as unchanged.
+    """
+    diff: Dict[str, List[str]] = {
+        "added": [], "changed": [], "missing": [], "unchanged": [], "removed": []
+    }
+    for key, entry in current.items():
+        exists = (output_dir / f"{key}{suffix}").exists()
+        if previous is None:
+            diff["unchanged" if exists else "added"].append(key)
+        elif key not in previous:
+            diff["added"].append(key)
+        elif previous[key]["hash"] != entry["hash"]:
+            diff["changed"].append(key)
+        elif not exists:
+            diff["missing"].append(key)
+        else:
+            diff["unchanged"].append(key)
+    if previous is not None:
+        diff["removed"] = [key for key in previous if key not in current]
+    return {name: sorted(keys) for name, keys in diff.items()}
+
+
+def remove_orphans(keys: Iterable[str], output_dir: Path, suffix: str = ".tex") -> List[Path]:
+    """Delete the outputs of removed entries; return the paths deleted."""
+    removed = []
+    for key in keys:
+        path = output_dir / f"{key}{suffix}"
+        if path.exists():
+            path.unlink()
+            removed.append(path)
+    return removed
@@ -0,0 +1,59 @@
+"""Coalesce identical prompts so each is only sent to the API once per run."""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Generic, Iterable, TypeVar
+
+T = TypeVar("T")
+
+
+class PromptCoalescer(Generic[T]):
+    """Share one in-flight call and its response between identical prompts.
+
+    The first caller for a prompt runs ``fn``; concurrent or later callers
+    with the same prompt wait on the same future instead of issuing another
+    request. Safe to use from multiple threads.
+    """
+
+    def __init__(self, fn: Callable[..., T]) -> None:
+        self._fn = fn
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+        self.calls = 0
+        self.hits = 0
+
+    def get(self, prompt: str, *args: Any) -> T:
+        """Return the response for *prompt*, calling ``fn`` at most once.
+
+        Extra *args* are passed to ``fn`` by whichever caller ends up making
+        the call and are ignored for callers that join an in-flight one.
+        """
+        with self._lock:
+            future = self._futures.get(prompt)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._futures[prompt] = future
+                self.calls += 1
+            else:
+                self.hits += 1
+        if owner:
+            try:
+                future.set_result(self._fn(prompt, *args))
+            except BaseException as e:
+                future.set_exception(e)
+        return future.result()
+
+
+def dedupe_report(prompts: Iterable[str]) -> Dict[str, int]:
+    """Summarise how many API calls coalescing saves for *prompts*."""
+    planned = unique = 0
+    seen = set()
+    for prompt in prompts:
+        planned += 1
+        if prompt not in seen:
+            seen.add(prompt)
+            unique += 1
+    return {"planned": planned, "unique": unique, "saved": planned - unique}
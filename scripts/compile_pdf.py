@@ -1,22 +1,46 @@
-"""Compile LaTeX files in the output directory into PDFs."""
+"""Compile generated entries in the output directory into PDFs."""
 
 from __future__ import annotations
 
 import argparse
+import json
+import re
 import subprocess
+import time
+from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Tuple
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 try:
+    from .concurrency import error_class
+    from .history import HISTORY_NAME, RunHistory
     from .logger import get_logger
+    from .profiling import StageProfiler
+    from .texlog import LogReport, parse_log_file
 except ImportError:  # pragma: no cover
+    from concurrency import error_class
+    from history import HISTORY_NAME, RunHistory
     from logger import get_logger
+    from profiling import StageProfiler
+    from texlog import LogReport, parse_log_file
 
 ROOT = Path(__file__).resolve().parent.parent
 OUTPUT_DIR = ROOT / "output"
 PDF_OUTPUT_DIR = ROOT / "pdf_output"
 LOG_DIR = ROOT / "logs"
 LOG_FILE = LOG_DIR / "compile_log.txt"
+DIAGNOSTICS_FILE = LOG_DIR / "compile_diagnostics.jsonl"
+MAX_PASSES = 2
+WEASYPRINT_CSS = """
+@page { size: A4; margin: 2.5cm; }
+body { font-family: serif; font-size: 11pt; line-height: 1.4; }
+h1, h2, h3 { font-weight: bold; page-break-after: avoid; }
+code { font-family: monospace; }
+"""
+# Display math, or more inline ``$...$`` than this, goes to pdflatex.
+HEAVY_MATH_RE = re.compile(r"\$\$|\\\[|\\begin\{(?:equation|align|gather|multline)")
+INLINE_MATH_RE = re.compile(r"(?<![\\$])\$(?!\$)[^$]+?(?<!\\)\$")
+MAX_INLINE_MATH = 5
 
 logger = get_logger(__name__, log_file=LOG_FILE)
 
@@ -33,73 +57,413 @@ def validate_tex(path: Path) -> Tuple[bool, str]:
     return True, ""
 
 
-def compile_tex(path: Path, *, dry_run: bool, force: bool) -> Tuple[bool, str]:
-    """Compile *path* into a PDF using pdflatex."""
-    ok, reason = validate_tex(path)
+def record_diagnostics(path: Path, report: LogReport, attempt: int) -> None:
+    """Append structured log records for *path* to ``DIAGNOSTICS_FILE``."""
+    if not report.entries:
+        return
+    DIAGNOSTICS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with DIAGNOSTICS_FILE.open("a", encoding="utf-8") as f:
+        for record in report.records():
+            record.update(file=path.name, attempt=attempt)
+            f.write(json.dumps(record) + "\n")
+
+
+class PdfBackend(ABC):
+    """Turn one generated source file into a PDF."""
+
+    #: backend name used on the command line
+    name: str = ""
+    #: suffix of the source files this backend compiles
+    suffix: str = ""
+
+    @abstractmethod
+    def validate(self, path: Path) -> Tuple[bool, str]:
+        """Cheap checks run before :meth:`render`."""
+
+    @abstractmethod
+    def render(self, path: Path, pdf_path: Path) -> Tuple[bool, str, int]:
+        """Write the PDF for *path* to *pdf_path*; return ``(ok, reason, passes)``.
+
+        *passes* counts the renderer runs, e.g. pdflatex reruns.
+        """
+
+
+class PdflatexBackend(PdfBackend):
+    """Compile ``.tex`` files by shelling out to pdflatex."""
+
+    name = "pdflatex"
+    suffix = ".tex"
+
+    def validate(self, path: Path) -> Tuple[bool, str]:
+        return validate_tex(path)
+
+    def render(self, path: Path, pdf_path: Path) -> Tuple[bool, str, int]:
+        """Run pdflatex, with a second pass only when the log asks for one.
+
+        On failure the ``.log`` is kept and the reason is taken from the
+        parsed log rather than pdflatex's mostly empty stderr.
+        """
+        out_dir = pdf_path.parent
+        cmd = [
+            "pdflatex",
+            "-interaction=nonstopmode",
+            "-output-directory",
+            str(out_dir),
+            str(path),
+        ]
+        log_path = out_dir / f"{path.stem}.log"
+        for attempt in range(1, MAX_PASSES + 1):
+            try:
+                subprocess.run(cmd, check=True, capture_output=True)
+            except FileNotFoundError:
+                return False, "pdflatex not found. Install TeX Live.", attempt - 1
+            except subprocess.CalledProcessError as e:
+                report = parse_log_file(log_path)
+                record_diagnostics(path, report, attempt)
+                err = report.summary() or (e.stderr or b"").decode("utf-8", "ignore").strip()
+                return False, err or "pdflatex failed", attempt
+            report = parse_log_file(log_path)
+            record_diagnostics(path, report, attempt)
+            if not report.needs_rerun:
+                break
+
+        for ext in (".aux", ".log", ".out"):
+            (out_dir / f"{path.stem}{ext}").unlink(missing_ok=True)
+        return True, "", attempt
+
+
+def validate_html(path: Path) -> Tuple[bool, str]:
+    """Basic validation to catch obviously bad .html files."""
+    if not path.exists():
+        return False, "file not found"
+    text = path.read_text(encoding="utf-8")
+    if not text.strip():
+        return False, "empty file"
+    if "<body" not in text.lower():
+        return False, "missing <body>"
+    return True, ""
+
+
+# Per-process WeasyPrint state: font configuration and parsed stylesheet are
+# built once per worker and reused for every entry it renders.
+_WEASYPRINT: dict = {}
+
+
+def _weasyprint_state() -> dict:
+    if not _WEASYPRINT:
+        from weasyprint import CSS
+        from weasyprint.text.fonts import FontConfiguration
+
+        fonts = FontConfiguration()
+        _WEASYPRINT["fonts"] = fonts
+        _WEASYPRINT["stylesheet"] = CSS(string=WEASYPRINT_CSS, font_config=fonts)
+    return _WEASYPRINT
+
+
+class WeasyPrintBackend(PdfBackend):
+    """Render ``.html`` entries (see ``HtmlRenderer``) in-process with WeasyPrint."""
+
+    name = "weasyprint"
+    suffix = ".html"
+
+    def validate(self, path: Path) -> Tuple[bool, str]:
+        return validate_html(path)
+
+    def render(self, path: Path, pdf_path: Path) -> Tuple[bool, str, int]:
+        try:
+            state = _weasyprint_state()
+            from weasyprint import HTML
+        except ImportError:
+            return False, "weasyprint not found. pip install weasyprint", 0
+        try:
+            HTML(filename=str(path), base_url=str(path.parent)).write_pdf(
+                str(pdf_path), stylesheets=[state["stylesheet"]], font_config=state["fonts"]
+            )
+        except Exception as e:
+            return False, f"weasyprint failed: {e}", 1
+        return True, "", 1
+
+
+BACKENDS: Dict[str, PdfBackend] = {b.name: b for b in (PdflatexBackend(), WeasyPrintBackend())}
+BY_SUFFIX: Dict[str, PdfBackend] = {b.suffix: b for b in BACKENDS.values()}
+
+
+def compile_entry(path: Path, backend: PdfBackend, *, dry_run: bool, force: bool) -> Tuple[bool, str, int]:
+    """Validate *path* and compile it into ``PDF_OUTPUT_DIR`` with *backend*.
+
+    Returns ``(ok, reason, passes)``; *passes* is 0 when nothing was rendered.
+    """
+    ok, reason = backend.validate(path)
     if not ok:
-        return False, reason
+        return False, reason, 0
 
     PDF_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     pdf_path = PDF_OUTPUT_DIR / f"{path.stem}.pdf"
     if pdf_path.exists() and not force:
-        return True, "already exists"
+        return True, "already exists", 0
     if dry_run:
-        return True, "dry run"
-
-    cmd = [
-        "pdflatex",
-        "-interaction=nonstopmode",
-        "-output-directory",
-        str(PDF_OUTPUT_DIR),
-        str(path),
-    ]
+        return True, "dry run", 0
+    return backend.render(path, pdf_path)
+
+
+def compile_tex(path: Path, *, dry_run: bool, force: bool) -> Tuple[bool, str]:
+    """Compile *path* into a PDF using pdflatex."""
+    return compile_entry(path, BACKENDS["pdflatex"], dry_run=dry_run, force=force)[:2]
+
+
+def compile_file(path: Path, *, dry_run: bool, force: bool) -> Tuple[bool, str]:
+    """Compile *path* with the backend matching its suffix."""
+    backend = BY_SUFFIX.get(path.suffix)
+    if backend is None:
+        return False, f"no PDF backend for {path.suffix} files"
+    return compile_entry(path, backend, dry_run=dry_run, force=force)[:2]
+
+
+def has_heavy_math(text: str) -> bool:
+    """Whether *text* has display math or more inline math than HTML handles well."""
+    if HEAVY_MATH_RE.search(text):
+        return True
+    return len(INLINE_MATH_RE.findall(text)) > MAX_INLINE_MATH
+
+
+def select_backends(paths: Iterable[Path], choice: str = "auto") -> List[Tuple[Path, PdfBackend]]:
+    """Pick one source and backend per entry.
+
+    With ``auto``, an entry available both as ``.tex`` and ``.html`` is
+    rendered by WeasyPrint unless its HTML has heavy math; entries in one
+    format use that format's backend. A named backend only takes entries it
+    has a source for.
+    """
+    sources: Dict[str, Dict[str, Path]] = {}
+    for path in paths:
+        if path.suffix in BY_SUFFIX:
+            sources.setdefault(path.stem, {})[path.suffix] = path
+    selected = []
+    for stem in sorted(sources):
+        by_suffix = sources[stem]
+        if choice != "auto":
+            backend = BACKENDS[choice]
+            if backend.suffix in by_suffix:
+                selected.append((by_suffix[backend.suffix], backend))
+            continue
+        html = by_suffix.get(".html")
+        tex = by_suffix.get(".tex")
+        if html is not None and (tex is None or not has_heavy_math(html.read_text(encoding="utf-8"))):
+            selected.append((html, BACKENDS["weasyprint"]))
+        else:
+            selected.append((tex, BACKENDS["pdflatex"]))
+    return selected
+
+
+def _timed_entry(path: Path, backend: PdfBackend, dry_run: bool, force: bool) -> Tuple[bool, str, float, int]:
+    started = time.perf_counter()
+    ok, reason, passes = compile_entry(path, backend, dry_run=dry_run, force=force)
+    return ok, reason, time.perf_counter() - started, passes
+
+
+def _compile_html(args: Tuple[Path, bool, bool]) -> Tuple[bool, str, float, int]:
+    path, dry_run, force = args
+    return _timed_entry(path, BACKENDS["weasyprint"], dry_run, force)
+
+
+def compile_all(
+    entries: Sequence[Tuple[Path, PdfBackend]],
+    *,
+    dry_run: bool,
+    force: bool,
+    jobs: int | None = None,
+    timings: Optional[Dict[Path, float]] = None,
+    passes: Optional[Dict[Path, int]] = None,
+) -> List[Tuple[bool, str]]:
+    """Compile *entries* in order; WeasyPrint entries run on a process pool.
+
+    pdflatex already runs in its own process per entry, so those entries
+    are compiled one after another while the pool works through the HTML
+    ones. Results come back in the order of *entries*; the seconds spent on
+    each path and its renderer passes are stored in *timings* and *passes*
+    when given.
+    """
+    html = [i for i, (_, backend) in enumerate(entries) if backend.name == "weasyprint"]
+    results: List[Tuple[bool, str]] = [(False, "")] * len(entries)
+    if timings is None:
+        timings = {}
+    if passes is None:
+        passes = {}
+    pool = None
+    if len(html) > 1 and jobs != 1 and not dry_run:
+        # Imported here: concurrent.futures.process pulls in multiprocessing,
+        # which ``compile --dry-run`` and ``validate`` never need.
+        from concurrent.futures import ProcessPoolExecutor
+
+        pool = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker)
+        pending = pool.map(_compile_html, [(entries[i][0], dry_run, force) for i in html])
     try:
-        subprocess.run(cmd, check=True, capture_output=True)
-    except FileNotFoundError:
-        return False, "pdflatex not found. Install TeX Live."
-    except subprocess.CalledProcessError as e:
-        err = e.stderr.decode("utf-8", "ignore").strip()
-        return False, err or "pdflatex failed"
+        for i, (path, backend) in enumerate(entries):
+            if pool is None or backend.name != "weasyprint":
+                ok, reason, timings[path], passes[path] = _timed_entry(path, backend, dry_run, force)
+                results[i] = ok, reason
+        if pool is not None:
+            for i, (ok, reason, seconds, runs) in zip(html, pending):
+                results[i] = ok, reason
+                timings[entries[i][0]] = seconds
+                passes[entries[i][0]] = runs
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return results
 
-    for ext in (".aux", ".log", ".out"):
-        (PDF_OUTPUT_DIR / f"{path.stem}{ext}").unlink(missing_ok=True)
 
-    return True, ""
+def history_rows(
+    entries: Sequence[Tuple[Path, PdfBackend]],
+    results: Sequence[Tuple[bool, str]],
+    timings: Dict[Path, float],
+    passes: Optional[Dict[Path, int]] = None,
+) -> List[dict]:
+    """One :class:`history.RunHistory` row per compiled entry.
+
+    Its ``attempts`` are the renderer passes recorded in *passes*.
+    """
+    rows = []
+    for (path, backend), (ok, reason) in zip(entries, results):
+        if ok:
+            status = "skipped" if reason == "already exists" else "success"
+        else:
+            status = "failure"
+        rows.append(
+            {
+                "entry": path.stem,
+                "stage": "compile",
+                "status": status,
+                "error_class": None if ok else error_class(reason),
+                "error": None if ok else reason,
+                "latency": round(timings[path], 3) if path in timings else None,
+                "attempts": passes.get(path) if passes is not None else None,
+                "engine": backend.name,
+            }
+        )
+    return rows
+
+
+def _init_worker() -> None:
+    try:
+        _weasyprint_state()
+    except ImportError:
+        pass
 
 
-def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(description="Compile LaTeX files to PDFs")
+def parse_args(argv: Sequence[str] | None = None, prog: str | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog=prog, description="Compile generated entries to PDFs")
     parser.add_argument("--dry-run", action="store_true", help="Show files but do not compile")
-    parser.add_argument("--file", help="Compile a single .tex file")
+    parser.add_argument("--file", help="Compile a single .tex or .html file")
+    parser.add_argument(
+        "--backend",
+        choices=["auto", *BACKENDS],
+        default="auto",
+        help="PDF backend; auto uses weasyprint for .html entries without heavy math",
+    )
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes for the weasyprint backend")
     parser.add_argument("--all", action="store_true", help="Force recompilation even if PDFs exist")
     parser.add_argument("--quiet", action="store_true", help="Suppress progress output")
-    return parser.parse_args()
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=str(LOG_DIR / "profile"),
+        metavar="DIR",
+        help="Profile each stage into DIR (default logs/profile)",
+    )
+    return parser.parse_args(argv)
 
 
-def main() -> int:
-    args = parse_args()
-    files = [OUTPUT_DIR / args.file] if args.file else sorted(OUTPUT_DIR.glob("*.tex"))
+def main(argv: Sequence[str] | None = None, prog: str | None = None) -> int:
+    args = parse_args(argv, prog)
+    profiler = StageProfiler(Path(args.profile) if args.profile else None, prefix="compile")
+    with profiler.stage("discover"):
+        if args.file:
+            files = [OUTPUT_DIR / args.file]
+        else:
+            files = sorted(p for suffix in BY_SUFFIX for p in OUTPUT_DIR.glob(f"*{suffix}"))
+        entries = select_backends(files, args.backend)
+    if args.file and not entries:
+        # A single requested file must compile or fail, never be dropped.
+        suffix = files[0].suffix
+        if suffix not in BY_SUFFIX:
+            reason = f"no PDF backend for {suffix or 'extensionless'} files"
+        else:
+            reason = f"no source for the {args.backend} backend"
+        if not args.quiet:
+            print(f"Failed {files[0].name}: {reason}")
+            print("✅ 0 successful, ❌ 1 failed")
+        return 1
 
+    run_started = time.time()
+    timings: Dict[Path, float] = {}
+    passes: Dict[Path, int] = {}
     success = failure = 0
-    for tex_file in files:
-        ok, reason = compile_tex(tex_file, dry_run=args.dry_run, force=args.all)
-        if ok:
-            if not args.quiet:
-                msg = "Would compile" if args.dry_run else "Compiled"
-                if reason == "already exists":
-                    msg = "Skipping"
-                print(f"{msg} {tex_file.name}{' (' + reason + ')' if reason else ''}")
-            success += 1
-        else:
-            if not args.quiet:
-                print(f"Failed {tex_file.name}: {reason}")
-            failure += 1
+    with profiler.stage("compile"):
+        results = compile_all(
+            entries, dry_run=args.dry_run, force=args.all, jobs=args.jobs, timings=timings, passes=passes
+        )
+        for (path, backend), (ok, reason) in zip(entries, results):
+            if ok:
+                if not args.quiet:
+                    msg = "Would compile" if args.dry_run else "Compiled"
+                    if reason == "already exists":
+                        msg = "Skipping"
+                    via = f" [{backend.name}]" if backend.name != "pdflatex" else ""
+                    print(f"{msg} {path.name}{via}{' (' + reason + ')' if reason else ''}")
+                success += 1
+            else:
+                if not args.quiet:
+                    print(f"Failed {path.name}: {reason}")
+                failure += 1
 
+    if not args.dry_run:
+        with RunHistory(LOG_DIR / HISTORY_NAME) as history:
+            history.record_run(
+                "compile",
+                history_rows(entries, results, timings, passes),
+                started=run_started,
+                args={"backend": args.backend, "jobs": args.jobs, "all": args.all},
+            )
     if not args.quiet:
         print(f"✅ {success} successful, ❌ {failure} failed")
+    if profiler.enabled:
+        summary_path = profiler.write_summary()
+        if not args.quiet:
+            print(f"Profile written to {summary_path.parent}")
+            for line in profiler.report():
+                print(f"  {line}")
     return 0 if failure == 0 else 1
 
 
+def validate_cli(argv: Sequence[str] | None = None, prog: str | None = None) -> int:
+    """Run each backend's validation over the output directory without compiling."""
+    parser = argparse.ArgumentParser(prog=prog, description="Validate LaTeX and HTML entries")
+    parser.add_argument("--file", help="Validate a single .tex or .html file")
+    parser.add_argument("--quiet", action="store_true", help="Only print the summary")
+    args = parser.parse_args(argv)
+    if args.file:
+        files = [OUTPUT_DIR / args.file]
+    else:
+        files = sorted(p for suffix in BY_SUFFIX for p in OUTPUT_DIR.glob(f"*{suffix}"))
+
+    invalid = 0
+    for path in files:
+        backend = BY_SUFFIX.get(path.suffix)
+        if backend is None:
+            ok, reason = False, f"no PDF backend for {path.suffix or 'extensionless'} files"
+        else:
+            ok, reason = backend.validate(path)
+        if not ok:
+            invalid += 1
+            print(f"{path.name}: {reason}")
+        elif not args.quiet:
+            print(f"{path.name}: ok")
+
+    print(f"✅ {len(files) - invalid} valid, ❌ {invalid} invalid")
+    return 0 if invalid == 0 else 1
+
+
 if __name__ == "__main__":
     import sys
     sys.exit(main())
@@ -0,0 +1,170 @@
+"""AIMD controller for the number of in-flight API requests."""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+#: defaults for the ``[concurrency]`` table in ``config.toml``
+CONCURRENCY_DEFAULTS: Dict[str, float] = {
+    "min_workers": 1,
+    "max_workers": 8,
+    "initial_workers": 2,
+    "target_p95": 60.0,
+    "max_error_rate": 0.2,
+    "window": 10,
+    "decrease_factor": 0.5,
+}
+
+STATUS_RE = re.compile(r"Error code: (\d{3})")
+VALIDATION_MARKERS = ("missing section", "exceeds", "does not start with", "empty response")
+
+
+def error_class(err: Optional[str]) -> Optional[str]:
+    """Bucket an error message: ``http_<code>``, ``timeout``, ``rate_limit``,
+    ``connection``, ``validation`` or ``other``.
+
+    The one classifier of API errors: the run history stores these buckets
+    and :func:`classify_error` derives the controller's outcome from them.
+    """
+    if not err:
+        return None
+    m = STATUS_RE.search(err)
+    if m:
+        return f"http_{m.group(1)}"
+    lowered = err.lower()
+    if "timed out" in lowered or "timeout" in lowered:
+        return "timeout"
+    if "rate limit" in lowered:
+        return "rate_limit"
+    if "connection" in lowered:
+        return "connection"
+    if any(marker in lowered for marker in VALIDATION_MARKERS):
+        return "validation"
+    return "other"
+
+
+def classify_error(err: Optional[str]) -> str:
+    """Return ``"ok"``, ``"throttled"`` (429/5xx/timeouts) or ``"error"``."""
+    bucket = error_class(err)
+    if bucket is None:
+        return "ok"
+    if bucket in ("timeout", "rate_limit", "http_429") or bucket.startswith("http_5"):
+        return "throttled"
+    return "error"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of *values* (``0 < pct <= 100``)."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+class AIMDController:
+    """Adjust a concurrency limit from observed latency and failures.
+
+    The limit grows by one after every healthy window of ``window`` samples
+    (p95 under ``target_p95`` and error rate under ``max_error_rate``) and is
+    multiplied by ``decrease_factor`` after an unhealthy window or straight
+    away on a throttling response. Responses to requests started before the
+    last decrease do not trigger another one, so a burst of 429s from the
+    same wave only backs off once.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_workers: int = 1,
+        max_workers: int = 8,
+        initial_workers: int = 2,
+        target_p95: float = 60.0,
+        max_error_rate: float = 0.2,
+        window: int = 10,
+        decrease_factor: float = 0.5,
+    ) -> None:
+        if not 1 <= min_workers <= max_workers:
+            raise ValueError("need 1 <= min_workers <= max_workers")
+        self.min_workers = int(min_workers)
+        self.max_workers = int(max_workers)
+        self.limit = min(max(int(initial_workers), self.min_workers), self.max_workers)
+        self.target_p95 = float(target_p95)
+        self.max_error_rate = float(max_error_rate)
+        self.window = int(window)
+        self.decrease_factor = float(decrease_factor)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.decisions: List[dict] = []
+        self._samples: Deque[Tuple[float, str]] = deque()
+        self._all_latencies: List[float] = []
+        self._last_decrease = float("-inf")
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, float]) -> "AIMDController":
+        settings = {**CONCURRENCY_DEFAULTS, **cfg}
+        return cls(**{k: settings[k] for k in CONCURRENCY_DEFAULTS})
+
+    @contextmanager
+    def slot(self) -> Iterator[float]:
+        """Wait for a free slot under the current limit; yield the start time."""
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        started = time.monotonic()
+        try:
+            yield started
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def record(self, started: float, latency: float, outcome: str = "ok") -> None:
+        """Feed one finished request (see :func:`classify_error` for *outcome*)."""
+        with self._cond:
+            self._all_latencies.append(latency)
+            self._samples.append((latency, outcome))
+            if outcome == "throttled" and started >= self._last_decrease:
+                self._decrease("throttled")
+            elif len(self._samples) >= self.window:
+                latencies = [lat for lat, _ in self._samples]
+                p95 = percentile(latencies, 95)
+                errors = sum(1 for _, o in self._samples if o != "ok") / len(self._samples)
+                if p95 > self.target_p95:
+                    self._decrease(f"p95 {p95:.2f}s > {self.target_p95:.2f}s")
+                elif errors > self.max_error_rate:
+                    self._decrease(f"error rate {errors:.0%}")
+                else:
+                    self._set(self.limit + 1, "healthy")
+                    self._samples.clear()
+            self._cond.notify_all()
+
+    def _decrease(self, reason: str) -> None:
+        self._set(int(self.limit * self.decrease_factor), reason)
+        self._last_decrease = time.monotonic()
+        self._samples.clear()
+
+    def _set(self, limit: int, reason: str) -> None:
+        limit = min(max(limit, self.min_workers), self.max_workers)
+        if limit != self.limit:
+            self.decisions.append(
+                {"time": round(time.time(), 3), "limit": limit, "previous": self.limit, "reason": reason}
+            )
+        self.limit = limit
+
+    def metrics(self) -> dict:
+        latencies = self._all_latencies
+        return {
+            "limit": self.limit,
+            "min_workers": self.min_workers,
+            "max_workers": self.max_workers,
+            "peak_in_flight": self.peak_in_flight,
+            "p95_latency": round(percentile(latencies, 95), 3) if latencies else None,
+            "decisions": self.decisions,
+        }
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Unified ``encyclopedia`` command line entry point.
+
+Subcommands import their implementation lazily, so ``--help`` and the
+lightweight commands (``compile``, ``validate``) never load pandas, toml,
+python-dotenv or the OpenAI client.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import sys
+from types import ModuleType
+from typing import Dict, Sequence, Tuple
+
+#: subcommand -> (module, function, help text)
+COMMANDS: Dict[str, Tuple[str, str, str]] = {
+    "generate": ("generate", "cli", "Generate LaTeX entries from the topic catalogue"),
+    "compile": ("compile_pdf", "main", "Compile generated .tex files into PDFs"),
+    "build": ("build", "main", "Run generation then compilation"),
+    "postprocess": ("postprocess", "main", "Recompress PDFs and assemble per-domain volumes"),
+    "validate": ("compile_pdf", "validate_cli", "Check generated .tex files without compiling"),
+    "render": ("generate", "render_cli", "Render prompts for planned rows without calling the API"),
+    "watch": ("watch", "main", "Rebuild affected entries whenever templates, the catalogue or outputs change"),
+    "report": ("history", "main", "Compare the latest run with earlier ones and flag regressions"),
+    "nav": ("navigation", "main", "Build the navigation tree and cross-link index JSON for the site"),
+}
+
+
+def _load(name: str) -> ModuleType:
+    if __package__:
+        return importlib.import_module(f"{__package__}.{name}")
+    return importlib.import_module(name)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="encyclopedia",
+        description="Encyclopedia generation and compilation pipeline",
+    )
+    sub = parser.add_subparsers(dest="command", metavar="command", required=True)
+    for name, (_, _, help_text) in COMMANDS.items():
+        sub.add_parser(name, help=help_text, add_help=False)
+    args, rest = parser.parse_known_args(argv)
+
+    module, func, _ = COMMANDS[args.command]
+    return getattr(_load(module), func)(rest, prog=f"encyclopedia {args.command}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,30 +4,51 @@ import argparse
 import json
 import os
 import re
+import threading
 import time
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Dict, Optional, Tuple
-
-import pandas as pd
-import toml
-from dotenv import load_dotenv
-from openai import OpenAI
+from typing import TYPE_CHECKING, Callable, Collection, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, TypeVar
 
 try:
+    from .catalogue import build_snapshot, diff_snapshots, load_snapshot, remove_orphans, save_snapshot
+    from .coalesce import PromptCoalescer, dedupe_report
+    from .concurrency import AIMDController, classify_error, error_class
+    from .profiling import StageProfiler
+    from .registry import ModelTier, TemplateRegistry
+    from . import renderers
+    from .streaming import StreamValidator, consume_stream, required_sections
+    from .workqueue import DEFAULT_LEASE_TTL, LeaseQueue, parse_shard, shard_of
     from .utils import (
+        entry_stem,
         escape_latex,
         normalize_artifacts,
         render_prompt,
-        slugify,
     )
 except ImportError:  # pragma: no cover
+    from catalogue import build_snapshot, diff_snapshots, load_snapshot, remove_orphans, save_snapshot
+    from coalesce import PromptCoalescer, dedupe_report
+    from concurrency import AIMDController, classify_error, error_class
+    from profiling import StageProfiler
+    from registry import ModelTier, TemplateRegistry
+    import renderers
+    from streaming import StreamValidator, consume_stream, required_sections
+    from workqueue import DEFAULT_LEASE_TTL, LeaseQueue, parse_shard, shard_of
     from utils import (
+        entry_stem,
         escape_latex,
         normalize_artifacts,
         render_prompt,
-        slugify,
     )
 
+if TYPE_CHECKING:  # pragma: no cover
+    import pandas as pd
+
+# pandas, toml, python-dotenv and openai, as well as the thread pool and the
+# modules only a run needs (budget, hedging, history, navigation), are
+# imported inside the functions that need them so ``--help`` and the
+# lightweight CLI commands start fast.
+
 ROOT = Path(__file__).resolve().parent.parent
 DEFAULT_DATA_FILE = ROOT / "data" / "topics_final.csv"
 DATA_FILE = DEFAULT_DATA_FILE
@@ -37,30 +58,118 @@ PROMPT_TEMPLATES: Dict[str, Path] = {
     "abstract": PROMPTS_DIR / "prompt_template_abstract.txt",
     "computation": PROMPTS_DIR / "prompt_template_computation.txt",
 }
+REGISTRY_FILE = ROOT / "prompt_registry.toml"
 CONFIG_FILE = ROOT / "config.toml"
 OUTPUT_DIR = ROOT / "output"
 LOGS_DIR = ROOT / "logs"
 JSONL_LOG_FILE = LOGS_DIR / "generation_log.jsonl"
+SNAPSHOT_NAME = ".catalogue_snapshot.json"
 MODEL = "gpt-4o-mini"
-TEX_WRAPPER = "\\documentclass{{article}}\n\\begin{{document}}\n{{body}}\n\\end{{document}}"
+#: API attempts per model when neither ``--retries`` nor the tier sets them
+DEFAULT_RETRIES = 3
+#: output file suffix per ``--format``
+SUFFIXES = {"latex": ".tex", "html": ".html"}
 
 LOGS_DIR.mkdir(exist_ok=True, parents=True)
 
+T = TypeVar("T")
+
 
 def log_json(entry: dict) -> None:
     with JSONL_LOG_FILE.open("a", encoding="utf-8") as f:
         f.write(json.dumps(entry) + "\n")
 
 
-def generate_content(prompt: str, retries: int = 3) -> Tuple[Optional[str], Optional[str]]:
-    """Call the OpenAI API with retries."""
+def _request_options(max_tokens: int | None, timeout: float | None) -> dict:
+    options: dict = {}
+    if max_tokens is not None:
+        options["max_tokens"] = max_tokens
+    if timeout is not None:
+        options["timeout"] = timeout
+    return options
+
+
+def entry_meta(row: Mapping) -> dict:
+    """Document metadata of a catalogue *row* as :meth:`renderers.Renderer.wrap` keywords."""
+    return {
+        "title": str(row["subtopic"]),
+        "id": str(row.get("id", "")),
+        "domain": str(row["domain"]),
+        "topic": str(row["topic"]),
+    }
+
+
+def renderer_for(fmt: str) -> renderers.Renderer:
+    """The renderer wrapping *fmt* outputs.
+
+    Looked up on every call so that ``watch``, which reloads
+    :mod:`renderers` when it changes, and new outputs share one wrapper.
+    """
+    return renderers.LatexRenderer() if fmt == "latex" else renderers.HtmlRenderer()
+
+
+def _record_usage(usage: dict | None, resp_usage: object) -> None:
+    if usage is not None and resp_usage is not None:
+        usage["prompt_tokens"] = getattr(resp_usage, "prompt_tokens", 0) or 0
+        usage["completion_tokens"] = getattr(resp_usage, "completion_tokens", 0) or 0
+
+
+def _api_attempt(controller: AIMDController | None, send: Callable[[], T], usage: dict | None = None) -> T:
+    """Run one API request *send*.
+
+    With a *controller* the request holds a slot while in flight and its
+    latency and outcome are fed back. When *usage* is given the request is
+    counted in ``usage["requests"]`` and its duration, without slot waits or
+    backoff, is added to ``usage["seconds"]``.
+    """
+    error: Optional[Exception] = None
+    with controller.slot() if controller is not None else nullcontext(time.monotonic()) as started:
+        try:
+            result = send()
+        except Exception as e:
+            error = e
+    latency = time.monotonic() - started
+    if usage is not None:
+        usage["requests"] = usage.get("requests", 0) + 1
+        usage["seconds"] = usage.get("seconds", 0.0) + latency
+    if controller is not None:
+        controller.record(started, latency, classify_error(str(error) if error else None))
+    if error is not None:
+        raise error
+    return result
+
+
+def generate_content(
+    prompt: str,
+    retries: int = 3,
+    *,
+    model: str | None = None,
+    max_tokens: int | None = None,
+    timeout: float | None = None,
+    usage: dict | None = None,
+    controller: AIMDController | None = None,
+) -> Tuple[Optional[str], Optional[str]]:
+    """Call the OpenAI API with retries.
+
+    Token counts of the successful call are stored in *usage* when given.
+    With a *controller* each attempt takes its own slot, released during the
+    backoff before the next one.
+    """
+    from openai import OpenAI
+
     client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
     for attempt in range(1, retries + 1):
         try:
-            resp = client.chat.completions.create(
-                model=MODEL,
-                messages=[{"role": "user", "content": prompt}],
+            resp = _api_attempt(
+                controller,
+                lambda: client.chat.completions.create(
+                    model=model or MODEL,
+                    messages=[{"role": "user", "content": prompt}],
+                    **_request_options(max_tokens, timeout),
+                ),
+                usage,
             )
+            _record_usage(usage, resp.usage)
             return resp.choices[0].message.content, None
         except Exception as e:  # pragma: no cover - network errors
             if attempt == retries:
@@ -69,6 +178,135 @@ def generate_content(prompt: str, retries: int = 3) -> Tuple[Optional[str], Opti
     return None, "API error"
 
 
+def generate_content_stream(
+    prompt: str,
+    dest: Path,
+    *,
+    fmt: str = "latex",
+    max_chars: int | None = None,
+    retries: int = 3,
+    model: str | None = None,
+    max_tokens: int | None = None,
+    timeout: float | None = None,
+    usage: dict | None = None,
+    controller: AIMDController | None = None,
+    meta: dict | None = None,
+) -> Tuple[Optional[str], Optional[str]]:
+    """Stream a completion straight into *dest*, cancelling bad responses early.
+
+    The response is converted paragraph by paragraph and written to a temp
+    file that replaces *dest* only once it validates. Validation failures
+    close the stream immediately and are not retried; API errors are. With
+    a *controller* each attempt holds a slot until its stream is closed.
+    *meta* (see :func:`entry_meta`) fills the document header.
+    """
+    from openai import OpenAI
+
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    renderer = renderer_for(fmt)
+    convert = convert_markdown_to_latex if fmt == "latex" else renderer.convert
+    if meta is None:
+        meta = {"title": dest.stem, "id": "", "domain": "", "topic": ""}
+    header, footer = renderer.wrap(**meta, body="\0").split("\0")
+
+    def send() -> Tuple[Optional[str], Optional[str]]:
+        stream = client.chat.completions.create(
+            model=model or MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+            stream_options={"include_usage": True},
+            **_request_options(max_tokens, timeout),
+        )
+        try:
+
+            def deltas() -> Iterator[str]:
+                for chunk in stream:
+                    _record_usage(usage, getattr(chunk, "usage", None))
+                    if chunk.choices:
+                        yield chunk.choices[0].delta.content or ""
+
+            return consume_stream(
+                deltas(),
+                dest,
+                convert=convert,
+                validator=StreamValidator(required_sections(prompt), max_chars=max_chars),
+                header=header,
+                footer=footer,
+            )
+        finally:
+            stream.close()
+
+    for attempt in range(1, retries + 1):
+        try:
+            return _api_attempt(controller, send, usage)
+        except Exception as e:  # pragma: no cover - network errors
+            if attempt == retries:
+                return None, str(e)
+            time.sleep(2 ** attempt)
+    return None, "API error"
+
+
+def generate_with_fallback(
+    call: Callable[..., Tuple[Optional[str], Optional[str]]],
+    tier: ModelTier | None,
+    *,
+    retries: int | None,
+    registry: TemplateRegistry,
+    attempts: List[dict],
+) -> Tuple[Optional[str], Optional[str]]:
+    """Run *call* down the model cascade of *tier* until one model succeeds.
+
+    *call* receives ``retries``, ``model``, ``max_tokens``, ``timeout`` and
+    ``usage`` keyword arguments (only ``retries`` and ``usage`` without a
+    tier). An explicit *retries* overrides the tier's; ``None`` uses the
+    tier's, else :data:`DEFAULT_RETRIES`. One record per model tried
+    (requests, latency, tokens, cost, error) is appended to *attempts*. Its
+    request count and latency are the API requests and the time spent in
+    them when *call* reports them in ``usage["requests"]`` and
+    ``usage["seconds"]``, else one request and the wall time of the call.
+    """
+    if tier is None:
+        usage: dict = {}
+        started = time.monotonic()
+        result = call(retries=retries if retries is not None else DEFAULT_RETRIES, usage=usage)
+        attempts.append(_attempt_record(MODEL, started, usage, registry, result[1]))
+        return result
+    if retries is None:
+        retries = tier.retries or DEFAULT_RETRIES
+    err: Optional[str] = None
+    for model in tier.models:
+        usage: dict = {}
+        started = time.monotonic()
+        content, err = call(
+            retries=retries,
+            model=model,
+            max_tokens=tier.max_tokens,
+            timeout=tier.timeout,
+            usage=usage,
+        )
+        attempts.append(_attempt_record(model, started, usage, registry, err))
+        if content is not None:
+            return content, None
+    return None, err
+
+
+def _attempt_record(
+    model: str, started: float, usage: dict, registry: TemplateRegistry | None, err: Optional[str]
+) -> dict:
+    cost = None
+    if registry is not None and "prompt_tokens" in usage:
+        cost = registry.cost(model, usage["prompt_tokens"], usage.get("completion_tokens", 0))
+    return {
+        "model": model,
+        "requests": usage.get("requests", 1),
+        "latency": round(usage.get("seconds", time.monotonic() - started), 3),
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "completion_tokens": usage.get("completion_tokens"),
+        "cost": round(cost, 6) if cost is not None else None,
+        "error": err,
+    }
+
+
 MD_PATTERNS = [
     (re.compile(r"`([^`]+)`"), r"\\texttt{\1}"),
     (re.compile(r"\*\*(.+?)\*\*", re.DOTALL), r"\\textbf{\1}"),
@@ -104,6 +342,8 @@ def convert_markdown_to_latex(text: str) -> str:
 
 def load_config(path: Path) -> Tuple[int, int, Path]:
     """Load configuration, creating a default file if missing."""
+    import toml
+
     if not path.exists():
         path.write_text(
             "start_index = 0\nmax_entries = 10\ndata_file = \"data/topics_final.csv\"\n",
@@ -118,6 +358,137 @@ def load_config(path: Path) -> Tuple[int, int, Path]:
     return int(cfg["start_index"]), int(cfg["max_entries"]), data_file
 
 
+def summarize_attempts(attempt_lists: Iterable[List[dict]]) -> Dict[str, dict]:
+    """Aggregate per-model calls, failures, latency and cost across rows."""
+    models: Dict[str, dict] = {}
+    for attempts in attempt_lists:
+        for attempt in attempts:
+            stats = models.setdefault(
+                attempt["model"], {"calls": 0, "failures": 0, "latency": 0.0, "cost": 0.0}
+            )
+            stats["calls"] += 1
+            stats["failures"] += attempt["error"] is not None
+            stats["latency"] = round(stats["latency"] + attempt["latency"], 3)
+            stats["cost"] = round(stats["cost"] + (attempt["cost"] or 0.0), 6)
+    return models
+
+
+def history_rows(
+    planned: Sequence[dict],
+    outcomes: Sequence[str],
+    attempts_by_file: Dict[Path, List[dict]],
+    errors: Dict[Path, str],
+) -> List[dict]:
+    """One :class:`history.RunHistory` row per planned entry of a run.
+
+    A row's latency is the API time of its model attempts, so it does not
+    depend on queueing, coalescing or how busy the run was.
+    """
+    rows = []
+    for item, outcome in zip(planned, outcomes):
+        filename = item["filename"]
+        attempts = attempts_by_file.get(filename, [])
+        err = errors.get(filename)
+        costs = [a["cost"] for a in attempts if a["cost"] is not None]
+        rows.append(
+            {
+                "entry": filename.stem,
+                "stage": "generate",
+                "prompt_type": item["row"]["prompt_type"],
+                "status": outcome,
+                "error_class": error_class(err),
+                "error": err,
+                "latency": round(sum(a["latency"] for a in attempts), 3) if attempts else None,
+                "attempts": sum(a.get("requests", 1) for a in attempts),
+                "engine": attempts[-1]["model"] if attempts else None,
+                "prompt_tokens": sum(a.get("prompt_tokens") or 0 for a in attempts) or None,
+                "completion_tokens": sum(a.get("completion_tokens") or 0 for a in attempts) or None,
+                "cost": round(sum(costs), 6) if costs else None,
+            }
+        )
+    return rows
+
+
+def load_table(path: Path, name: str) -> dict:
+    """Return the ``[name]`` table of the TOML config at *path* (empty if absent)."""
+    import toml
+
+    if not path.exists():
+        return {}
+    return dict(toml.load(path).get(name, {}))
+
+
+_TEMPLATE_CACHE: Dict[Path, Tuple[Tuple[int, int], str]] = {}
+
+
+def read_template(path: Path) -> str:
+    """Return the text of template *path*, re-reading it only after it changes."""
+    path = Path(path)
+    st = path.stat()
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _TEMPLATE_CACHE.get(path)
+    if cached is None or cached[0] != key:
+        cached = (key, path.read_text(encoding="utf-8"))
+        _TEMPLATE_CACHE[path] = cached
+    return cached[1]
+
+
+def plan_rows(
+    rows: "pd.DataFrame",
+    *,
+    skip_existing: bool,
+    overwrite: bool,
+    shard: Tuple[int, int] | None = None,
+    queue: LeaseQueue | None = None,
+    suffix: str = ".tex",
+    invalid: List[str] | None = None,
+) -> List[dict]:
+    """Resolve output paths and render prompts for *rows* before any API call.
+
+    Rows repeating an earlier row's output file and prompt are kept but marked
+    ``duplicate`` so they share its response instead of being written twice.
+    Rows outside ``shard`` (unless a ``queue`` allows stealing them) and rows
+    already finished in ``queue`` are left out. Rows with a name that has
+    no slug characters at all never produce an entry and are left out too;
+    their subtopics are appended to *invalid* when given.
+    """
+    planned: List[dict] = []
+    seen: Dict[Path, str] = {}
+    templates: Dict[str, str] = {}
+    for _, row in rows.iterrows():
+        try:
+            stem = entry_stem(row["domain"], row["topic"], row["subtopic"])
+        except ValueError:
+            if invalid is not None:
+                invalid.append(str(row["subtopic"]))
+            continue
+        filename = OUTPUT_DIR / f"{stem}{suffix}"
+        if queue is not None and queue.is_done(filename.stem):
+            continue
+        if shard is not None and queue is None and shard_of(filename.stem, shard[1]) != shard[0]:
+            continue
+        if row["prompt_type"] not in templates:
+            templates[row["prompt_type"]] = read_template(PROMPT_TEMPLATES[row["prompt_type"]])
+        template = templates[row["prompt_type"]]
+        prompt = render_prompt(
+            template,
+            domain=row["domain"],
+            topic=row["topic"],
+            subtopic=row["subtopic"],
+        )
+        duplicate = seen.get(filename) == prompt
+        if not duplicate and (filename.exists() or filename in seen):
+            if overwrite:
+                pass
+            elif skip_existing:
+                continue
+            else:
+                raise FileExistsError(f"{filename} exists")
+        seen[filename] = prompt
+        planned.append({"row": row, "filename": filename, "prompt": prompt, "duplicate": duplicate})
+    return planned
+
+
 def main(
     *,
     enable_log: bool = True,
@@ -129,96 +500,463 @@ def main(
     fmt: str = "latex",
     start: int | None = None,
     limit: int | None = None,
-    retries: int = 3,
+    retries: int | None = None,
+    shard: Tuple[int, int] | None = None,
+    queue_dir: str | None = None,
+    lease_ttl: float = DEFAULT_LEASE_TTL,
+    stream: bool = False,
+    max_chars: int | None = None,
+    adaptive: bool = False,
+    hedge: bool = False,
+    incremental: bool = False,
+    entries: Collection[str] | None = None,
+    profile: str | None = None,
+    see_also: int = 0,
+    budget: float | None = None,
+    token_budget: int | None = None,
+    estimate_only: bool = False,
 ) -> int:
-    """Run the generation pipeline."""
-    load_dotenv()
-    start_idx, max_entries, data_file = load_config(CONFIG_FILE)
-    if start is not None:
-        start_idx = start
-    if limit is not None:
-        max_entries = limit
+    """Run the generation pipeline.
+
+    With ``shard=(i, N)`` only rows hashing to shard ``i`` are generated. With
+    ``queue_dir`` rows are claimed through lease files shared by every worker,
+    own-shard rows first and then any unclaimed rows from other shards.
+    With ``stream`` responses are written through as they arrive and
+    cancelled as soon as they miss a required section or pass ``max_chars``.
+    With ``adaptive`` rows run on a thread pool and every API attempt waits
+    for a slot under an AIMD controller bounded by the ``[concurrency]``
+    table of the config.
+    With ``hedge`` a call slower than recent latencies gets a duplicate
+    request, within the budget of the ``[hedging]`` table. Model, token and
+    timeout settings per prompt type come from ``REGISTRY_FILE``.
+    With ``incremental`` the whole catalogue is diffed against the snapshot
+    left in ``OUTPUT_DIR`` by the previous run: only added, changed (row or
+    prompt template) and missing entries are generated and the outputs of
+    removed rows are deleted. An explicit ``start``/``limit`` window further
+    restricts generation to the diffed rows inside it, and ``entries``
+    (output file stems) to the diffed rows among them; the rest stay pending
+    for a later run.
+    With ``profile`` set to a directory, the load, plan, generate and finish
+    stages are profiled and timed (see :class:`profiling.StageProfiler`).
+    With ``see_also`` each entry ends with links to up to that many sibling
+    entries from the catalogue's :class:`navigation.NavigationIndex`.
+    With ``estimate_only`` the prompt tokens of every planned row are
+    counted and the run's tokens, cost and wall time are projected from the
+    output lengths and latencies in the run history, then nothing is sent.
+    With ``budget`` (USD) or ``token_budget`` no row is started once its
+    projected usage would overrun the limit; rows already running finish.
+    With ``enable_log`` each row's latency, attempts, tokens, status and
+    error class are also stored in the run history next to the JSONL log
+    (see :mod:`history`).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    try:
+        from .budget import Budget, BudgetExhausted, attempts_usage, format_projection, project
+        from .hedging import Hedger
+        from .history import HISTORY_NAME, RunHistory
+        from .navigation import NavigationIndex
+    except ImportError:  # pragma: no cover
+        from budget import Budget, BudgetExhausted, attempts_usage, format_projection, project
+        from hedging import Hedger
+        from history import HISTORY_NAME, RunHistory
+        from navigation import NavigationIndex
+
+    if hedge and stream:
+        raise ValueError("hedged requests are not supported with streaming")
+    if queue_dir is not None and stream:
+        # A streamed response is moved into place before the lease can be
+        # re-checked, so a worker whose lease was stolen would overwrite
+        # the new holder's output.
+        raise ValueError("--queue-dir is not supported with streaming")
+    if see_also and stream:
+        raise ValueError("see-also links are not supported with streaming")
+    if entries is not None and not incremental:
+        raise ValueError("entries only apply to incremental runs")
+    if incremental and (shard is not None or queue_dir is not None):
+        raise ValueError("incremental runs are not supported with --shard or --queue-dir")
+    run_started = time.time()
+    profiler = StageProfiler(Path(profile) if profile else None, prefix="generate")
+    with profiler.stage("load"):
+        import pandas as pd
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        start_idx, max_entries, data_file = load_config(CONFIG_FILE)
+        if start is not None:
+            start_idx = start
+        if limit is not None:
+            max_entries = limit
 
-    df = pd.read_csv(data_file)
-    rows = df.iloc[start_idx : start_idx + max_entries]
+        df = pd.read_csv(data_file)
+        window = df.iloc[start_idx : start_idx + max_entries]
+        rows = df if incremental else window
+        nav = NavigationIndex.from_rows(df.to_dict("records")) if see_also else None
 
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-    success = failure = 0
-    for _, row in rows.iterrows():
-        filename = OUTPUT_DIR / f"{slugify(row['domain'])}-{slugify(row['topic'])}-{slugify(row['subtopic'])}.tex"
-        if filename.exists():
-            if overwrite:
-                pass
-            elif skip_existing:
-                continue
-            else:
-                raise FileExistsError(f"{filename} exists")
-        template_path = PROMPT_TEMPLATES[row["prompt_type"]]
-        template = Path(template_path).read_text(encoding="utf-8")
-        prompt = render_prompt(
-            template,
-            domain=row["domain"],
-            topic=row["topic"],
-            subtopic=row["subtopic"],
+    queue = None
+    if queue_dir is not None:
+        queue = LeaseQueue(Path(queue_dir), ttl=lease_ttl)
+
+    with profiler.stage("plan"):
+        invalid: List[str] = []
+        planned = plan_rows(
+            rows,
+            skip_existing=skip_existing,
+            overwrite=overwrite or incremental,
+            shard=shard,
+            queue=queue,
+            suffix=SUFFIXES[fmt],
+            invalid=invalid,
         )
-        content, err = generate_content(prompt)
-        if content is None:
-            failure += 1
-            continue
-        if fmt == "latex":
-            body = convert_markdown_to_latex(content)
-            wrapped = TEX_WRAPPER.format(body=body)
+        if invalid and not quiet:
+            print(f"Skipped {len(invalid)} rows whose names cannot be slugified (first: {invalid[0]!r})")
+        snapshot_file = OUTPUT_DIR / SNAPSHOT_NAME
+        previous = current = diff = None
+        todo: set = set()
+        if incremental:
+            # The snapshot and diff always cover the whole catalogue, so a
+            # window never makes the rows outside it look removed.
+            previous = load_snapshot(snapshot_file)
+            current = build_snapshot(planned)
+            diff = diff_snapshots(previous, current, OUTPUT_DIR, suffix=SUFFIXES[fmt])
+            todo = set(diff["added"] + diff["changed"] + diff["missing"])
+            in_window = set(window.index) if start is not None or limit is not None else None
+            planned = [
+                item
+                for item in planned
+                if item["filename"].stem in todo
+                and (in_window is None or item["row"].name in in_window)
+                and (entries is None or item["filename"].stem in entries)
+            ]
+            orphans = [] if estimate_only else remove_orphans(diff["removed"], OUTPUT_DIR, suffix=SUFFIXES[fmt])
+            if not quiet:
+                print(
+                    f"Catalogue: +{len(diff['added'])} added, ~{len(diff['changed'])} changed, "
+                    f"-{len(diff['removed'])} removed, {len(diff['missing'])} missing, "
+                    f"{len(diff['unchanged'])} unchanged; {len(orphans)} orphaned outputs deleted"
+                )
+        report = dedupe_report(item["prompt"] for item in planned)
+        if not quiet and report["saved"]:
+            print(
+                f"Planned: {report['planned']}, unique prompts: {report['unique']}, "
+                f"API calls saved: {report['saved']}"
+            )
+
+    if shard is not None and queue is not None:
+        # Work our own shard first, then steal whatever is left.
+        index, count = shard
+        planned.sort(key=lambda item: shard_of(item["filename"].stem, count) != index)
+    if queue is not None:
+        queue.start_heartbeat()
+
+    controller = None
+    if adaptive:
+        controller = AIMDController.from_config(load_table(CONFIG_FILE, "concurrency"))
+
+    registry = TemplateRegistry.from_toml(REGISTRY_FILE, base_dir=ROOT)
+
+    projection = estimates = guard = None
+    if estimate_only or budget is not None or token_budget is not None:
+        history_file = JSONL_LOG_FILE.with_name(HISTORY_NAME)
+        stats: Dict[str, dict] = {}
+        if history_file.exists():
+            with RunHistory(history_file) as history:
+                stats = history.prompt_type_stats()
+        projection, estimates = project(
+            planned,
+            registry,
+            stats,
+            default_model=MODEL,
+            # the controller starts at initial_workers and only earns more
+            workers=controller.limit if controller is not None else 1,
+        )
+        if not quiet:
+            print(format_projection(projection))
+        if estimate_only:
+            if queue is not None:
+                queue.stop_heartbeat()
+            if metrics_file:
+                Path(metrics_file).write_text(json.dumps({"projection": projection}, indent=2), encoding="utf-8")
+            return 0
+        guard = Budget(max_cost=budget, max_tokens=token_budget)
+
+    attempts_by_file: Dict[Path, List[dict]] = {}
+    errors: Dict[Path, str] = {}
+    streamed: set = set()
+    metas = {item["filename"]: entry_meta(item["row"]) for item in planned if not item["duplicate"]}
+    log_lock = threading.Lock()
+
+    # The controller gates each API attempt rather than each row, so retries,
+    # backoff sleeps and the model cascade neither hold a slot nor hide
+    # throttling from it.
+    gate = {"controller": controller} if controller is not None else {}
+
+    def tiered_call(prompt: str, target: Path, prompt_type: str) -> Tuple[Optional[str], Optional[str], List[dict]]:
+        if stream:
+            def fn(**opts: object) -> Tuple[Optional[str], Optional[str]]:
+                return generate_content_stream(
+                    prompt, target, fmt=fmt, max_chars=max_chars, meta=metas[target], **gate, **opts
+                )
         else:
-            wrapped = content
-        filename.write_text(wrapped, encoding="utf-8")
+            def fn(**opts: object) -> Tuple[Optional[str], Optional[str]]:
+                return generate_content(prompt, **gate, **opts)
+
+        attempts: List[dict] = []
+        content, err = generate_with_fallback(
+            fn,
+            registry.tier(prompt_type),
+            retries=retries,
+            registry=registry,
+            attempts=attempts,
+        )
+        if stream and content is not None:
+            streamed.add(target)
+        return content, err, attempts
+
+    hedger = None
+    if hedge:
+        hedger = Hedger.from_config(
+            tiered_call,
+            load_table(CONFIG_FILE, "hedging"),
+            is_success=lambda result: result[0] is not None,
+        )
+
+    def call(prompt: str, target: Path, prompt_type: str) -> Tuple[Optional[str], Optional[str]]:
+        if hedger is not None:
+            content, err, attempts = hedger.call(prompt, target, prompt_type)
+        else:
+            content, err, attempts = tiered_call(prompt, target, prompt_type)
+        # Only the attempts of the call whose result is used are kept: the
+        # losing side of a hedge is abandoned and may still be running.
+        attempts_by_file[target] = attempts
+        return content, err
+
+    def budgeted_call(prompt: str, target: Path, prompt_type: str) -> Tuple[Optional[str], Optional[str]]:
+        # Runs once per distinct prompt, inside the coalescer: rows joining
+        # the call reserve nothing, as in the projection.
+        estimate = estimates[prompt]
+        if not guard.admit(estimate):
+            raise BudgetExhausted(prompt)
+        try:
+            return call(prompt, target, prompt_type)
+        finally:
+            guard.settle(estimate, *attempts_usage(attempts_by_file.get(target, [])))
+
+    coalescer = PromptCoalescer(call if guard is None else budgeted_call)
+
+    def process(item: dict) -> str:
+        if item["duplicate"]:
+            return "duplicate"
+        filename = item["filename"]
+        if queue is not None and not queue.claim(filename.stem):
+            return "claimed_elsewhere"
+        try:
+            content, err = coalescer.get(item["prompt"], filename, item["row"]["prompt_type"])
+        except BudgetExhausted:
+            if queue is not None:
+                queue.release(filename.stem)
+            return "over_budget"
+        if content is None:
+            errors[filename] = err or "unknown error"
+            if queue is not None:
+                queue.release(filename.stem)
+            return "failure"
+        if queue is not None and not queue.holds(filename.stem):
+            # Our lease expired and another worker took the entry over.
+            queue.release(filename.stem)
+            return "claimed_elsewhere"
+        if filename not in streamed:
+            links = []
+            if nav is not None and filename.stem in nav:
+                links = [(n.title, n.slug) for n in nav.see_also(filename.stem, see_also)]
+            renderer = renderer_for(fmt)
+            body = convert_markdown_to_latex(content) if fmt == "latex" else renderer.convert(content)
+            wrapped = renderer.wrap(**metas[filename], body=body + renderer.see_also(links))
+            filename.write_text(wrapped, encoding="utf-8")
         if enable_log:
             entry = {"file": filename.name, "status": "success"}
-            if log_format == "jsonl":
-                log_json(entry)
+            if attempts_by_file.get(filename):
+                entry["models"] = attempts_by_file[filename]
+            with log_lock:
+                if log_format == "jsonl":
+                    log_json(entry)
+                else:
+                    print(json.dumps(entry))
+        if queue is not None:
+            queue.complete(filename.stem)
+        return "success"
+
+    with profiler.stage("generate"):
+        try:
+            if controller is None:
+                outcomes = [process(item) for item in planned]
             else:
-                print(json.dumps(entry))
-        success += 1
+                with ThreadPoolExecutor(max_workers=controller.max_workers) as pool:
+                    outcomes = list(pool.map(process, planned))
+        finally:
+            if queue is not None:
+                queue.stop_heartbeat()
+            if hedger is not None:
+                hedger.close()
+    success = outcomes.count("success")
+    failure = outcomes.count("failure")
 
-    if metrics_file:
-        Path(metrics_file).write_text(
-            json.dumps({"success": success, "failure": failure}, indent=2),
-            encoding="utf-8",
-        )
+    with profiler.stage("finish"):
+        if incremental:
+            # Entries to do that did not succeed (failed, over budget, or
+            # left out by the window or ``entries``) keep their previous
+            # hash, or stay out of the snapshot, so the next run picks them
+            # up again.
+            done = {
+                item["filename"].stem
+                for item, outcome in zip(planned, outcomes)
+                if outcome in ("success", "duplicate")
+            }
+            snapshot = {}
+            for key, entry in current.items():
+                if key in done or key not in todo:
+                    snapshot[key] = entry
+                elif previous and key in previous:
+                    snapshot[key] = previous[key]
+            save_snapshot(snapshot_file, snapshot)
+
+        if enable_log:
+            with RunHistory(JSONL_LOG_FILE.with_name(HISTORY_NAME)) as history:
+                history.record_run(
+                    "generate",
+                    history_rows(planned, outcomes, attempts_by_file, errors),
+                    started=run_started,
+                    args={"fmt": fmt, "stream": stream, "adaptive": adaptive, "hedge": hedge, "shard": shard},
+                )
+
+        if metrics_file:
+            metrics = {
+                "success": success,
+                "failure": failure,
+                "api_calls": coalescer.calls,
+                "api_calls_saved": report["saved"],
+                "claimed_elsewhere": outcomes.count("claimed_elsewhere"),
+                "invalid_rows": len(invalid),
+                "models": summarize_attempts(attempts_by_file.values()),
+            }
+            if controller is not None:
+                metrics["concurrency"] = controller.metrics()
+            if hedger is not None:
+                metrics["hedging"] = hedger.metrics()
+            if diff is not None:
+                metrics["catalogue"] = {name: len(keys) for name, keys in diff.items()}
+            if guard is not None:
+                metrics["projection"] = projection
+                metrics["budget"] = guard.metrics()
+            Path(metrics_file).write_text(json.dumps(metrics, indent=2), encoding="utf-8")
     if not quiet:
         print(f"Processed: {len(rows)}, ✓ {success}, ✗ {failure}")
+        if guard is not None and guard.exhausted:
+            spent = f"${guard.cost:.4f}, {guard.tokens:,} tokens"
+            print(f"Budget reached ({spent}): {outcomes.count('over_budget')} rows not started")
+    if profiler.enabled:
+        summary_path = profiler.write_summary()
+        if not quiet:
+            print(f"Profile written to {summary_path.parent}")
+            for line in profiler.report():
+                print(f"  {line}")
     return 0 if failure == 0 else 1
 
 
-if __name__ == "__main__":
-    import sys
-
-    p = argparse.ArgumentParser(description="Generate encyclopedia entries")
+def parse_args(argv: Sequence[str] | None = None, prog: str | None = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(prog=prog, description="Generate encyclopedia entries")
     p.add_argument("--log", default="true", help="Enable structured logging")
     p.add_argument("--skip-existing", action="store_true", help="Skip if output file exists")
     p.add_argument("--overwrite", action="store_true", help="Overwrite existing output")
     p.add_argument("--log-format", choices=["jsonl", "text"], default="jsonl", help="Log output format")
     p.add_argument("--metrics-json", default=None, help="Optional path to write run metrics as JSON")
     p.add_argument("--quiet", action="store_true", help="Suppress progress output")
-    p.add_argument("--format", choices=["latex", "html"], default="latex", help="Output format")
+    p.add_argument("--format", choices=sorted(SUFFIXES), default="latex", help="Output format (html writes .html pages for the weasyprint backend)")
     p.add_argument("--start", type=int, help="Override start_index from config")
     p.add_argument("--limit", type=int, help="Override max_entries from config")
-    p.add_argument("--retries", type=int, default=3, help="Retry count for API calls")
-    args = p.parse_args()
+    p.add_argument("--retries", type=int, help="API attempts per model (default: the tier's retries, else 3)")
+    p.add_argument("--shard", type=parse_shard, help="Only generate shard i of N rows (format i/N)")
+    p.add_argument("--queue-dir", help="Shared directory of lease files for multi-host runs")
+    p.add_argument("--lease-ttl", type=float, default=DEFAULT_LEASE_TTL, help="Seconds before an unrenewed lease can be stolen")
+    p.add_argument("--stream", action="store_true", help="Stream responses and cancel off-format ones early")
+    p.add_argument("--max-chars", type=int, help="Cancel streamed responses longer than this")
+    p.add_argument("--hedge", action="store_true", help="Duplicate slow API calls within the [hedging] budget")
+    p.add_argument("--adaptive", action="store_true", help="Run rows concurrently under the AIMD controller ([concurrency] in config)")
+    p.add_argument("--incremental", action="store_true", help="Only generate catalogue rows added or changed since the last run")
+    p.add_argument("--profile", nargs="?", const=str(LOGS_DIR / "profile"), metavar="DIR", help="Profile each stage into DIR (default logs/profile)")
+    p.add_argument("--see-also", type=int, default=0, metavar="N", help="End each entry with links to up to N sibling entries")
+    p.add_argument("--estimate", action="store_true", help="Project tokens, cost and wall time of the planned rows, then exit")
+    p.add_argument("--budget", type=float, metavar="USD", help="Stop starting rows once projected spend would exceed USD")
+    p.add_argument("--token-budget", type=int, metavar="N", help="Stop starting rows once projected tokens would exceed N")
+    return p.parse_args(argv)
 
+
+def cli(argv: Sequence[str] | None = None, prog: str | None = None) -> int:
+    """Parse command line *argv* and run :func:`main`."""
+    args = parse_args(argv, prog)
     _enable = str(args.log).lower() not in {"false", "0", "no"}
-    sys.exit(
-        main(
-            enable_log=_enable,
-            skip_existing=args.skip_existing,
-            overwrite=args.overwrite,
-            log_format=args.log_format,
-            metrics_file=args.metrics_json,
-            quiet=args.quiet,
-            fmt=args.format,
-            start=args.start,
-            limit=args.limit,
-            retries=args.retries,
-        )
+    return main(
+        enable_log=_enable,
+        skip_existing=args.skip_existing,
+        overwrite=args.overwrite,
+        log_format=args.log_format,
+        metrics_file=args.metrics_json,
+        quiet=args.quiet,
+        fmt=args.format,
+        start=args.start,
+        limit=args.limit,
+        retries=args.retries,
+        shard=args.shard,
+        queue_dir=args.queue_dir,
+        lease_ttl=args.lease_ttl,
+        stream=args.stream,
+        max_chars=args.max_chars,
+        adaptive=args.adaptive,
+        hedge=args.hedge,
+        incremental=args.incremental,
+        profile=args.profile,
+        see_also=args.see_also,
+        budget=args.budget,
+        token_budget=args.token_budget,
+        estimate_only=args.estimate,
     )
 
+
+def render_cli(argv: Sequence[str] | None = None, prog: str | None = None) -> int:
+    """Render the prompts :func:`main` would send, without calling the API."""
+    import pandas as pd
+
+    p = argparse.ArgumentParser(prog=prog, description="Render prompts for planned rows")
+    p.add_argument("--start", type=int, help="Override start_index from config")
+    p.add_argument("--limit", type=int, help="Override max_entries from config")
+    p.add_argument("--out", help="Write one <entry>.prompt.txt per row here instead of printing")
+    args = p.parse_args(argv)
+
+    start_idx, max_entries, data_file = load_config(CONFIG_FILE)
+    if args.start is not None:
+        start_idx = args.start
+    if args.limit is not None:
+        max_entries = args.limit
+    rows = pd.read_csv(data_file).iloc[start_idx : start_idx + max_entries]
+    planned = plan_rows(rows, skip_existing=False, overwrite=True)
+
+    out_dir = Path(args.out) if args.out else None
+    if out_dir is not None:
+        out_dir.mkdir(parents=True, exist_ok=True)
+    for item in planned:
+        if item["duplicate"]:
+            continue
+        if out_dir is not None:
+            target = out_dir / f"{item['filename'].stem}.prompt.txt"
+            target.write_text(item["prompt"], encoding="utf-8")
+        else:
+            print(f"### {item['filename'].name}\n{item['prompt']}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(cli())
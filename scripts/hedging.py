@@ -0,0 +1,133 @@
+"""Hedged requests: race a duplicate call against a slow one."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Generic, Optional, TypeVar
+
+try:
+    from .concurrency import percentile
+except ImportError:  # pragma: no cover
+    from concurrency import percentile
+
+T = TypeVar("T")
+
+#: defaults for the ``[hedging]`` table in ``config.toml``
+HEDGING_DEFAULTS: Dict[str, float] = {
+    "percentile": 95.0,
+    "budget": 0.05,
+    "min_samples": 20,
+    "window": 200,
+}
+
+
+class Hedger(Generic[T]):
+    """Issue a duplicate of a call that outlives recent latency percentiles.
+
+    Once ``min_samples`` latencies are known, a call still running after the
+    ``percentile`` of the last ``window`` latencies gets a second, identical
+    call; the first successful result wins. Hedges are capped at ``budget``
+    times the number of primary calls. Python threads cannot be interrupted,
+    so the losing call is cancelled if it has not started yet and otherwise
+    abandoned: its result is discarded.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[..., T],
+        *,
+        percentile: float = 95.0,
+        budget: float = 0.05,
+        min_samples: int = 20,
+        window: int = 200,
+        is_success: Callable[[T], bool] = lambda result: True,
+        max_workers: int = 32,
+    ) -> None:
+        self._fn = fn
+        self.percentile = float(percentile)
+        self.budget = float(budget)
+        self.min_samples = int(min_samples)
+        self.is_success = is_success
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._latencies: Deque[float] = deque(maxlen=int(window))
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+
+    @classmethod
+    def from_config(cls, fn: Callable[..., T], cfg: Dict[str, float], **kwargs: Any) -> "Hedger[T]":
+        settings = {**HEDGING_DEFAULTS, **cfg}
+        return cls(fn, **{k: settings[k] for k in HEDGING_DEFAULTS}, **kwargs)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or ``None`` while still warming up."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            return percentile(list(self._latencies), self.percentile)
+
+    def _submit(self, args: tuple) -> Future:
+        started = time.monotonic()
+        future = self._pool.submit(self._fn, *args)
+
+        def record(f: Future) -> None:
+            # Only successes set the percentile: fast failures such as 429s
+            # would pull it down and spend the hedge budget on throttling.
+            if not f.cancelled() and f.exception() is None and self.is_success(f.result()):
+                with self._lock:
+                    self._latencies.append(time.monotonic() - started)
+
+        future.add_done_callback(record)
+        return future
+
+    def _take_budget(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.budget * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def call(self, *args: Any) -> T:
+        with self._lock:
+            self.requests += 1
+        delay = self.hedge_delay()
+        primary = self._submit(args)
+        if delay is None:
+            return primary.result()
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._take_budget():
+            return primary.result()
+
+        hedge = self._submit(args)
+        pending = {primary, hedge}
+        first: Optional[Future] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if first is None:
+                    first = future
+                if future.exception() is None and self.is_success(future.result()):
+                    for other in pending:
+                        other.cancel()
+                    if future is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+        # Neither succeeded: report whichever finished first.
+        return first.result()
+
+    def metrics(self) -> dict:
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "budget": self.budget,
+            "percentile": self.percentile,
+        }
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
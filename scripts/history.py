@@ -0,0 +1,281 @@
+"""SQLite run history of per-row generation and compile telemetry."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence
+
+try:
+    from .concurrency import error_class
+except ImportError:  # pragma: no cover
+    from concurrency import error_class
+
+if TYPE_CHECKING:  # pragma: no cover
+    import sqlite3
+
+# sqlite3 and statistics are imported when a history is opened or queried:
+# generate and compile_pdf import this module, and their --help must stay
+# fast.
+
+ROOT = Path(__file__).resolve().parent.parent
+HISTORY_NAME = "history.sqlite"
+HISTORY_FILE = ROOT / "logs" / HISTORY_NAME
+
+#: columns of the ``rows`` table, in insertion order
+ROW_COLUMNS = (
+    "entry",
+    "stage",
+    "prompt_type",
+    "status",
+    "error_class",
+    "error",
+    "latency",
+    "attempts",
+    "engine",
+    "prompt_tokens",
+    "completion_tokens",
+    "cost",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    command TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL,
+    args TEXT
+);
+CREATE TABLE IF NOT EXISTS rows (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    entry TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    prompt_type TEXT,
+    status TEXT NOT NULL,
+    error_class TEXT,
+    error TEXT,
+    latency REAL,
+    attempts INTEGER,
+    engine TEXT,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    cost REAL
+);
+CREATE INDEX IF NOT EXISTS runs_command ON runs(command, id);
+CREATE INDEX IF NOT EXISTS rows_run_stage ON rows(run_id, stage);
+CREATE INDEX IF NOT EXISTS rows_entry ON rows(stage, entry, run_id);
+"""
+
+class RunHistory:
+    """Append-only store of runs and their per-row records."""
+
+    def __init__(self, path: Path = HISTORY_FILE) -> None:
+        import sqlite3
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(str(path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self) -> "RunHistory":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def record_run(self, command: str, rows: Iterable[dict], *, started: float, args: Optional[dict] = None) -> int:
+        """Store one finished run of *command* with its *rows*; return the run id."""
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO runs (command, started, finished, args) VALUES (?, ?, ?, ?)",
+                (command, started, time.time(), json.dumps(args or {}, default=str)),
+            )
+            run_id = cur.lastrowid
+            self.conn.executemany(
+                f"INSERT INTO rows (run_id, {', '.join(ROW_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' for _ in ROW_COLUMNS)})",
+                [(run_id, *(row.get(col) for col in ROW_COLUMNS)) for row in rows],
+            )
+        return run_id
+
+    def runs(self, command: Optional[str] = None, limit: int = 20) -> List[dict]:
+        """Most recent runs first, with their row and failure counts."""
+        query = (
+            "SELECT runs.id, command, started, finished, COUNT(rows.run_id) AS rows, "
+            "SUM(rows.status = 'failure') AS failures "
+            "FROM runs LEFT JOIN rows ON rows.run_id = runs.id"
+        )
+        params: list = []
+        if command:
+            query += " WHERE command = ?"
+            params.append(command)
+        query += " GROUP BY runs.id ORDER BY runs.id DESC LIMIT ?"
+        params.append(limit)
+        return [dict(r) for r in self.conn.execute(query, params)]
+
+    def prompt_type_stats(self, runs: int = 20) -> Dict[str, dict]:
+        """Median completion tokens and latency of successful rows per prompt type.
+
+        Only the last *runs* generation runs are read.
+        """
+        import statistics
+
+        run_ids = self._latest("generate", limit=runs)
+        if not run_ids:
+            return {}
+        marks = ", ".join("?" for _ in run_ids)
+        samples: Dict[str, Dict[str, List[float]]] = {}
+        for r in self.conn.execute(
+            f"SELECT prompt_type, completion_tokens, latency FROM rows "
+            f"WHERE run_id IN ({marks}) AND stage = 'generate' AND status = 'success' "
+            f"AND prompt_type IS NOT NULL",
+            run_ids,
+        ):
+            by_type = samples.setdefault(r["prompt_type"], {"completion_tokens": [], "latency": []})
+            for key in ("completion_tokens", "latency"):
+                if r[key] is not None:
+                    by_type[key].append(r[key])
+        return {
+            prompt_type: {
+                "samples": max(len(v) for v in values.values()),
+                **{key: statistics.median(v) if v else None for key, v in values.items()},
+            }
+            for prompt_type, values in samples.items()
+        }
+
+    def _latest(self, command: str, before: Optional[int] = None, limit: int = 1) -> List[int]:
+        query = "SELECT id FROM runs WHERE command = ?"
+        params: list = [command]
+        if before is not None:
+            query += " AND id < ?"
+            params.append(before)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        return [r[0] for r in self.conn.execute(query, params)]
+
+    def _rows(self, run_ids: Sequence[int], stage: str) -> List[sqlite3.Row]:
+        marks = ", ".join("?" for _ in run_ids)
+        return self.conn.execute(
+            f"SELECT run_id, entry, status, latency, error_class FROM rows "
+            f"WHERE run_id IN ({marks}) AND stage = ? ORDER BY run_id",
+            (*run_ids, stage),
+        ).fetchall()
+
+    def compare(
+        self,
+        command: str,
+        *,
+        run: Optional[int] = None,
+        window: int = 5,
+        latency_ratio: float = 1.5,
+        min_latency: float = 1.0,
+    ) -> dict:
+        """Compare *run* (default: the latest) with the *window* runs before it.
+
+        An entry regresses on latency when it is both ``latency_ratio`` times
+        and ``min_latency`` seconds slower than its median over the window,
+        and on failure when it fails now but succeeded the last time it ran.
+        """
+        import statistics
+
+        if run is None:
+            latest = self._latest(command)
+            if not latest:
+                raise ValueError(f"no {command!r} runs recorded")
+            run = latest[0]
+        baseline_ids = self._latest(command, before=run, limit=window)
+        result: dict = {"run": run, "baseline": baseline_ids, "latency": [], "failures": [], "fixed": []}
+        if not baseline_ids:
+            return result
+
+        latencies: Dict[str, List[float]] = {}
+        last_status: Dict[str, str] = {}
+        for row in self._rows(baseline_ids, command):
+            if row["status"] == "success" and row["latency"] is not None:
+                latencies.setdefault(row["entry"], []).append(row["latency"])
+            if row["status"] in ("success", "failure"):
+                last_status[row["entry"]] = row["status"]
+
+        for row in self._rows([run], command):
+            entry, status = row["entry"], row["status"]
+            before = last_status.get(entry)
+            if status == "failure" and before == "success":
+                result["failures"].append({"entry": entry, "error_class": row["error_class"]})
+            elif status == "success" and before == "failure":
+                result["fixed"].append({"entry": entry})
+            if status == "success" and row["latency"] is not None and entry in latencies:
+                median = statistics.median(latencies[entry])
+                if row["latency"] > median * latency_ratio and row["latency"] - median > min_latency:
+                    result["latency"].append(
+                        {"entry": entry, "latency": row["latency"], "baseline": round(median, 3)}
+                    )
+        result["latency"].sort(key=lambda r: r["latency"] / max(r["baseline"], 1e-9), reverse=True)
+        return result
+
+
+def parse_args(argv: Sequence[str] | None = None, prog: str | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog=prog, description="Report latency and failure regressions between runs")
+    parser.add_argument("--db", default=str(HISTORY_FILE), help="Run history database")
+    parser.add_argument("--stage", choices=["generate", "compile"], default="generate", help="Which runs to compare")
+    parser.add_argument("--run", type=int, help="Run id to check (default: latest)")
+    parser.add_argument("--window", type=int, default=5, help="Number of earlier runs forming the baseline")
+    parser.add_argument("--latency-ratio", type=float, default=1.5, help="Slowdown factor counted as a regression")
+    parser.add_argument("--min-latency", type=float, default=1.0, help="Ignore slowdowns smaller than this many seconds")
+    parser.add_argument("--list", action="store_true", help="List recent runs instead of comparing")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None, prog: str | None = None) -> int:
+    """Print regressions of the latest run; exit 1 if there are any."""
+    args = parse_args(argv, prog)
+    path = Path(args.db)
+    if not path.exists():
+        print(f"No run history at {path}")
+        return 0
+    with RunHistory(path) as history:
+        if args.list:
+            runs = history.runs(args.stage)
+            if args.json:
+                print(json.dumps(runs, indent=2))
+            for r in [] if args.json else runs:
+                when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(r["started"]))
+                print(f"#{r['id']:<6} {r['command']:<9} {when}  {r['rows']} rows, {r['failures'] or 0} failed")
+            return 0
+        try:
+            report = history.compare(
+                args.stage,
+                run=args.run,
+                window=args.window,
+                latency_ratio=args.latency_ratio,
+                min_latency=args.min_latency,
+            )
+        except ValueError as e:
+            print(e)
+            return 0
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        baseline = ", ".join(f"#{i}" for i in report["baseline"]) or "none"
+        print(f"Run #{report['run']} ({args.stage}) against {baseline}")
+        for r in report["failures"]:
+            print(f"  FAILING  {r['entry']} ({r['error_class']})")
+        for r in report["latency"]:
+            print(f"  SLOWER   {r['entry']}: {r['latency']:.2f}s vs median {r['baseline']:.2f}s")
+        for r in report["fixed"]:
+            print(f"  fixed    {r['entry']}")
+        print(f"{len(report['failures'])} new failures, {len(report['latency'])} latency regressions")
+    return 1 if report["failures"] or report["latency"] else 0
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(main())
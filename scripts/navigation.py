@@ -0,0 +1,292 @@
+"""Navigation tree and cross-link index built from the topic catalogue."""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    from .utils import slug_part
+except ImportError:  # pragma: no cover
+    from utils import slug_part
+
+ROOT = Path(__file__).resolve().parent.parent
+NAV_FILE = ROOT / "src" / "data" / "navigation.json"
+NAV_VERSION = 1
+LEVELS = ("domain", "topic", "subtopic")
+
+
+@dataclass
+class NavNode:
+    """One domain, topic or subtopic of the catalogue."""
+
+    id: str
+    slug: str
+    title: str
+    level: str
+    parent: Optional[str]
+    index: int
+    children: List[str] = field(default_factory=list)
+    ref: Optional[str] = None
+    prompt_type: Optional[str] = None
+
+
+def _title_key(title: str) -> str:
+    return " ".join(title.lower().split())
+
+
+def catalogue_hash(path: Path) -> str:
+    """Version of the catalogue at *path*: a hash of its bytes."""
+    return hashlib.sha256(path.read_bytes()).hexdigest()[:16]
+
+
+class NavigationIndex:
+    """Domain → topic → subtopic tree with parent pointers and sibling order.
+
+    Ids are slash-joined slugs (``algebra/groups/subgroups``) and so stay
+    stable when rows are reordered; slugs are the output file stems
+    (``algebra-groups-subgroups`` for entries). Both resolve in O(1).
+    """
+
+    def __init__(self, nodes: Dict[str, NavNode], roots: List[str], catalogue: str = "") -> None:
+        self.nodes = nodes
+        self.roots = roots
+        self.catalogue = catalogue
+        self._by_slug = {node.slug: node for node in nodes.values()}
+        self._by_title: Dict[str, Optional[NavNode]] = {}
+        for node in self.entries():
+            key = _title_key(node.title)
+            # Titles shared by several entries are ambiguous and not linked.
+            self._by_title[key] = None if key in self._by_title else node
+        self._mention_re: Optional[re.Pattern] = None
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict], catalogue: str = "") -> "NavigationIndex":
+        """Build the tree from catalogue rows, keeping their order.
+
+        Node slugs follow the output file stems (see :func:`utils.entry_stem`),
+        so rows with a name without letters or digits never produce an entry
+        and are left out; rows repeating an entry add nothing.
+        """
+        nodes: Dict[str, NavNode] = {}
+        roots: List[str] = []
+        for row in rows:
+            try:
+                slugs = [slug_part(row[level]) for level in LEVELS]
+            except ValueError:
+                continue
+            parent: Optional[NavNode] = None
+            for depth, level in enumerate(LEVELS):
+                node_id = "/".join(slugs[: depth + 1])
+                if node_id not in nodes:
+                    siblings = parent.children if parent else roots
+                    nodes[node_id] = NavNode(
+                        id=node_id,
+                        slug="-".join(slugs[: depth + 1]),
+                        title=str(row[level]),
+                        level=level,
+                        parent=parent.id if parent else None,
+                        index=len(siblings),
+                    )
+                    siblings.append(node_id)
+                parent = nodes[node_id]
+            ref = row.get("id")
+            if parent.ref is None and ref is not None and ref == ref:  # NaN from pandas
+                parent.ref = str(ref)
+                parent.prompt_type = row.get("prompt_type")
+        return cls(nodes, roots, catalogue)
+
+    @classmethod
+    def from_csv(cls, path: Path) -> "NavigationIndex":
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        return cls.from_rows(rows, catalogue_hash(path))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "NavigationIndex":
+        nodes = {node_id: NavNode(id=node_id, **node) for node_id, node in data["nodes"].items()}
+        return cls(nodes, data["roots"], data.get("catalogue", ""))
+
+    def to_dict(self, href_prefix: Optional[str] = None) -> dict:
+        """JSON form: flat ``nodes`` by id plus a nested ``tree`` for the sidebar."""
+        nodes = {}
+        for node_id, node in self.nodes.items():
+            data = asdict(node)
+            del data["id"]
+            nodes[node_id] = data
+        return {
+            "version": NAV_VERSION,
+            "catalogue": self.catalogue,
+            "href_prefix": href_prefix,
+            "roots": self.roots,
+            "nodes": nodes,
+            "tree": self.sidebar_tree(href_prefix),
+        }
+
+    def save(self, path: Path, href_prefix: Optional[str] = None) -> None:
+        """Atomically write the JSON form to *path*."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        data = self.to_dict(href_prefix)
+        tmp.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def node(self, key: str) -> NavNode:
+        """Look up a node by id or slug."""
+        node = self.nodes.get(key) or self._by_slug.get(key)
+        if node is None:
+            raise KeyError(key)
+        return node
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.nodes or key in self._by_slug
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def entries(self) -> Iterable[NavNode]:
+        return (node for node in self.nodes.values() if node.level == "subtopic")
+
+    def children(self, key: str) -> List[NavNode]:
+        return [self.nodes[child] for child in self.node(key).children]
+
+    def siblings(self, key: str) -> List[NavNode]:
+        """The nodes sharing *key*'s parent, in catalogue order, itself included."""
+        node = self.node(key)
+        ids = self.nodes[node.parent].children if node.parent else self.roots
+        return [self.nodes[i] for i in ids]
+
+    def breadcrumbs(self, key: str) -> List[NavNode]:
+        """Ancestors of *key* from its domain down to the node itself."""
+        trail = [self.node(key)]
+        while trail[-1].parent is not None:
+            trail.append(self.nodes[trail[-1].parent])
+        return trail[::-1]
+
+    def neighbours(self, key: str) -> Tuple[Optional[NavNode], Optional[NavNode]]:
+        """Previous and next sibling of *key*."""
+        node = self.node(key)
+        siblings = self.siblings(key)
+        before = siblings[node.index - 1] if node.index > 0 else None
+        after = siblings[node.index + 1] if node.index + 1 < len(siblings) else None
+        return before, after
+
+    def see_also(self, key: str, limit: int = 5) -> List[NavNode]:
+        """Up to *limit* siblings of *key*, nearest in catalogue order first."""
+        node = self.node(key)
+        siblings = self.siblings(key)
+        ranked = sorted(
+            (s for s in siblings if s.id != node.id),
+            key=lambda s: (abs(s.index - node.index), s.index),
+        )
+        return ranked[:limit]
+
+    def resolve(self, title: str) -> Optional[NavNode]:
+        """The entry titled *title* (case and spacing ignored), unless ambiguous."""
+        return self._by_title.get(_title_key(title))
+
+    def mentions(self, text: str, exclude: Optional[str] = None) -> List[NavNode]:
+        """Entries whose title appears in *text*, in order of first mention."""
+        if self._mention_re is None:
+            titles = sorted((k for k, n in self._by_title.items() if n is not None), key=len, reverse=True)
+            if not titles:
+                return []
+            pattern = "|".join(r"\s+".join(map(re.escape, t.split())) for t in titles)
+            self._mention_re = re.compile(rf"\b(?:{pattern})\b", re.IGNORECASE)
+        skip = self.node(exclude).id if exclude else None
+        found: Dict[str, NavNode] = {}
+        for m in self._mention_re.finditer(text):
+            node = self._by_title.get(_title_key(m.group()))
+            if node is not None and node.id != skip:
+                found.setdefault(node.id, node)
+        return list(found.values())
+
+    def sidebar_tree(self, href_prefix: Optional[str] = None) -> List[dict]:
+        """Nested ``{id, label, href?, children?}`` items for ``SidebarTree``.
+
+        Entries link to ``<href_prefix><slug>`` when a prefix is given.
+        """
+
+        def item(node_id: str) -> dict:
+            node = self.nodes[node_id]
+            data: dict = {"id": node.id, "label": node.title}
+            if href_prefix is not None and node.level == "subtopic":
+                data["href"] = f"{href_prefix}{node.slug}"
+            if node.children:
+                data["children"] = [item(child) for child in node.children]
+            return data
+
+        return [item(root) for root in self.roots]
+
+
+def load_or_build(
+    csv_path: Path,
+    path: Path = NAV_FILE,
+    *,
+    href_prefix: Optional[str] = None,
+    force: bool = False,
+) -> Tuple[NavigationIndex, bool]:
+    """Load the index saved at *path*, rebuilding it if the catalogue or
+    *href_prefix* changed.
+
+    Returns the index and whether it was (re)built.
+    """
+    version = catalogue_hash(csv_path)
+    if path.exists() and not force:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if (
+            data.get("version") == NAV_VERSION
+            and data.get("catalogue") == version
+            and data.get("href_prefix") == href_prefix
+        ):
+            return NavigationIndex.from_dict(data), False
+    index = NavigationIndex.from_csv(csv_path)
+    index.save(path, href_prefix)
+    return index, True
+
+
+def parse_args(argv: Sequence[str] | None = None, prog: str | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog=prog, description="Build the navigation tree and cross-link index")
+    parser.add_argument("--csv", help="Catalogue CSV (default: data_file from config)")
+    parser.add_argument("--out", default=str(NAV_FILE), help="JSON file read by the site")
+    parser.add_argument("--href-prefix", help="Link entries in the sidebar tree to <prefix><slug>")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the catalogue is unchanged")
+    parser.add_argument("--quiet", action="store_true", help="Suppress output")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None, prog: str | None = None) -> int:
+    args = parse_args(argv, prog)
+    if args.csv:
+        csv_path = Path(args.csv)
+    else:
+        try:
+            from . import generate
+        except ImportError:  # pragma: no cover
+            import generate
+        csv_path = generate.load_config(generate.CONFIG_FILE)[2]
+    out = Path(args.out)
+    index, built = load_or_build(csv_path, out, href_prefix=args.href_prefix, force=args.force)
+    if not args.quiet:
+        counts = {level: 0 for level in LEVELS}
+        for node in index.nodes.values():
+            counts[node.level] += 1
+        state = "written to" if built else "up to date in"
+        print(
+            f"Navigation: {counts['domain']} domains, {counts['topic']} topics, "
+            f"{counts['subtopic']} entries {state} {out}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(main())
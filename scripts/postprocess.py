@@ -0,0 +1,241 @@
+"""Post-compile stage: recompress PDFs and assemble per-domain volumes."""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    from . import generate
+    from .utils import entry_stem, slug_part
+except ImportError:  # pragma: no cover
+    import generate
+    from utils import entry_stem, slug_part
+
+ROOT = Path(__file__).resolve().parent.parent
+PDF_DIR = ROOT / "pdf_output"
+VOLUME_DIR = ROOT / "volumes"
+
+#: domain -> topic -> [(subtopic, entry stem)], in catalogue order
+Taxonomy = Dict[str, Dict[str, List[Tuple[str, str]]]]
+
+
+def _write_atomic(writer, dest: Path) -> int:
+    """Write *writer* next to *dest* and move it into place; return its size."""
+    tmp = dest.with_name(f".{dest.name}.tmp")
+    with tmp.open("wb") as f:
+        writer.write(f)
+    size = tmp.stat().st_size
+    os.replace(tmp, dest)
+    return size
+
+
+def recompress_pdf(path: Path) -> Tuple[str, int, int]:
+    """Compress content streams and merge identical objects of *path* in place.
+
+    The file is only replaced when the result is smaller. Returns
+    ``(name, bytes_before, bytes_after)``.
+    """
+    from pypdf import PdfWriter
+
+    before = path.stat().st_size
+    writer = PdfWriter(clone_from=path)
+    for page in writer.pages:
+        page.compress_content_streams()
+    writer.compress_identical_objects()
+    tmp = path.with_name(f".{path.name}.tmp")
+    with tmp.open("wb") as f:
+        writer.write(f)
+    after = tmp.stat().st_size
+    if after < before:
+        os.replace(tmp, path)
+    else:
+        tmp.unlink()
+        after = before
+    return path.name, before, after
+
+
+def recompress_all(paths: Sequence[Path], jobs: Optional[int] = None) -> dict:
+    """Recompress *paths* on a process pool and summarise the savings."""
+    started = time.perf_counter()
+    if jobs == 1:
+        results = [recompress_pdf(p) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(recompress_pdf, paths))
+    before = sum(r[1] for r in results)
+    after = sum(r[2] for r in results)
+    return {
+        "files": len(results),
+        "bytes_before": before,
+        "bytes_after": after,
+        "saved_pct": round(100 * (before - after) / before, 1) if before else 0.0,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def load_taxonomy(csv_path: Path) -> Taxonomy:
+    """Group catalogue rows by domain and topic, keeping CSV order.
+
+    Rows with a name without letters or digits never produce an entry and
+    are left out.
+    """
+    taxonomy: Taxonomy = {}
+    seen = set()
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                stem = entry_stem(row["domain"], row["topic"], row["subtopic"])
+            except ValueError:
+                continue
+            if stem in seen:
+                continue
+            seen.add(stem)
+            topics = taxonomy.setdefault(row["domain"], {})
+            topics.setdefault(row["topic"], []).append((row["subtopic"], stem))
+    return taxonomy
+
+
+def assemble_volume(
+    domain: str,
+    topics: Dict[str, List[Tuple[str, str]]],
+    pdf_dir: Path,
+    dest: Path,
+) -> dict:
+    """Concatenate a domain's entry PDFs into *dest* with a topic/subtopic outline.
+
+    The writer keeps every copied page and its resources until the volume
+    is written, so memory grows with the domain; domains run in separate
+    processes and are freed once written. Fonts and images repeated across
+    entries are merged before writing.
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    started = time.perf_counter()
+    writer = PdfWriter()
+    writer.add_metadata({"/Title": domain})
+    entries = missing = bytes_in = 0
+    for topic, subtopics in topics.items():
+        parent = None
+        for subtopic, stem in subtopics:
+            path = pdf_dir / f"{stem}.pdf"
+            if not path.exists():
+                missing += 1
+                continue
+            first_page = len(writer.pages)
+            reader = PdfReader(path)
+            for page in reader.pages:
+                writer.add_page(page)
+            if parent is None:
+                parent = writer.add_outline_item(topic, first_page)
+            writer.add_outline_item(subtopic, first_page, parent=parent)
+            entries += 1
+            bytes_in += path.stat().st_size
+    pages = len(writer.pages)
+    bytes_out = 0
+    if pages:
+        writer.compress_identical_objects()
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        bytes_out = _write_atomic(writer, dest)
+    seconds = time.perf_counter() - started
+    return {
+        "domain": domain,
+        "file": dest.name if pages else None,
+        "entries": entries,
+        "missing": missing,
+        "pages": pages,
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_out,
+        "seconds": round(seconds, 3),
+        "pages_per_second": round(pages / seconds, 1) if seconds else None,
+        "mb_per_second": round(bytes_in / 1e6 / seconds, 2) if seconds else None,
+    }
+
+
+def _assemble(args: Tuple[str, Dict[str, List[Tuple[str, str]]], Path, Path]) -> dict:
+    return assemble_volume(*args)
+
+
+def assemble_volumes(
+    taxonomy: Taxonomy,
+    pdf_dir: Path,
+    volume_dir: Path,
+    *,
+    domains: Optional[Iterable[str]] = None,
+    jobs: Optional[int] = None,
+) -> List[dict]:
+    """Write one volume per domain (optionally only *domains*) in parallel."""
+    wanted = set(domains) if domains else None
+    tasks = [
+        (domain, topics, pdf_dir, volume_dir / f"{slug_part(domain)}.pdf")
+        for domain, topics in taxonomy.items()
+        if wanted is None or domain in wanted
+    ]
+    if jobs == 1:
+        return [_assemble(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(_assemble, tasks))
+
+
+def _mb(n: int) -> str:
+    return f"{n / 1e6:.2f} MB"
+
+
+def parse_args(argv: Sequence[str] | None = None, prog: str | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog=prog, description="Recompress PDFs and assemble per-domain volumes")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--csv", help="Catalogue CSV (default: data_file from config)")
+    parser.add_argument("--out", default=str(VOLUME_DIR), help="Directory for the assembled volumes")
+    parser.add_argument("--domain", action="append", help="Only assemble this domain (repeatable)")
+    parser.add_argument("--no-recompress", action="store_true", help="Skip recompressing entry PDFs")
+    parser.add_argument("--no-volumes", action="store_true", help="Skip assembling volumes")
+    parser.add_argument("--metrics-json", help="Optional path to write the report as JSON")
+    parser.add_argument("--quiet", action="store_true", help="Suppress progress output")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None, prog: str | None = None) -> int:
+    args = parse_args(argv, prog)
+    report: dict = {}
+
+    if not args.no_recompress:
+        paths = sorted(PDF_DIR.glob("*.pdf"))
+        report["recompress"] = r = recompress_all(paths, args.jobs)
+        if not args.quiet:
+            print(
+                f"Recompressed {r['files']} PDFs: {_mb(r['bytes_before'])} -> {_mb(r['bytes_after'])} "
+                f"(-{r['saved_pct']}%) in {r['seconds']}s"
+            )
+
+    if not args.no_volumes:
+        csv_path = Path(args.csv) if args.csv else generate.load_config(generate.CONFIG_FILE)[2]
+        volumes = assemble_volumes(
+            load_taxonomy(csv_path), PDF_DIR, Path(args.out), domains=args.domain, jobs=args.jobs
+        )
+        report["volumes"] = volumes
+        if not args.quiet:
+            for v in volumes:
+                if not v["pages"]:
+                    print(f"{v['domain']}: no compiled entries ({v['missing']} missing)")
+                    continue
+                print(
+                    f"{v['file']}: {v['pages']} pages from {v['entries']} entries "
+                    f"({v['missing']} missing), {_mb(v['bytes_in'])} -> {_mb(v['bytes_out'])}, "
+                    f"{v['pages_per_second']} pages/s, {v['mb_per_second']} MB/s"
+                )
+
+    if args.metrics_json:
+        Path(args.metrics_json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Per-stage cProfile hooks with wall/CPU timings and flamegraph output."""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover
+    import cProfile
+    import pstats
+
+# cProfile and pstats are only imported once a stage is actually profiled.
+
+MAX_DEPTH = 64
+#: paths carrying less time than this are not expanded further
+MIN_SECONDS = 1e-6
+
+Func = Tuple[str, int, str]
+
+
+def _label(func: Func) -> str:
+    filename, lineno, name = func
+    if filename == "~":
+        label = name
+    else:
+        label = f"{name} ({os.path.basename(filename)}:{lineno})"
+    return label.replace(";", ",").replace(" ", "_")
+
+
+def collapsed_stacks(stats: pstats.Stats) -> Dict[str, int]:
+    """Fold *stats* into ``{"a;b;c": microseconds}`` for flamegraph tools.
+
+    cProfile only keeps caller/callee pairs, so a function's time is split
+    across the paths leading to it in proportion to each caller's share.
+    Recursive edges are cut.
+    """
+    raw = stats.stats  # type: ignore[attr-defined]
+    callees: Dict[Func, Dict[Func, float]] = defaultdict(dict)
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees[caller][func] = edge[3]
+    folded: Dict[str, float] = defaultdict(float)
+
+    def walk(func: Func, path: List[Func], share: float) -> None:
+        _, _, self_time, total, _ = raw[func]
+        key = ";".join(_label(f) for f in path)
+        folded[key] += self_time * share
+        if len(path) >= MAX_DEPTH:
+            return
+        for callee, edge_time in callees[func].items():
+            callee_total = raw[callee][3]
+            if callee in path or callee_total <= 0 or share * edge_time < MIN_SECONDS:
+                continue
+            walk(callee, path + [callee], share * edge_time / callee_total)
+
+    for func, (_, _, _, _, callers) in raw.items():
+        if not callers:
+            walk(func, [func], 1.0)
+    return {stack: round(seconds * 1e6) for stack, seconds in folded.items() if seconds >= 5e-7}
+
+
+class StageProfiler:
+    """Time pipeline stages and, when given a *directory*, profile them.
+
+    Each :meth:`stage` records wall time, the process's own CPU time and the
+    CPU time of child processes (e.g. pdflatex); CPU well below wall time
+    means the stage waits on I/O or the network. With a directory, every
+    stage also writes ``<prefix>-<stage>.pstats`` and a collapsed-stack
+    ``<prefix>-<stage>.folded`` file. cProfile only sees the thread that
+    entered the stage, so time spent in worker threads shows up as waiting.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, prefix: str = "run") -> None:
+        self.directory = Path(directory) if directory is not None else None
+        self.prefix = prefix
+        self.stages: Dict[str, dict] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        import cProfile
+
+        profile = cProfile.Profile()
+        times = os.times()
+        wall, cpu = time.perf_counter(), time.process_time()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            after = os.times()
+            children = (after.children_user - times.children_user) + (after.children_system - times.children_system)
+            self.stages[name] = {
+                "wall": round(wall, 6),
+                "cpu": round(cpu, 6),
+                "children_cpu": round(children, 6),
+                "cpu_ratio": round((cpu + children) / wall, 3) if wall > 0 else None,
+            }
+            self._dump(name, profile)
+
+    def _dump(self, name: str, profile: cProfile.Profile) -> None:
+        import pstats
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        base = self.directory / f"{self.prefix}-{name}"
+        profile.dump_stats(str(base.with_suffix(".pstats")))
+        stacks = collapsed_stacks(pstats.Stats(profile))
+        with base.with_suffix(".folded").open("w", encoding="utf-8") as f:
+            for stack, us in sorted(stacks.items()):
+                f.write(f"{stack} {us}\n")
+
+    def write_summary(self) -> Optional[Path]:
+        """Write the stage timings to ``<prefix>-stages.json``."""
+        if not self.enabled:
+            return None
+        path = self.directory / f"{self.prefix}-stages.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.stages, indent=2), encoding="utf-8")
+        return path
+
+    def report(self) -> List[str]:
+        lines = []
+        for name, t in self.stages.items():
+            ratio = f"{t['cpu_ratio']:.0%}" if t["cpu_ratio"] is not None else "n/a"
+            lines.append(
+                f"{name:<10} wall {t['wall']:8.3f}s  cpu {t['cpu']:8.3f}s  "
+                f"children {t['children_cpu']:8.3f}s  ({ratio} CPU)"
+            )
+        return lines
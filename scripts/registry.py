@@ -1,12 +1,25 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Callable, Dict, Union
-
-import toml
+from typing import Callable, Dict, List, Optional, Union
 
 Template = Union[Path, Callable[..., str]]
 
+
+@dataclass
+class ModelTier:
+    """Model settings for a prompt type.
+
+    ``models`` is a fallback cascade: the next model is tried once the
+    previous one has exhausted its retries.
+    """
+
+    models: List[str]
+    max_tokens: Optional[int] = None
+    timeout: Optional[float] = None
+    retries: Optional[int] = None
+
 class TemplateRegistry:
     """Registry mapping prompt type names to templates.
 
@@ -15,6 +28,9 @@ class TemplateRegistry:
 
     def __init__(self) -> None:
         self._templates: Dict[str, Template] = {}
+        self._tiers: Dict[str, ModelTier] = {}
+        #: model name -> {"input": USD, "output": USD} per million tokens
+        self.pricing: Dict[str, Dict[str, float]] = {}
 
     def register(self, name: str, template: Template) -> None:
         """Register a template under ``name``."""
@@ -24,14 +40,36 @@ class TemplateRegistry:
         """Retrieve a template by ``name``."""
         return self._templates.get(name)
 
+    def register_tier(self, name: str, tier: ModelTier) -> None:
+        """Register model settings for prompt type ``name``."""
+        self._tiers[name] = tier
+
+    def tier(self, name: str) -> ModelTier | None:
+        """Model settings for ``name``, falling back to the ``default`` tier."""
+        return self._tiers.get(name) or self._tiers.get("default")
+
+    def cost(self, model: str, prompt_tokens: int = 0, completion_tokens: int = 0) -> float | None:
+        """Return the USD cost of a call, or ``None`` if ``model`` has no pricing."""
+        price = self.pricing.get(model)
+        if price is None:
+            return None
+        return (
+            prompt_tokens * price.get("input", 0.0)
+            + completion_tokens * price.get("output", 0.0)
+        ) / 1_000_000
+
     @classmethod
     def from_toml(cls, path: Path, base_dir: Path | None = None) -> "TemplateRegistry":
         """Load templates from a TOML file.
 
         The TOML file should contain a ``[templates]`` table mapping type names
         to file paths. Paths are resolved relative to ``base_dir`` when
-        provided.
+        provided. Optional ``[models.<type>]`` tables (``models``,
+        ``max_tokens``, ``timeout``, ``retries``) and a ``[pricing]`` table are
+        loaded as model tiers and per-model prices.
         """
+        import toml
+
         registry = cls()
         if path.exists():
             data = toml.load(path)
@@ -40,4 +78,17 @@ class TemplateRegistry:
                 if base_dir and not tpl_path.is_absolute():
                     tpl_path = (base_dir / tpl_path).resolve()
                 registry.register(name, tpl_path)
+            for name, cfg in data.get("models", {}).items():
+                registry.register_tier(
+                    name,
+                    ModelTier(
+                        models=list(cfg["models"]),
+                        max_tokens=cfg.get("max_tokens"),
+                        timeout=cfg.get("timeout"),
+                        retries=cfg.get("retries"),
+                    ),
+                )
+            registry.pricing = {
+                model: dict(price) for model, price in data.get("pricing", {}).items()
+            }
         return registry
@@ -5,8 +5,12 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 import re
 from html import escape as html_escape
+from typing import Sequence, Tuple
 
-from utils import normalize_artifacts, escape_latex
+try:
+    from .utils import normalize_artifacts, escape_latex
+except ImportError:  # pragma: no cover
+    from utils import normalize_artifacts, escape_latex
 
 
 class Renderer(ABC):
@@ -25,6 +29,10 @@ class Renderer(ABC):
     ) -> str:
         """Wrap the converted body with any document boilerplate."""
 
+    def see_also(self, links: Sequence[Tuple[str, str]]) -> str:
+        """Render ``(title, slug)`` cross-references to append to a body."""
+        return ""
+
 
 class LatexRenderer(Renderer):
     """Renderer implementing the current LaTeX output behaviour."""
@@ -41,18 +49,18 @@ class LatexRenderer(Renderer):
     ]
 
     TEX_WRAPPER = r"""
-\documentclass[12pt]{article}
-\usepackage[utf8]{inputenc}
-\usepackage{amsmath, amssymb}
-\usepackage{geometry}
-\usepackage{titlesec}
-\usepackage{hyperref}
-\geometry{margin=1in}
+\documentclass[12pt]{{article}}
+\usepackage[utf8]{{inputenc}}
+\usepackage{{amsmath, amssymb}}
+\usepackage{{geometry}}
+\usepackage{{titlesec}}
+\usepackage{{hyperref}}
+\geometry{{margin=1in}}
 
-\titleformat{\section}[block]{\large\bfseries}{}{0em}{}
-\titleformat{\subsection}[block]{\normalsize\bfseries}{}{0em}{}
+\titleformat{{\section}}[block]{{\large\bfseries}}{{}}{{0em}}{{}}
+\titleformat{{\subsection}}[block]{{\normalsize\bfseries}}{{}}{{0em}}{{}}
 
-\begin{document}
+\begin{{document}}
 
 % Title: {title}
 % ID: {id}
@@ -61,7 +69,7 @@ class LatexRenderer(Renderer):
 
 {body}
 
-\end{document}
+\end{{document}}
 """
 
     def _replace_md(self, seg: str) -> str:
@@ -95,14 +103,27 @@ class LatexRenderer(Renderer):
             title=title, id=id, domain=domain, topic=topic, body=body
         )
 
+    def see_also(self, links: Sequence[Tuple[str, str]]) -> str:
+        """List the titles only: entries compile to separate PDFs."""
+        if not links:
+            return ""
+        items = "".join(f"\\item {escape_latex(title)}\n" for title, _ in links)
+        return f"\n\n\\section*{{See also}}\n\\begin{{itemize}}\n{items}\\end{{itemize}}\n"
+
 
 class HtmlRenderer(Renderer):
-    """Placeholder HTML renderer to demonstrate extensibility."""
+    """Renderer producing standalone HTML pages (e.g. for WeasyPrint)."""
 
     extension = "html"
 
-    def convert(self, text: str) -> str:  # pragma: no cover - placeholder
-        return text
+    def convert(self, text: str) -> str:
+        """Convert Markdown with the ``markdown`` package, or escape it into paragraphs."""
+        try:
+            import markdown
+        except ImportError:
+            paragraphs = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
+            return "\n".join(f"<p>{html_escape(p)}</p>" for p in paragraphs)
+        return markdown.markdown(text)
 
     def wrap(
         self, *, title: str, id: str, domain: str, topic: str, body: str
@@ -118,3 +139,13 @@ class HtmlRenderer(Renderer):
             "</body></html>"
         )
 
+    def see_also(self, links: Sequence[Tuple[str, str]]) -> str:
+        """Link each slug's page next to this one."""
+        if not links:
+            return ""
+        items = "".join(
+            f'<li><a href="{html_escape(slug)}.{self.extension}">{html_escape(title)}</a></li>'
+            for title, slug in links
+        )
+        return f'\n<nav class="see-also"><h2>See also</h2><ul>{items}</ul></nav>'
+
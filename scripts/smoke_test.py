@@ -40,9 +40,10 @@ def main() -> None:
     comp.PDF_OUTPUT_DIR = pdf_dir
     comp.LOG_DIR = tmp_dir / "logs"
     comp.LOG_FILE = comp.LOG_DIR / "compile_log.txt"
+    comp.DIAGNOSTICS_FILE = comp.LOG_DIR / "compile_diagnostics.jsonl"
 
     # Stub the OpenAI call
-    def fake_generate_content(prompt: str):
+    def fake_generate_content(prompt: str, **kwargs):
         return "Stubbed content for testing.", None
 
     gen.generate_content = fake_generate_content
@@ -0,0 +1,151 @@
+"""Incremental conversion and validation of streamed completions."""
+
+from __future__ import annotations
+
+import os
+import re
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Tuple
+
+HEADING_RE = re.compile(r"\\subsection\*\{([^}$]*)\}")
+REQUIRED_PREFIX = "\\section*"
+
+
+def required_sections(prompt: str) -> List[str]:
+    """Return the ``\\subsection*`` headings a rendered *prompt* asks for, in order."""
+    sections: List[str] = []
+    for m in HEADING_RE.finditer(prompt):
+        name = m.group(1).strip()
+        if name and name not in sections:
+            sections.append(name)
+    return sections
+
+
+class StreamValidator:
+    """Reject off-format responses as soon as the stream proves them bad.
+
+    Checks that the response opens with ``\\section*``, that required
+    sections arrive in order (a later one showing up while an earlier one is
+    missing fails immediately) and that the response stays under
+    ``max_chars``.
+    """
+
+    def __init__(
+        self,
+        sections: Iterable[str] = (),
+        *,
+        max_chars: Optional[int] = None,
+        prefix: Optional[str] = REQUIRED_PREFIX,
+    ) -> None:
+        self.sections = list(sections)
+        self.max_chars = max_chars
+        self.prefix = prefix
+        self.text = ""
+        self._next = 0
+        self._scan = 0
+        self._prefix_checked = not prefix
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """Add *chunk*; return a failure reason once the response is known bad."""
+        self.text += chunk
+        if self.max_chars is not None and len(self.text) > self.max_chars:
+            return f"response exceeds {self.max_chars} characters"
+        if not self._prefix_checked:
+            head = self.text.lstrip()[: len(self.prefix)]
+            if not self.prefix.startswith(head):
+                return f"response does not start with {self.prefix}"
+            self._prefix_checked = head == self.prefix
+        for m in HEADING_RE.finditer(self.text, self._scan):
+            self._scan = m.end()
+            name = m.group(1).strip()
+            if name not in self.sections[self._next:]:
+                continue
+            idx = self.sections.index(name, self._next)
+            if idx > self._next:
+                return f"missing section {self.sections[self._next]!r}"
+            self._next = idx + 1
+        return None
+
+    def finish(self) -> Optional[str]:
+        """Return a failure reason if the complete response is invalid."""
+        if self.prefix and not self.text.strip():
+            return "empty response"
+        missing = self.sections[self._next:]
+        if missing:
+            return "missing section " + ", ".join(repr(s) for s in missing)
+        return None
+
+
+def _balanced_math(text: str) -> bool:
+    dollars = len(re.findall(r"(?<!\\)\$", text))
+    return dollars % 2 == 0 and text.count("\\[") == text.count("\\]")
+
+
+class IncrementalConverter:
+    """Feed Markdown chunks through *convert* one finished paragraph at a time.
+
+    Text is only released up to the last blank line with balanced math
+    delimiters, so inline patterns and math blocks are never split and the
+    result matches converting the whole response at once.
+    """
+
+    def __init__(self, convert: Callable[[str], str]) -> None:
+        self.convert = convert
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> str:
+        self._buffer += chunk
+        cut = self._buffer.rfind("\n\n")
+        while cut != -1:
+            head = self._buffer[: cut + 2]
+            if _balanced_math(head):
+                self._buffer = self._buffer[cut + 2 :]
+                return self.convert(head)
+            cut = self._buffer.rfind("\n\n", 0, cut)
+        return ""
+
+    def flush(self) -> str:
+        rest, self._buffer = self._buffer, ""
+        return self.convert(rest) if rest else ""
+
+
+def consume_stream(
+    chunks: Iterable[str],
+    dest: Path,
+    *,
+    convert: Callable[[str], str],
+    validator: StreamValidator,
+    header: str = "",
+    footer: str = "",
+) -> Tuple[Optional[str], Optional[str]]:
+    """Write converted *chunks* through to a temp file next to *dest*.
+
+    Returns ``(content, None)`` after atomically moving the file into place,
+    or ``(None, reason)`` as soon as *validator* rejects the stream; the
+    caller should then close the underlying API stream to stop paying for
+    tokens.
+    """
+    tmp = dest.with_name(f".{dest.name}.part")
+    converter = IncrementalConverter(convert)
+    reason: Optional[str] = None
+    try:
+        with tmp.open("w", encoding="utf-8") as f:
+            f.write(header)
+            for chunk in chunks:
+                reason = validator.feed(chunk)
+                if reason:
+                    break
+                f.write(converter.feed(chunk))
+            else:
+                reason = validator.finish()
+                if not reason:
+                    f.write(converter.flush())
+                    f.write(footer)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    if reason:
+        tmp.unlink(missing_ok=True)
+        return None, reason
+    os.replace(tmp, dest)
+    return validator.text, None
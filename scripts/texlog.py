@@ -0,0 +1,156 @@
+"""Streaming parser for pdflatex ``.log`` files."""
+
+from __future__ import annotations
+
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+#: pdflatex hard-wraps log lines at this many characters
+MAX_PRINT_LINE = 79
+
+ERROR_RE = re.compile(r"^! (?P<msg>.*)")
+ERROR_LINE_RE = re.compile(r"^l\.(?P<line>\d+)")
+MISSING_FILE_RE = re.compile(r"^! LaTeX Error: File `(?P<name>[^']+)' not found")
+BOX_RE = re.compile(r"^(?:Overfull|Underfull) \\[hv]box")
+BOX_LINE_RE = re.compile(r"at lines? (\d+)")
+WARNING_RE = re.compile(r"^(?:LaTeX|Package (?P<pkg>\S+)|Class (?P<cls>\S+)) Warning: (?P<msg>.*)")
+INPUT_LINE_RE = re.compile(r"on input line (\d+)")
+RERUN_RE = re.compile(
+    r"Rerun to get|Label\(s\) may have changed|There were undefined references"
+    r"|Rerun LaTeX"
+)
+
+
+@dataclass
+class LogEntry:
+    """A single diagnostic extracted from a pdflatex log."""
+
+    kind: str
+    message: str
+    line: Optional[int] = None
+
+
+@dataclass
+class LogReport:
+    """Structured view of a pdflatex run."""
+
+    entries: List[LogEntry] = field(default_factory=list)
+    needs_rerun: bool = False
+
+    def of_kind(self, kind: str) -> List[LogEntry]:
+        return [e for e in self.entries if e.kind == kind]
+
+    @property
+    def errors(self) -> List[LogEntry]:
+        return self.of_kind("error")
+
+    @property
+    def missing_packages(self) -> List[str]:
+        return [e.message for e in self.of_kind("missing_package")]
+
+    def summary(self, limit: int = 3) -> str:
+        """Return a short human readable description of the failures."""
+        parts = [f"missing {name}" for name in self.missing_packages]
+        for entry in self.errors[:limit]:
+            where = f"l.{entry.line}: " if entry.line is not None else ""
+            parts.append(f"{where}{entry.message}")
+        remaining = len(self.errors) - limit
+        if remaining > 0:
+            parts.append(f"(+{remaining} more errors)")
+        return "; ".join(parts)
+
+    def records(self) -> List[dict]:
+        return [asdict(e) for e in self.entries]
+
+
+def _unwrap(lines: Iterable[str]) -> Iterator[str]:
+    """Rejoin lines that pdflatex split at ``MAX_PRINT_LINE`` characters."""
+    pending = ""
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        pending += line
+        if len(line) == MAX_PRINT_LINE:
+            continue
+        yield pending
+        pending = ""
+    if pending:
+        yield pending
+
+
+def parse_log(lines: Iterable[str]) -> LogReport:
+    """Parse pdflatex log *lines* one at a time into a :class:`LogReport`."""
+    report = LogReport()
+    error: Optional[LogEntry] = None
+    warning: Optional[LogEntry] = None
+    continuation = ""
+
+    def close_warning() -> None:
+        nonlocal warning
+        if warning is None:
+            return
+        m = INPUT_LINE_RE.search(warning.message)
+        if m:
+            warning.line = int(m.group(1))
+        if RERUN_RE.search(warning.message):
+            warning.kind = "rerun"
+            report.needs_rerun = True
+        report.entries.append(warning)
+        warning = None
+
+    for line in _unwrap(lines):
+        if warning is not None:
+            if continuation and line.startswith(continuation):
+                warning.message += " " + line[len(continuation):].strip()
+                continue
+            close_warning()
+
+        if error is not None:
+            m = ERROR_LINE_RE.match(line)
+            if m:
+                error.line = int(m.group("line"))
+                error = None
+                continue
+
+        m = MISSING_FILE_RE.match(line)
+        if m:
+            report.entries.append(LogEntry("missing_package", m.group("name")))
+            error = LogEntry("error", line[2:].strip())
+            report.entries.append(error)
+            continue
+
+        m = ERROR_RE.match(line)
+        if m:
+            error = LogEntry("error", m.group("msg").strip())
+            report.entries.append(error)
+            continue
+
+        if BOX_RE.match(line):
+            lm = BOX_LINE_RE.search(line)
+            report.entries.append(
+                LogEntry("box", line.strip(), int(lm.group(1)) if lm else None)
+            )
+            continue
+
+        m = WARNING_RE.match(line)
+        if m:
+            owner = m.group("pkg") or m.group("cls")
+            continuation = f"({owner})" if owner else " " * 15
+            warning = LogEntry("warning", m.group("msg").strip())
+            continue
+
+        if RERUN_RE.search(line):
+            report.entries.append(LogEntry("rerun", line.strip()))
+            report.needs_rerun = True
+
+    close_warning()
+    return report
+
+
+def parse_log_file(path: Path) -> LogReport:
+    """Parse the log at *path*, streaming it from disk."""
+    if not path.exists():
+        return LogReport()
+    with path.open(encoding="utf-8", errors="replace") as f:
+        return parse_log(f)
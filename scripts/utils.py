@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 import re
 from pathlib import Path
 from string import Template
@@ -59,6 +60,25 @@ def slugify(text: str) -> str:
         raise ValueError("slug contains invalid characters")
     return slug
 
+SLUG_HASH_LENGTH = 8
+
+def slug_part(text: str) -> str:
+    """Slugify one catalogue name, shortening it instead of rejecting it.
+
+    Slugs over :data:`MAX_SLUG_LENGTH` keep their first characters plus a
+    hash of the full slug, so long names still map to a stable, distinct
+    part. Names without any valid character still raise ``ValueError``.
+    """
+    slug = re.sub(r"[^a-z0-9]+", "-", str(text).lower()).strip("-")
+    if len(slug) > MAX_SLUG_LENGTH:
+        digest = hashlib.sha1(slug.encode("utf-8")).hexdigest()[:SLUG_HASH_LENGTH]
+        slug = f"{slug[: MAX_SLUG_LENGTH - SLUG_HASH_LENGTH - 1].rstrip('-')}-{digest}"
+    return slugify(slug)
+
+def entry_stem(domain: str, topic: str, subtopic: str) -> str:
+    """Return the output file stem shared by an entry's ``.tex`` and ``.pdf``."""
+    return f"{slug_part(domain)}-{slug_part(topic)}-{slug_part(subtopic)}"
+
 def dedupe_path(path: Path) -> Path:
     """Return a unique path, appending ``-N`` if needed."""
     base = path.stem
@@ -0,0 +1,330 @@
+"""Watch templates, the catalogue and outputs, and rebuild what changed."""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import importlib
+import os
+import re
+import select
+import struct
+import sys
+import time
+import traceback
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+try:
+    from . import compile_pdf, generate, renderers
+    from .catalogue import load_snapshot
+    from .utils import entry_stem
+except ImportError:  # pragma: no cover
+    import compile_pdf
+    import generate
+    import renderers
+    from catalogue import load_snapshot
+    from utils import entry_stem
+
+DEFAULT_DEBOUNCE = 0.5
+DEFAULT_INTERVAL = 1.0
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+DOCUMENT_RE = re.compile(r"\\begin\{document\}\n?(.*?)\n?\\end\{document\}", re.DOTALL)
+META_RE = re.compile(r"^% (Title|ID|Domain|Topic): (.*)\n?", re.MULTILINE)
+#: catalogue column of each metadata comment
+META_COLUMNS = {"Title": "subtopic", "ID": "id", "Domain": "domain", "Topic": "topic"}
+
+
+def _visible(path: Path) -> bool:
+    # Skip editor swap files and our own temp files (``.x.part``, ``.x.tmp``).
+    return not path.name.startswith(".") and not path.name.endswith("~")
+
+
+class PollingWatcher:
+    """Report files in *directories* whose mtime or size changed."""
+
+    def __init__(self, directories: Iterable[Path], interval: float = DEFAULT_INTERVAL) -> None:
+        self.directories = sorted({Path(d) for d in directories})
+        self.interval = interval
+        self._state = self._scan()
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        state: Dict[Path, Tuple[int, int]] = {}
+        for directory in self.directories:
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory):
+                if entry.is_file():
+                    st = entry.stat()
+                    state[Path(entry.path)] = (st.st_mtime_ns, st.st_size)
+        return state
+
+    def changes(self, timeout: Optional[float]) -> Set[Path]:
+        """Wait up to *timeout* seconds (forever if ``None``) for changes."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.interval
+            if deadline is not None:
+                wait = min(wait, max(0.0, deadline - time.monotonic()))
+            time.sleep(wait)
+            state = self._scan()
+            changed = {p for p in state.keys() | self._state.keys() if state.get(p) != self._state.get(p)}
+            self._state = state
+            changed = {p for p in changed if _visible(p)}
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Same interface as :class:`PollingWatcher`, backed by Linux inotify."""
+
+    def __init__(self, directories: Iterable[Path]) -> None:
+        import ctypes
+        import ctypes.util
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: Dict[int, Path] = {}
+        for directory in sorted({Path(d) for d in directories}):
+            if not directory.is_dir():
+                continue
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                self.close()
+                raise OSError(ctypes.get_errno(), f"cannot watch {directory}")
+            self._dirs[wd] = directory
+
+    def changes(self, timeout: Optional[float]) -> Set[Path]:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed: Set[Path] = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, _mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                if wd in self._dirs and name:
+                    path = self._dirs[wd] / os.fsdecode(name)
+                    if _visible(path):
+                        changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def make_watcher(directories: Iterable[Path], *, poll: bool = False, interval: float = DEFAULT_INTERVAL):
+    """Return an inotify watcher, or a polling one if inotify is unavailable."""
+    directories = list(directories)
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directories)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(directories, interval)
+
+
+def debounced(watcher, quiet: float = DEFAULT_DEBOUNCE) -> Iterator[Set[Path]]:
+    """Yield batches of changed paths once no change arrived for *quiet* seconds."""
+    pending: Set[Path] = set()
+    while True:
+        changed = watcher.changes(quiet if pending else None)
+        if changed:
+            pending |= changed
+        elif pending:
+            yield pending
+            pending = set()
+
+
+def extract_body(text: str) -> str:
+    """Return the document body of a wrapped ``.tex`` file without metadata comments."""
+    m = DOCUMENT_RE.search(text)
+    body = m.group(1) if m else text
+    return META_RE.sub("", body).strip("\n")
+
+
+def extract_meta(text: str) -> dict:
+    """Return the catalogue fields recorded in a wrapped ``.tex`` file's metadata comments."""
+    return {META_COLUMNS[m.group(1)]: m.group(2) for m in META_RE.finditer(text)}
+
+
+class Rebuilder:
+    """Map batches of changed files to the cheapest rebuild and run it.
+
+    * a prompt template or the catalogue CSV changed: incremental generation
+      limited to the affected entries, i.e. the already generated entries of
+      the template's prompt type and the CSV rows added or edited since the
+      previous batch;
+    * ``renderers.py`` changed: reload it and re-wrap every output with the
+      new :class:`~renderers.LatexRenderer` boilerplate, without API calls
+      (``generate`` wraps new outputs with the same renderer);
+    * an output ``.tex`` or ``.html`` changed: recompile that entry only,
+      with the backend for its suffix.
+
+    Templates (via :func:`generate.read_template`), the renderer and the
+    catalogue location stay loaded between batches.
+    """
+
+    def __init__(self, *, compile: bool = True, quiet: bool = False, generate_options: Optional[dict] = None) -> None:
+        self.compile = compile
+        self.quiet = quiet
+        self.generate_options = dict(generate_options or {})
+        self.renderer = generate.renderer_for("latex")
+        self.renderer_source = Path(renderers.__file__).resolve()
+        _, _, self.catalogue = generate.load_config(generate.CONFIG_FILE)
+        self.rows = self.read_catalogue()
+
+    def directories(self) -> Set[Path]:
+        paths = [*generate.PROMPT_TEMPLATES.values(), self.catalogue, self.renderer_source]
+        return {Path(p).resolve().parent for p in paths} | {generate.OUTPUT_DIR.resolve()}
+
+    def classify(self, paths: Iterable[Path]) -> dict:
+        """Return the rebuild plan for *paths*."""
+        templates = {Path(p).resolve(): t for t, p in generate.PROMPT_TEMPLATES.items()}
+        output_dir = generate.OUTPUT_DIR.resolve()
+        plan = {"prompt_types": set(), "catalogue": False, "rerender": False, "recompile": set()}
+        for path in paths:
+            path = Path(path).resolve()
+            if path in templates:
+                plan["prompt_types"].add(templates[path])
+            elif path == self.catalogue.resolve():
+                plan["catalogue"] = True
+            elif path == self.renderer_source:
+                plan["rerender"] = True
+            elif path.parent == output_dir and path.suffix in compile_pdf.BY_SUFFIX:
+                plan["recompile"].add(path)
+        return plan
+
+    def read_catalogue(self) -> Dict[str, dict]:
+        """Catalogue rows by output file stem; rows without an entry stem are left out."""
+        rows: Dict[str, dict] = {}
+        if not self.catalogue.exists():
+            return rows
+        with open(self.catalogue, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    stem = entry_stem(row["domain"], row["topic"], row["subtopic"])
+                except ValueError:
+                    continue
+                rows.setdefault(stem, row)
+        return rows
+
+    def affected(self, plan: dict) -> Set[str]:
+        """Entries to regenerate for *plan*: generated entries of its prompt
+        types, plus catalogue rows added or edited since the last batch."""
+        rows = self.read_catalogue() if plan["catalogue"] else self.rows
+        entries = {stem for stem, row in rows.items() if self.rows.get(stem) != row}
+        suffix = generate.SUFFIXES[self.generate_options.get("fmt", "latex")]
+        entries |= {
+            stem
+            for stem, row in rows.items()
+            if row["prompt_type"] in plan["prompt_types"]
+            and (generate.OUTPUT_DIR / f"{stem}{suffix}").exists()
+        }
+        self.rows = rows
+        return entries
+
+    def regenerate(self, entries: Set[str]) -> int:
+        return generate.main(incremental=True, entries=entries, quiet=self.quiet, **self.generate_options)
+
+    def rerender(self) -> List[Path]:
+        """Reload the renderer and re-wrap outputs whose wrapping changed."""
+        global renderers
+        renderers = importlib.reload(renderers)
+        self.renderer = generate.renderer_for("latex")
+        snapshot = load_snapshot(generate.OUTPUT_DIR / generate.SNAPSHOT_NAME) or {}
+        written = []
+        for path in sorted(generate.OUTPUT_DIR.glob("*.tex")):
+            text = path.read_text(encoding="utf-8")
+            row = snapshot.get(path.stem) or {"subtopic": path.stem, "domain": "", "topic": "", **extract_meta(text)}
+            wrapped = self.renderer.wrap(**generate.entry_meta(row), body=extract_body(text))
+            if wrapped != text:
+                path.write_text(wrapped, encoding="utf-8")
+                written.append(path)
+        return written
+
+    def recompile(self, paths: Iterable[Path]) -> Dict[str, int]:
+        counts = {"compiled": 0, "failed": 0}
+        for path in sorted(paths):
+            if not path.exists():
+                continue
+            ok, reason = compile_pdf.compile_file(path, dry_run=False, force=True)
+            counts["compiled" if ok else "failed"] += 1
+            if not ok and not self.quiet:
+                print(f"Failed {path.name}: {reason}")
+        return counts
+
+    def rebuild(self, paths: Iterable[Path]) -> dict:
+        """Run the plan for one batch of changes; return what was done."""
+        plan = self.classify(paths)
+        summary: dict = {"regenerated": None, "rerendered": 0, "compiled": 0, "failed": 0}
+        try:
+            if plan["prompt_types"] or plan["catalogue"]:
+                summary["regenerated"] = self.regenerate(self.affected(plan))
+            if plan["rerender"]:
+                # Rewritten files come back as the next batch and get recompiled then.
+                summary["rerendered"] = len(self.rerender())
+            if self.compile and plan["recompile"]:
+                summary.update(self.recompile(plan["recompile"]))
+        except Exception:
+            # Keep the daemon alive; the next edit gets another chance.
+            traceback.print_exc()
+            summary["error"] = True
+        return summary
+
+
+def parse_args(argv: Sequence[str] | None = None, prog: str | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog=prog, description="Rebuild affected entries whenever sources change")
+    parser.add_argument("--poll", action="store_true", help="Poll for changes instead of using inotify")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="Polling interval in seconds")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE, help="Seconds of quiet before rebuilding")
+    parser.add_argument("--no-compile", action="store_true", help="Do not recompile changed .tex files")
+    parser.add_argument("--quiet", action="store_true", help="Suppress progress output")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None, prog: str | None = None) -> int:
+    args = parse_args(argv, prog)
+    rebuilder = Rebuilder(compile=not args.no_compile, quiet=args.quiet)
+    directories = rebuilder.directories()
+    watcher = make_watcher(directories, poll=args.poll, interval=args.interval)
+    if not args.quiet:
+        kind = "inotify" if isinstance(watcher, InotifyWatcher) else "polling"
+        print(f"Watching {len(directories)} directories ({kind}); Ctrl-C to stop")
+    try:
+        for batch in debounced(watcher, args.debounce):
+            summary = rebuilder.rebuild(batch)
+            if not args.quiet:
+                print(f"{len(batch)} changed: {summary}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""Shared-directory work queue so several hosts can split one catalogue.
+
+Every worker points at the same queue directory (typically on the shared
+``output/`` mount). Claiming an entry creates ``<key>.lease.<gen>`` with
+``O_EXCL``, so exactly one worker wins each generation. A lease whose expiry
+has passed may be stolen by creating the next generation; the highest
+generation is the current holder. Finished entries get a ``<key>.done``
+marker and are never claimed again.
+
+Expiry uses wall-clock time, so hosts sharing a queue need roughly
+synchronised clocks (well within the lease TTL).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Optional, Set, Tuple
+
+DEFAULT_LEASE_TTL = 600.0
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """Parse ``"i/N"`` into ``(i, N)``."""
+    try:
+        index_s, count_s = spec.split("/")
+        index, count = int(index_s), int(count_s)
+    except ValueError:
+        raise ValueError(f"invalid shard {spec!r}, expected i/N") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"invalid shard {spec!r}, need 0 <= i < N")
+    return index, count
+
+
+def shard_of(key: str, count: int) -> int:
+    """Return the stable shard number of *key* among *count* shards."""
+    return zlib.crc32(key.encode("utf-8")) % count
+
+
+class LeaseQueue:
+    """Claim entries through lease files in a shared directory."""
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        ttl: float = DEFAULT_LEASE_TTL,
+        owner: Optional[str] = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        if owner is None:
+            import socket
+            import uuid
+
+            owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.owner = owner
+        self._held: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _lease(self, key: str, gen: int) -> Path:
+        return self.directory / f"{key}.lease.{gen}"
+
+    def _done(self, key: str) -> Path:
+        return self.directory / f"{key}.done"
+
+    def _current(self, key: str) -> Tuple[int, Optional[dict]]:
+        """Return the next free generation and the current lease (if any)."""
+        gen = 0
+        while self._lease(key, gen).exists():
+            gen += 1
+        if gen == 0:
+            return 0, None
+        path = self._lease(key, gen - 1)
+        try:
+            lease = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            # Created but not (yet) written: held for one ttl from its
+            # creation, so a worker dying before writing it cannot pin the
+            # entry forever.
+            try:
+                created = path.stat().st_mtime
+            except OSError:
+                created = time.time()
+            lease = {"owner": None, "expires": created + self.ttl}
+        return gen, lease
+
+    def _write(self, path: Path) -> None:
+        tmp = path.with_name(f".{path.name}.{self.owner.replace(':', '-')}")
+        tmp.write_text(
+            json.dumps({"owner": self.owner, "expires": time.time() + self.ttl}),
+            encoding="utf-8",
+        )
+        os.replace(tmp, path)
+
+    def is_done(self, key: str) -> bool:
+        return self._done(key).exists()
+
+    def claim(self, key: str) -> bool:
+        """Try to take *key*; return ``True`` if this worker now holds it."""
+        if self.is_done(key):
+            return False
+        gen, lease = self._current(key)
+        if lease is not None:
+            if lease.get("owner") == self.owner:
+                return True
+            if lease.get("expires", 0) > time.time():
+                return False
+        path = self._lease(key, gen)
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        os.close(fd)
+        self._write(path)
+        if self.is_done(key):
+            # The previous holder finished while we were stealing.
+            path.unlink(missing_ok=True)
+            return False
+        with self._lock:
+            self._held.add(key)
+        return True
+
+    def holds(self, key: str) -> bool:
+        """Return whether this worker still holds the current lease on *key*."""
+        _, lease = self._current(key)
+        return lease is not None and lease.get("owner") == self.owner
+
+    def renew(self, key: str) -> bool:
+        """Push back the expiry of *key* if this worker still holds it."""
+        gen, lease = self._current(key)
+        if lease is None or lease.get("owner") != self.owner:
+            return False
+        self._write(self._lease(key, gen - 1))
+        return True
+
+    def complete(self, key: str) -> None:
+        """Mark *key* finished and drop its lease files."""
+        self._done(key).write_text(self.owner, encoding="utf-8")
+        self._drop(key)
+
+    def release(self, key: str) -> None:
+        """Give up *key* so another worker can retry it."""
+        if self.holds(key):
+            gen, _ = self._current(key)
+            self._lease(key, gen - 1).unlink(missing_ok=True)
+        with self._lock:
+            self._held.discard(key)
+
+    def _drop(self, key: str) -> None:
+        for path in self.directory.glob(f"{key}.lease.*"):
+            path.unlink(missing_ok=True)
+        with self._lock:
+            self._held.discard(key)
+
+    def start_heartbeat(self, interval: Optional[float] = None) -> None:
+        """Renew held leases in a background thread every *interval* seconds."""
+        interval = interval or self.ttl / 3
+
+        def beat() -> None:
+            while not self._stop.wait(interval):
+                with self._lock:
+                    keys = list(self._held)
+                for key in keys:
+                    self.renew(key)
+
+        self._thread = threading.Thread(target=beat, daemon=True)
+        self._thread.start()
+
+    def stop_heartbeat(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,51 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+repo_root = Path(__file__).resolve().parents[1]
+sys.path.extend([str(repo_root), str(repo_root / "scripts")])
+import scripts.generate as gen
+
+CONFIG = "start_index = 0\nmax_entries = 10\n"
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    """Point every path ``generate.main`` reads or writes into *tmp_path*.
+
+    Call the fixture with the catalogue rows (anything ``pd.DataFrame``
+    accepts); ``templates`` maps prompt types to template text and
+    ``registry`` is the text of ``prompt_registry.toml`` (none by default).
+    Returns the paths, so a test can rewrite the catalogue or config.
+    """
+
+    def setup(rows, *, config=CONFIG, templates=None, registry=None):
+        paths = SimpleNamespace(
+            csv=tmp_path / "topics.csv",
+            config=tmp_path / "config.toml",
+            registry=tmp_path / "prompt_registry.toml",
+            out=tmp_path / "out",
+            logs=tmp_path / "logs",
+            templates={},
+        )
+        pd.DataFrame(rows).to_csv(paths.csv, index=False)
+        paths.config.write_text(config, encoding="utf-8")
+        if registry is not None:
+            paths.registry.write_text(registry, encoding="utf-8")
+        for prompt_type, text in (templates or {"definition": "Topic: $topic"}).items():
+            paths.templates[prompt_type] = tmp_path / f"{prompt_type}.txt"
+            paths.templates[prompt_type].write_text(text, encoding="utf-8")
+        paths.logs.mkdir()
+        monkeypatch.setattr(gen, "DATA_FILE", paths.csv)
+        monkeypatch.setattr(gen, "CONFIG_FILE", paths.config)
+        monkeypatch.setattr(gen, "REGISTRY_FILE", paths.registry)
+        monkeypatch.setattr(gen, "OUTPUT_DIR", paths.out)
+        monkeypatch.setattr(gen, "PROMPT_TEMPLATES", paths.templates)
+        monkeypatch.setattr(gen, "LOGS_DIR", paths.logs)
+        monkeypatch.setattr(gen, "JSONL_LOG_FILE", paths.logs / "log.jsonl")
+        return paths
+
+    return setup
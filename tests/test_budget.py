@@ -0,0 +1,177 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+repo_root = Path(__file__).resolve().parents[1]
+sys.path.extend([str(repo_root), str(repo_root / "scripts")])
+import scripts.generate as gen
+import budget
+from budget import Budget, RowEstimate, count_tokens, estimate_prompt, project
+from history import RunHistory
+from registry import ModelTier, TemplateRegistry
+
+
+@pytest.fixture
+def heuristic(monkeypatch):
+    monkeypatch.setitem(sys.modules, "tiktoken", None)
+    monkeypatch.setattr(budget, "_ENCODERS", {})
+
+
+@pytest.fixture
+def registry():
+    registry = TemplateRegistry()
+    registry.register_tier("definition", ModelTier(["fast"], max_tokens=400))
+    registry.pricing = {"fast": {"input": 1.0, "output": 2.0}}
+    return registry
+
+
+def item(prompt, prompt_type="definition", duplicate=False):
+    return {"prompt": prompt, "row": {"prompt_type": prompt_type}, "duplicate": duplicate}
+
+
+def test_heuristic_tokenizer(heuristic):
+    assert count_tokens("x" * 40, "fast") == 10 + budget.MESSAGE_OVERHEAD
+    assert budget.tokenizer_name("fast") == "heuristic"
+
+
+def test_estimate_prefers_history(heuristic, registry):
+    no_history = estimate_prompt("x" * 93, "definition", registry, {}, "default")
+    assert (no_history.model, no_history.prompt_tokens, no_history.completion_tokens) == ("fast", 31, 400)
+    assert no_history.seconds == 400 / budget.DEFAULT_TOKENS_PER_SECOND
+    assert no_history.cost == pytest.approx((31 + 2 * 400) / 1e6)
+
+    stats = {"definition": {"samples": 3, "completion_tokens": 250.0, "latency": 4.0}}
+    seen = estimate_prompt("x" * 93, "definition", registry, stats, "default")
+    assert (seen.completion_tokens, seen.seconds) == (250, 4.0)
+
+    other = estimate_prompt("x", "abstract", registry, stats, "default")
+    assert (other.model, other.completion_tokens, other.cost) == ("default", budget.DEFAULT_OUTPUT_TOKENS, None)
+
+
+def test_projection_coalesces_and_spreads_over_workers(heuristic, registry):
+    stats = {"definition": {"samples": 1, "completion_tokens": 100, "latency": 10.0}}
+    planned = [item("a" * 40), item("a" * 40), item("b" * 40), item("c", duplicate=True)]
+
+    summary, estimates = project(planned, registry, stats, default_model="fast", workers=4)
+
+    assert (summary["rows"], summary["calls"]) == (3, 2)
+    assert summary["prompt_tokens"] == 2 * 17 and summary["completion_tokens"] == 200
+    assert summary["seconds"] == 10.0
+    assert project(planned, registry, stats, default_model="fast")[0]["seconds"] == 20.0
+    assert set(estimates) == {"a" * 40, "b" * 40}
+    assert "2 calls for 3 rows" in budget.format_projection(summary)
+
+
+def test_budget_stops_admitting_once_exhausted():
+    row = RowEstimate("m", prompt_tokens=10, completion_tokens=90, cost=0.4, seconds=1.0)
+    guard = Budget(max_cost=1.0)
+
+    assert guard.admit(row) and guard.admit(row)
+    guard.settle(row, tokens=50, cost=0.1)
+    assert guard.cost == pytest.approx(0.5) and guard.tokens == 150
+    assert guard.admit(row)
+    assert not guard.admit(row)
+    guard.settle(row, tokens=None, cost=None)
+    assert not guard.admit(RowEstimate("m", 1, 1, 0.0, 1.0))
+    assert guard.metrics()["refused"] == 2
+
+    tokens = Budget(max_tokens=150)
+    assert tokens.admit(row) and not tokens.admit(row)
+
+
+def test_prompt_type_stats_use_successful_rows(tmp_path):
+    with RunHistory(tmp_path / "h.sqlite") as h:
+        h.record_run("generate", [
+            {"entry": "a", "stage": "generate", "prompt_type": "definition", "status": "success",
+             "completion_tokens": 100, "latency": 2.0},
+            {"entry": "b", "stage": "generate", "prompt_type": "definition", "status": "success",
+             "completion_tokens": 300, "latency": 6.0},
+            {"entry": "c", "stage": "generate", "prompt_type": "definition", "status": "failure",
+             "completion_tokens": 5000, "latency": 90.0},
+        ], started=0)
+        assert h.prompt_type_stats() == {
+            "definition": {"samples": 2, "completion_tokens": 200, "latency": 4.0}
+        }
+
+
+def test_generate_budget_finishes_admitted_rows(heuristic, pipeline, tmp_path, monkeypatch):
+    paths = pipeline(
+        {
+            "domain": ["d"] * 4,
+            "topic": ["t"] * 4,
+            "subtopic": ["a", "b", "c", "d"],
+            "prompt_type": ["definition"] * 4,
+        },
+        templates={"definition": "Define " + "x" * 363 + " $subtopic"},
+        registry='[models.definition]\nmodels = ["fast"]\nmax_tokens = 100\n\n'
+        '[pricing]\nfast = { input = 1000.0, output = 1000.0 }\n',
+    )
+    calls = []
+
+    def fake(prompt, *, usage, **kwargs):
+        calls.append(prompt)
+        usage.update(prompt_tokens=100, completion_tokens=50)
+        return "content", None
+
+    monkeypatch.setattr(gen, "generate_content", fake)
+    metrics_file = tmp_path / "metrics.json"
+
+    # Each row is projected at 100 + 100 tokens ($0.20) but uses 150 ($0.15).
+    assert gen.main(quiet=True, estimate_only=True, metrics_file=str(metrics_file)) == 0
+    assert calls == [] and not list(paths.out.iterdir())
+    projection = json.loads(metrics_file.read_text(encoding="utf-8"))["projection"]
+    assert (projection["calls"], projection["prompt_tokens"], projection["cost"]) == (4, 400, 0.8)
+
+    paths.config.write_text(
+        "start_index = 0\nmax_entries = 10\n\n[concurrency]\ninitial_workers = 2\nmax_workers = 8\n",
+        encoding="utf-8",
+    )
+    assert gen.main(quiet=True, estimate_only=True, adaptive=True, metrics_file=str(metrics_file)) == 0
+    projection = json.loads(metrics_file.read_text(encoding="utf-8"))["projection"]
+    assert projection["workers"] == 2
+    assert projection["seconds"] == round(4 * 100 / budget.DEFAULT_TOKENS_PER_SECOND / 2, 1)
+    paths.config.write_text("start_index = 0\nmax_entries = 10\n", encoding="utf-8")
+
+    assert gen.main(quiet=True, budget=0.55, metrics_file=str(metrics_file)) == 0
+    metrics = json.loads(metrics_file.read_text(encoding="utf-8"))
+    assert len(calls) == 3 and metrics["success"] == 3
+    assert metrics["budget"]["refused"] == 1 and metrics["budget"]["cost"] == pytest.approx(0.45)
+    assert sorted(p.name for p in paths.out.iterdir()) == ["d-t-a.tex", "d-t-b.tex", "d-t-c.tex"]
+
+
+def test_budget_reserves_once_per_shared_prompt(heuristic, pipeline, tmp_path, monkeypatch):
+    paths = pipeline(
+        {
+            "domain": ["d"] * 4,
+            "topic": ["t"] * 4,
+            "subtopic": ["a", "b", "c", "d"],
+            "prompt_type": ["definition"] * 4,
+        },
+        templates={"definition": "Define " + "x" * 363 + " $topic"},
+        registry='[models.definition]\nmodels = ["fast"]\nmax_tokens = 100\n\n'
+        '[pricing]\nfast = { input = 1000.0, output = 1000.0 }\n',
+    )
+    calls = []
+
+    def fake(prompt, *, usage, **kwargs):
+        calls.append(prompt)
+        usage.update(prompt_tokens=100, completion_tokens=50)
+        return "content", None
+
+    monkeypatch.setattr(gen, "generate_content", fake)
+    metrics_file = tmp_path / "metrics.json"
+
+    # Four rows, one distinct prompt: one $0.20 reservation settling to $0.15.
+    assert gen.main(quiet=True, budget=0.45, metrics_file=str(metrics_file)) == 0
+    metrics = json.loads(metrics_file.read_text(encoding="utf-8"))
+    assert len(calls) == 1 and metrics["success"] == 4
+    assert metrics["projection"]["cost"] == 0.2
+    assert metrics["budget"]["refused"] == 0 and metrics["budget"]["cost"] == pytest.approx(0.15)
+    assert len(list(paths.out.iterdir())) == 4
+
+    # A refused call refuses every row sharing its prompt.
+    assert gen.main(quiet=True, overwrite=True, budget=0.1, metrics_file=str(metrics_file)) == 0
+    metrics = json.loads(metrics_file.read_text(encoding="utf-8"))
+    assert len(calls) == 1 and metrics["budget"]["refused"] == 1
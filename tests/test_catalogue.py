@@ -0,0 +1,129 @@
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+repo_root = Path(__file__).resolve().parents[1]
+sys.path.extend([str(repo_root), str(repo_root / "scripts")])
+import scripts.generate as gen
+from catalogue import diff_snapshots, load_snapshot, save_snapshot
+
+
+def test_diff_classifies_entries(tmp_path):
+    (tmp_path / "same.tex").write_text("x", encoding="utf-8")
+    (tmp_path / "edited.tex").write_text("x", encoding="utf-8")
+    previous = {"same": {"hash": "1"}, "edited": {"hash": "2"}, "gone": {"hash": "3"}, "lost": {"hash": "4"}}
+    current = {"same": {"hash": "1"}, "edited": {"hash": "9"}, "new": {"hash": "5"}, "lost": {"hash": "4"}}
+
+    diff = diff_snapshots(previous, current, tmp_path)
+
+    assert diff == {
+        "added": ["new"],
+        "changed": ["edited"],
+        "missing": ["lost"],
+        "unchanged": ["same"],
+        "removed": ["gone"],
+    }
+
+
+def test_first_run_adopts_existing_outputs(tmp_path):
+    (tmp_path / "a.tex").write_text("x", encoding="utf-8")
+    diff = diff_snapshots(None, {"a": {"hash": "1"}, "b": {"hash": "2"}}, tmp_path)
+    assert diff["unchanged"] == ["a"] and diff["added"] == ["b"] and diff["removed"] == []
+
+
+def test_snapshot_roundtrip(tmp_path):
+    path = tmp_path / "snap.json"
+    assert load_snapshot(path) is None
+    save_snapshot(path, {"a": {"hash": "1"}})
+    assert load_snapshot(path) == {"a": {"hash": "1"}}
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=["domain", "topic", "subtopic", "prompt_type"])
+
+
+def test_incremental_main_regenerates_only_the_diff(pipeline, tmp_path, monkeypatch):
+    paths = pipeline(
+        frame([
+            ("d", "a", "s", "definition"),
+            ("d", "b", "s", "abstract"),
+            ("d", "c", "old", "definition"),
+        ]),
+        config="start_index = 0\nmax_entries = 1\n",
+        templates={"definition": "Define $topic / $subtopic", "abstract": "Abstract $topic / $subtopic"},
+    )
+    out = paths.out
+    prompts = []
+
+    def fake(prompt, **kwargs):
+        prompts.append(prompt)
+        return "body", None
+
+    monkeypatch.setattr(gen, "generate_content", fake)
+
+    # The whole catalogue is generated despite max_entries = 1.
+    assert gen.main(quiet=True, incremental=True) == 0
+    assert len(prompts) == 3
+    assert len(load_snapshot(out / gen.SNAPSHOT_NAME)) == 3
+
+    prompts.clear()
+    assert gen.main(quiet=True, incremental=True) == 0
+    assert prompts == []
+
+    frame([
+        ("d", "a", "s", "definition"),
+        ("d", "b", "s", "abstract"),
+        ("d", "c", "new", "definition"),
+    ]).to_csv(paths.csv, index=False)
+    paths.templates["abstract"].write_text("Summarise $topic / $subtopic", encoding="utf-8")
+    metrics_file = tmp_path / "metrics.json"
+    assert gen.main(quiet=True, incremental=True, metrics_file=str(metrics_file)) == 0
+
+    assert sorted(prompts) == ["Define c / new", "Summarise b / s"]
+    assert not (out / "d-c-old.tex").exists()
+    assert (out / "d-c-new.tex").exists()
+    catalogue = json.loads(metrics_file.read_text(encoding="utf-8"))["catalogue"]
+    assert catalogue == {"added": 1, "changed": 1, "missing": 0, "unchanged": 1, "removed": 1}
+
+
+def test_incremental_retries_failed_rows(pipeline, monkeypatch):
+    out = pipeline(
+        frame([("d", "a", "s", "definition")]),
+        config="start_index = 0\nmax_entries = 1\n",
+        templates={"definition": "Define $topic"},
+    ).out
+    monkeypatch.setattr(gen, "generate_content", lambda prompt, **kwargs: (None, "boom"))
+
+    assert gen.main(quiet=True, enable_log=False, retries=1, incremental=True) == 1
+    assert load_snapshot(out / gen.SNAPSHOT_NAME) == {}
+
+    monkeypatch.setattr(gen, "generate_content", lambda prompt, **kwargs: ("ok", None))
+    assert gen.main(quiet=True, enable_log=False, incremental=True) == 0
+    assert (out / "d-a-s.tex").exists()
+
+
+def test_incremental_window_and_unsluggable_rows(pipeline, tmp_path, monkeypatch):
+    out = pipeline(
+        frame([("d", "t", subtopic, "definition") for subtopic in ("a", "???", "b", "c")]),
+        config="start_index = 0\nmax_entries = 1\n",
+        templates={"definition": "Define $subtopic"},
+    ).out
+    metrics_file = tmp_path / "metrics.json"
+    prompts = []
+    monkeypatch.setattr(gen, "generate_content", lambda prompt, **kwargs: (prompts.append(prompt), ("ok", None))[1])
+
+    # Rows 0-2 form the window; the subtopic without a slug is skipped, not fatal.
+    assert gen.main(quiet=True, enable_log=False, incremental=True, limit=3, metrics_file=str(metrics_file)) == 0
+    assert prompts == ["Define a", "Define b"]
+    metrics = json.loads(metrics_file.read_text(encoding="utf-8"))
+    assert metrics["invalid_rows"] == 1
+    assert metrics["catalogue"]["added"] == 3
+    assert sorted(load_snapshot(out / gen.SNAPSHOT_NAME)) == ["d-t-a", "d-t-b"]
+
+    prompts.clear()
+    assert gen.main(quiet=True, enable_log=False, incremental=True, start=2, limit=1) == 0
+    assert prompts == []
+    assert gen.main(quiet=True, enable_log=False, incremental=True) == 0
+    assert prompts == ["Define c"]
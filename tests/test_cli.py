@@ -0,0 +1,68 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+repo_root = Path(__file__).resolve().parents[1]
+sys.path.extend([str(repo_root), str(repo_root / "scripts")])
+import scripts.build as build
+import scripts.generate as gen
+from bench_startup import HEAVY_MODULES, LIGHT_COMMANDS, heavy_imports, import_profile
+
+
+@pytest.mark.parametrize("command", LIGHT_COMMANDS, ids=" ".join)
+def test_lightweight_commands_skip_heavy_imports(command):
+    modules = import_profile(command)
+    assert "argparse" in modules
+    assert heavy_imports(modules) == []
+
+
+def test_generate_script_help_is_lazy():
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", str(repo_root / "scripts" / "generate.py"), "--help"],
+        capture_output=True,
+        text=True,
+    )
+    assert proc.returncode == 0
+    assert "--queue-dir" in proc.stdout
+    imported = proc.stderr
+    for name in HEAVY_MODULES:
+        assert f"| {name}\n" not in imported
+
+
+def test_unknown_command_rejected():
+    proc = subprocess.run(
+        [sys.executable, str(repo_root / "scripts" / "encyclopedia.py"), "bogus"],
+        capture_output=True,
+        text=True,
+    )
+    assert proc.returncode == 2
+
+
+def test_render_prints_prompts_without_api(pipeline, tmp_path, monkeypatch):
+    pipeline({
+        "domain": ["d", "d"],
+        "topic": ["alpha", "beta"],
+        "subtopic": ["s", "s"],
+        "prompt_type": ["definition", "definition"],
+    })
+    monkeypatch.setattr(gen, "generate_content", lambda prompt, **kwargs: pytest.fail("API called"))
+
+    out = tmp_path / "prompts"
+    assert gen.render_cli(["--out", str(out)]) == 0
+    assert (out / "d-beta-s.prompt.txt").read_text(encoding="utf-8") == "Topic: beta"
+    assert len(list(out.iterdir())) == 2
+
+
+def test_build_runs_steps_in_process(monkeypatch):
+    calls = []
+    monkeypatch.setattr(build, "run_generate", lambda: calls.append("generate") or 0)
+
+    def crash():
+        calls.append("compile")
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(build, "run_compile", crash)
+    assert build.main([]) == 1
+    assert calls == ["generate", "compile"]
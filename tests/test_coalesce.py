@@ -0,0 +1,76 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+repo_root = Path(__file__).resolve().parents[1]
+sys.path.extend([str(repo_root), str(repo_root / "scripts")])
+import scripts.generate as gen
+from coalesce import PromptCoalescer, dedupe_report
+
+
+def test_dedupe_report_counts_saved_calls():
+    assert dedupe_report(["a", "b", "a", "a"]) == {"planned": 4, "unique": 2, "saved": 2}
+
+
+def test_concurrent_callers_share_one_call():
+    calls = []
+    release = threading.Event()
+
+    def slow(prompt):
+        calls.append(prompt)
+        release.wait(5)
+        return prompt.upper(), None
+
+    coalescer = PromptCoalescer(slow)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(coalescer.get("same")))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert calls == ["same"]
+    assert results == [("SAME", None)] * 8
+    assert coalescer.calls == 1
+    assert coalescer.hits == 7
+
+
+def test_exceptions_are_shared():
+    def boom(prompt):
+        raise RuntimeError("down")
+
+    coalescer = PromptCoalescer(boom)
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="down"):
+            coalescer.get("p")
+    assert coalescer.calls == 1
+
+
+def test_duplicate_rows_issue_one_api_call(pipeline, tmp_path, monkeypatch):
+    out_dir = pipeline({
+        "id": ["A", "A", "B"],
+        "domain": ["d", "d", "d"],
+        "topic": ["t", "t", "t"],
+        "subtopic": ["s", "s", "other"],
+        "prompt_type": ["definition"] * 3,
+    }).out
+    metrics = tmp_path / "metrics.json"
+
+    prompts = []
+    monkeypatch.setattr(gen, "generate_content", lambda prompt, **kwargs: (prompts.append(prompt), ("c", None))[1])
+
+    assert gen.main(enable_log=False, metrics_file=str(metrics)) == 0
+
+    assert prompts == ["Topic: t"]
+    assert sorted(p.name for p in out_dir.glob("*.tex")) == ["d-t-other.tex", "d-t-s.tex"]
+    data = metrics.read_text(encoding="utf-8")
+    assert '"api_calls": 1' in data
+    assert '"api_calls_saved": 2' in data
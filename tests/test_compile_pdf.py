@@ -1,9 +1,12 @@
 from pathlib import Path
+import subprocess
 import sys
+import types
 from unittest.mock import patch
 
 sys.path.append(str(Path(__file__).resolve().parents[1] / "scripts"))
-from compile_pdf import compile_tex
+import compile_pdf
+from compile_pdf import BACKENDS, compile_all, compile_tex, select_backends
 
 
 def test_compile_tex_missing_pdflatex(tmp_path):
@@ -16,3 +19,181 @@ def test_compile_tex_missing_pdflatex(tmp_path):
 
     assert not ok
     assert "Install TeX Live" in reason
+
+
+def _fake_pdflatex(log_texts):
+    """Return a ``subprocess.run`` stub writing successive *log_texts*."""
+    calls = []
+
+    def run(cmd, **kwargs):
+        out_dir = Path(cmd[cmd.index("-output-directory") + 1])
+        stem = Path(cmd[-1]).stem
+        (out_dir / f"{stem}.log").write_text(log_texts[len(calls)], encoding="utf-8")
+        calls.append(cmd)
+
+    return run, calls
+
+
+def test_compile_tex_reruns_only_when_log_asks(tmp_path):
+    tex_file = tmp_path / "sample.tex"
+    tex_file.write_text("\\documentclass{article}\\begin{document}Hi\\end{document}")
+    rerun_log = "LaTeX Warning: Label(s) may have changed. Rerun to get cross-references right.\n"
+    run, calls = _fake_pdflatex([rerun_log, "clean\n"])
+
+    with patch("compile_pdf.subprocess.run", side_effect=run), \
+            patch("compile_pdf.PDF_OUTPUT_DIR", tmp_path), \
+            patch("compile_pdf.DIAGNOSTICS_FILE", tmp_path / "diag.jsonl"):
+        ok, _, passes = compile_pdf.compile_entry(tex_file, BACKENDS["pdflatex"], dry_run=False, force=True)
+    assert ok
+    assert len(calls) == passes == 2
+
+    run, calls = _fake_pdflatex(["clean\n"])
+    with patch("compile_pdf.subprocess.run", side_effect=run), \
+            patch("compile_pdf.PDF_OUTPUT_DIR", tmp_path), \
+            patch("compile_pdf.DIAGNOSTICS_FILE", tmp_path / "diag.jsonl"):
+        ok, _, passes = compile_pdf.compile_entry(tex_file, BACKENDS["pdflatex"], dry_run=False, force=True)
+    assert ok
+    assert len(calls) == passes == 1
+
+
+def test_compile_tex_failure_reports_log_errors(tmp_path):
+    tex_file = tmp_path / "sample.tex"
+    tex_file.write_text("\\documentclass{article}\\begin{document}Hi\\end{document}")
+    (tmp_path / "sample.log").write_text(
+        "! Undefined control sequence.\nl.3 \\foo\n", encoding="utf-8"
+    )
+    err = subprocess.CalledProcessError(1, "pdflatex", output=b"", stderr=b"")
+    diag = tmp_path / "diag.jsonl"
+
+    with patch("compile_pdf.subprocess.run", side_effect=err), \
+            patch("compile_pdf.PDF_OUTPUT_DIR", tmp_path), \
+            patch("compile_pdf.DIAGNOSTICS_FILE", diag):
+        ok, reason = compile_tex(tex_file, dry_run=False, force=True)
+
+    assert not ok
+    assert reason == "l.3: Undefined control sequence."
+    assert (tmp_path / "sample.log").exists()
+    assert '"kind": "error"' in diag.read_text(encoding="utf-8")
+
+
+def _write_html(path, body):
+    path.write_text(f"<!DOCTYPE html><html><body>{body}</body></html>", encoding="utf-8")
+
+
+def test_select_backends_per_entry(tmp_path):
+    tex = "\\documentclass{article}\\begin{document}Hi\\end{document}"
+    for stem in ("light", "heavy", "texonly"):
+        (tmp_path / f"{stem}.tex").write_text(tex, encoding="utf-8")
+    _write_html(tmp_path / "light.html", "<p>$x$ and $y$</p>")
+    _write_html(tmp_path / "heavy.html", "<p>\\[ \\int_0^1 f \\]</p>")
+    _write_html(tmp_path / "htmlonly.html", "<p>plain</p>")
+    files = sorted(tmp_path.iterdir())
+
+    auto = {path.name: backend.name for path, backend in select_backends(files)}
+    assert auto == {
+        "heavy.tex": "pdflatex",
+        "htmlonly.html": "weasyprint",
+        "light.html": "weasyprint",
+        "texonly.tex": "pdflatex",
+    }
+    forced = [path.name for path, _ in select_backends(files, "pdflatex")]
+    assert forced == ["heavy.tex", "light.tex", "texonly.tex"]
+
+
+def _fake_weasyprint(monkeypatch, calls):
+    class FontConfiguration:
+        def __init__(self):
+            calls.append("fonts")
+
+    class CSS:
+        def __init__(self, string, font_config):
+            calls.append("css")
+
+    class HTML:
+        def __init__(self, filename, base_url):
+            self.filename = filename
+
+        def write_pdf(self, target, stylesheets, font_config):
+            calls.append(Path(self.filename).name)
+            Path(target).write_bytes(b"%PDF-1.7\n")
+
+    module = types.ModuleType("weasyprint")
+    module.CSS, module.HTML = CSS, HTML
+    fonts = types.ModuleType("weasyprint.text.fonts")
+    fonts.FontConfiguration = FontConfiguration
+    monkeypatch.setitem(sys.modules, "weasyprint", module)
+    monkeypatch.setitem(sys.modules, "weasyprint.text", types.ModuleType("weasyprint.text"))
+    monkeypatch.setitem(sys.modules, "weasyprint.text.fonts", fonts)
+
+
+def test_weasyprint_backend_reuses_fonts_and_stylesheet(tmp_path, monkeypatch):
+    calls = []
+    _fake_weasyprint(monkeypatch, calls)
+    monkeypatch.setattr(compile_pdf, "_WEASYPRINT", {})
+    monkeypatch.setattr(compile_pdf, "PDF_OUTPUT_DIR", tmp_path / "pdf")
+    _write_html(tmp_path / "a.html", "<p>a</p>")
+    _write_html(tmp_path / "b.html", "<p>b</p>")
+    entries = [(tmp_path / name, BACKENDS["weasyprint"]) for name in ("a.html", "b.html")]
+
+    timings = {}
+    results = compile_all(entries, dry_run=False, force=True, jobs=1, timings=timings)
+
+    assert results == [(True, ""), (True, "")]
+    assert calls == ["fonts", "css", "a.html", "b.html"]
+    assert (tmp_path / "pdf" / "a.pdf").exists()
+    assert set(timings) == {tmp_path / "a.html", tmp_path / "b.html"}
+
+
+def test_history_rows_record_engine_and_error_class(tmp_path):
+    entries = [(tmp_path / "a.html", BACKENDS["weasyprint"]), (tmp_path / "b.tex", BACKENDS["pdflatex"])]
+    timings = {tmp_path / "a.html": 0.25}
+
+    passes = {tmp_path / "a.html": 1, tmp_path / "b.tex": 2}
+
+    rows = compile_pdf.history_rows(entries, [(True, ""), (False, "Error code: 500")], timings, passes)
+
+    assert [(r["entry"], r["stage"], r["status"], r["engine"], r["error_class"]) for r in rows] == [
+        ("a", "compile", "success", "weasyprint", None),
+        ("b", "compile", "failure", "pdflatex", "http_500"),
+    ]
+    assert [r["latency"] for r in rows] == [0.25, None]
+    assert [r["attempts"] for r in rows] == [1, 2]
+
+
+def test_weasyprint_pool_reports_missing_dependency(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "weasyprint", None)
+    monkeypatch.setattr(compile_pdf, "_WEASYPRINT", {})
+    monkeypatch.setattr(compile_pdf, "PDF_OUTPUT_DIR", tmp_path / "pdf")
+    _write_html(tmp_path / "a.html", "<p>a</p>")
+    _write_html(tmp_path / "b.html", "<p>b</p>")
+    (tmp_path / "c.html").write_text("", encoding="utf-8")
+    entries = [(tmp_path / name, BACKENDS["weasyprint"]) for name in ("a.html", "b.html", "c.html")]
+
+    results = compile_all(entries, dry_run=False, force=True, jobs=2)
+
+    assert [ok for ok, _ in results] == [False, False, False]
+    assert results[2][1] == "empty file"
+    assert "weasyprint" in results[0][1]
+
+
+def test_single_file_without_backend_fails(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(compile_pdf, "OUTPUT_DIR", tmp_path)
+    (tmp_path / "foo.txt").write_text("x", encoding="utf-8")
+    (tmp_path / "x.tex").write_text("\\documentclass{article}\\begin{document}Hi\\end{document}", encoding="utf-8")
+
+    assert compile_pdf.main(["--file", "foo.txt", "--dry-run"]) == 1
+    assert "no PDF backend for .txt files" in capsys.readouterr().out
+    assert compile_pdf.main(["--file", "x.tex", "--backend", "weasyprint", "--dry-run"]) == 1
+    assert "no source for the weasyprint backend" in capsys.readouterr().out
+
+
+def test_validate_checks_html_entries(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(compile_pdf, "OUTPUT_DIR", tmp_path)
+    (tmp_path / "a.tex").write_text("\\documentclass{article}\\begin{document}Hi\\end{document}", encoding="utf-8")
+    _write_html(tmp_path / "b.html", "<p>b</p>")
+    (tmp_path / "c.html").write_text("<html>no body</html>", encoding="utf-8")
+
+    assert compile_pdf.validate_cli([]) == 1
+    out = capsys.readouterr().out
+    assert "a.tex: ok" in out and "b.html: ok" in out and "c.html: missing <body>" in out
+    assert "2 valid" in out
@@ -0,0 +1,165 @@
+import json
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+import pytest
+
+repo_root = Path(__file__).resolve().parents[1]
+sys.path.extend([str(repo_root), str(repo_root / "scripts")])
+import scripts.generate as gen
+from concurrency import AIMDController, classify_error, percentile
+from history import HISTORY_NAME, RunHistory
+
+
+@pytest.mark.parametrize(
+    "err, expected",
+    [
+        (None, "ok"),
+        ("Error code: 429 - {'error': 'Rate limit reached'}", "throttled"),
+        ("Error code: 503 - overloaded", "throttled"),
+        ("Error code: 400 - bad request", "error"),
+        ("Request timed out.", "throttled"),
+        ("response exceeds 10 characters", "error"),
+    ],
+)
+def test_classify_error(err, expected):
+    assert classify_error(err) == expected
+
+
+def test_percentile():
+    assert percentile([5, 1, 3, 2, 4], 95) == 5
+    assert percentile([5, 1, 3, 2, 4], 50) == 3
+
+
+def test_additive_increase_bounded_by_max():
+    ctl = AIMDController(min_workers=1, max_workers=3, initial_workers=1, window=2)
+    for _ in range(10):
+        ctl.record(time.monotonic(), 0.1)
+    assert ctl.limit == 3
+    assert [d["limit"] for d in ctl.decisions] == [2, 3]
+
+
+def test_throttle_backs_off_once_per_wave():
+    ctl = AIMDController(min_workers=1, max_workers=16, initial_workers=8, window=100)
+    wave_start = time.monotonic()
+    ctl.record(wave_start, 1.0, "throttled")
+    ctl.record(wave_start, 1.0, "throttled")
+    assert ctl.limit == 4
+    ctl.record(time.monotonic(), 1.0, "throttled")
+    assert ctl.limit == 2
+    assert all(d["reason"] == "throttled" for d in ctl.decisions)
+
+
+def test_latency_spike_and_errors_back_off():
+    ctl = AIMDController(min_workers=2, max_workers=16, initial_workers=8, window=4, target_p95=1.0)
+    for lat in (0.1, 0.1, 0.1, 5.0):
+        ctl.record(time.monotonic(), lat)
+    assert ctl.limit == 4
+    assert ctl.decisions[-1]["reason"].startswith("p95")
+
+    for outcome in ("error", "error", "ok", "ok"):
+        ctl.record(time.monotonic(), 0.1, outcome)
+    assert ctl.limit == 2
+    assert ctl.decisions[-1]["reason"].startswith("error rate")
+
+
+def test_slot_respects_limit():
+    ctl = AIMDController(min_workers=1, max_workers=2, initial_workers=2)
+
+    def work():
+        with ctl.slot():
+            time.sleep(0.02)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert ctl.peak_in_flight == 2
+    assert ctl.in_flight == 0
+
+
+def fake_openai(create):
+    """An ``openai`` module whose client answers through *create*."""
+
+    class OpenAI:
+        def __init__(self, **kwargs):
+            self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=create))
+
+    return types.SimpleNamespace(OpenAI=OpenAI)
+
+
+def completion(text):
+    message = types.SimpleNamespace(content=text)
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+
+def test_each_attempt_takes_a_slot_and_backoff_releases_it(monkeypatch):
+    ctl = AIMDController(min_workers=1, max_workers=4, initial_workers=4, window=100)
+    replies = iter([Exception("Error code: 429 - slow down"), completion("done")])
+
+    def create(**kwargs):
+        assert ctl.in_flight == 1
+        reply = next(replies)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    sleeps = []
+    monkeypatch.setitem(sys.modules, "openai", fake_openai(create))
+    monkeypatch.setattr(gen.time, "sleep", lambda seconds: sleeps.append(ctl.in_flight))
+
+    assert gen.generate_content("p", retries=3, controller=ctl) == ("done", None)
+    assert sleeps == [0]
+    assert [d["reason"] for d in ctl.decisions] == ["throttled"]
+    assert ctl.limit == 2 and len(ctl._all_latencies) == 2
+
+
+def test_retries_are_recorded_as_attempts(pipeline, monkeypatch):
+    logs = pipeline({"domain": ["d"], "topic": ["a"], "subtopic": ["s"], "prompt_type": ["definition"]}).logs
+    replies = iter([Exception("Error code: 503 - overloaded"), Exception("Request timed out."), completion("c")])
+
+    def create(**kwargs):
+        reply = next(replies)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    monkeypatch.setitem(sys.modules, "openai", fake_openai(create))
+    monkeypatch.setattr(gen.time, "sleep", lambda seconds: None)
+    assert gen.main(quiet=True) == 0
+
+    with RunHistory(logs / HISTORY_NAME) as h:
+        assert [tuple(r) for r in h.conn.execute("SELECT entry, attempts FROM rows")] == [("d-a-s", 3)]
+
+
+def test_main_adaptive_reports_controller_metrics(pipeline, tmp_path, monkeypatch):
+    out_dir = pipeline(
+        {
+            "domain": ["d"] * 12,
+            "topic": [f"topic{i}" for i in range(12)],
+            "subtopic": ["sub"] * 12,
+            "prompt_type": ["definition"] * 12,
+        },
+        config="start_index = 0\nmax_entries = 12\n\n[concurrency]\n"
+        "min_workers = 1\nmax_workers = 3\ninitial_workers = 1\nwindow = 2\n",
+    ).out
+    metrics_file = tmp_path / "metrics.json"
+
+    def create(**kwargs):
+        time.sleep(0.01)
+        return completion("c")
+
+    monkeypatch.setitem(sys.modules, "openai", fake_openai(create))
+    assert gen.main(enable_log=False, quiet=True, adaptive=True, metrics_file=str(metrics_file)) == 0
+
+    assert len(list(out_dir.glob("*.tex"))) == 12
+    metrics = json.loads(metrics_file.read_text(encoding="utf-8"))
+    conc = metrics["concurrency"]
+    assert conc["max_workers"] == 3
+    assert conc["limit"] == 3
+    assert 1 <= conc["peak_in_flight"] <= 3
+    assert conc["decisions"][0]["reason"] == "healthy"
@@ -49,9 +49,9 @@ def setup_env(tmp_path, monkeypatch):
     monkeypatch.setattr(generate, "JSONL_LOG_FILE", logs_dir / "log.jsonl")
 
     # Stub out heavy functions
-    monkeypatch.setattr(generate, "generate_content", lambda prompt: ("new", None))
+    monkeypatch.setattr(generate, "generate_content", lambda prompt, **kwargs: ("new", None))
     monkeypatch.setattr(generate, "convert_markdown_to_latex", lambda text: text)
-    monkeypatch.setattr(generate, "TEX_WRAPPER", "{body}")
+    monkeypatch.setattr(generate.renderers.LatexRenderer, "TEX_WRAPPER", "{body}")
 
     return output_dir / "domain-topic-sub.tex"
 
@@ -91,3 +91,15 @@ def test_file_handling(tmp_path, monkeypatch, skip_existing, overwrite, expected
             assert content == "old"
         else:
             assert content == "new"
+
+
+def test_html_format_writes_html_pages(tmp_path, monkeypatch):
+    target = setup_env(tmp_path, monkeypatch).with_suffix(".html")
+
+    assert generate.main(enable_log=False, fmt="html", quiet=True) == 0
+
+    page = target.read_text(encoding="utf-8")
+    assert page.startswith("<!DOCTYPE html>")
+    assert "<title>Sub</title>" in page
+    assert "<!-- Topic: Topic -->" in page
+    assert "<p>new</p>" in page
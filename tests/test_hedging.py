@@ -0,0 +1,150 @@
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+repo_root = Path(__file__).resolve().parents[1]
+sys.path.extend([str(repo_root), str(repo_root / "scripts")])
+import scripts.generate as gen
+from history import RunHistory
+from bench_hedging import pareto_stub
+from concurrency import percentile
+from hedging import Hedger
+
+
+def warm(hedger, n):
+    for i in range(n):
+        hedger.call(f"warm{i}")
+
+
+def test_slow_call_is_hedged_and_duplicate_wins():
+    calls = []
+    lock = threading.Lock()
+
+    def fn(prompt):
+        with lock:
+            calls.append(prompt)
+            first_slow = prompt == "slow" and calls.count("slow") == 1
+        time.sleep(1.0 if first_slow else 0.005)
+        return prompt, None
+
+    hedger = Hedger(fn, percentile=90, budget=0.5, min_samples=5)
+    try:
+        warm(hedger, 5)
+        start = time.monotonic()
+        assert hedger.call("slow") == ("slow", None)
+        assert time.monotonic() - start < 0.5
+    finally:
+        hedger.close()
+    assert calls.count("slow") == 2
+    assert hedger.metrics()["hedges"] == 1
+    assert hedger.metrics()["hedge_wins"] == 1
+
+
+def test_no_hedging_while_warming_up():
+    hedger = Hedger(lambda p: (p, None), min_samples=10, budget=1.0)
+    try:
+        warm(hedger, 9)
+    finally:
+        hedger.close()
+    assert hedger.hedges == 0
+
+
+def test_failed_hedge_does_not_beat_success():
+    def fn(prompt):
+        if threading.current_thread().name.endswith("_1"):
+            return None, "boom"
+        time.sleep(0.05)
+        return "ok", None
+
+    hedger = Hedger(fn, percentile=50, budget=1.0, min_samples=1, max_workers=2,
+                    is_success=lambda r: r[0] is not None)
+    hedger._latencies.append(0.001)
+    try:
+        assert hedger.call("p") == ("ok", None)
+    finally:
+        hedger.close()
+
+
+def test_failures_do_not_set_the_hedge_delay():
+    hedger = Hedger(lambda ok: ("c", None) if ok else (None, "Error code: 429"),
+                    min_samples=2, is_success=lambda r: r[0] is not None)
+    try:
+        for _ in range(3):
+            hedger.call(False)
+        assert hedger.hedge_delay() is None
+        hedger.call(True)
+        hedger.call(True)
+        time.sleep(0.05)  # done callbacks run after the result is handed out
+        assert hedger.hedge_delay() is not None
+    finally:
+        hedger.close()
+
+
+def test_budget_caps_hedges_on_heavy_tail():
+    hedger = Hedger(pareto_stub(0.002, 1.1, seed=3), percentile=80, budget=0.05, min_samples=10)
+    try:
+        latencies = []
+        for i in range(200):
+            start = time.monotonic()
+            hedger.call(f"p{i}")
+            latencies.append(time.monotonic() - start)
+    finally:
+        hedger.close()
+    assert 0 < hedger.hedges <= 0.05 * hedger.requests
+    assert percentile(latencies, 50) < 0.05
+
+
+def test_hedging_rejected_with_streaming():
+    with pytest.raises(ValueError):
+        gen.main(hedge=True, stream=True)
+
+
+ROWS = {
+    "domain": ["d"] * 3,
+    "topic": [f"topic{i}" for i in range(3)],
+    "subtopic": ["sub"] * 3,
+    "prompt_type": ["definition"] * 3,
+}
+
+
+def test_main_reports_hedging_metrics(pipeline, tmp_path, monkeypatch):
+    pipeline(ROWS, config="start_index = 0\nmax_entries = 3\n\n[hedging]\nbudget = 0.1\nmin_samples = 50\n")
+    metrics_file = tmp_path / "metrics.json"
+    monkeypatch.setattr(gen, "generate_content", lambda prompt, **kwargs: ("c", None))
+
+    assert gen.main(enable_log=False, quiet=True, hedge=True, metrics_file=str(metrics_file)) == 0
+    hedging = json.loads(metrics_file.read_text(encoding="utf-8"))["hedging"]
+    assert hedging == {"requests": 3, "hedges": 0, "hedge_wins": 0, "budget": 0.1, "percentile": 95.0}
+
+
+def test_abandoned_hedge_attempts_are_not_recorded(pipeline, monkeypatch):
+    paths = pipeline(
+        ROWS,
+        config="start_index = 0\nmax_entries = 3\n\n[hedging]\nbudget = 0.5\nmin_samples = 1\npercentile = 50\n",
+    )
+    calls = []
+    lock = threading.Lock()
+
+    def fake(prompt, **kwargs):
+        with lock:
+            calls.append(prompt)
+            first = calls.count(prompt) == 1
+        if prompt.endswith("topic1") and first:
+            time.sleep(0.2)  # the primary loses to the hedge...
+            return "slow", None
+        if prompt.endswith("topic2"):
+            time.sleep(0.5)  # ...and finishes while topic2 is still running
+        return "fast", None
+
+    monkeypatch.setattr(gen, "generate_content", fake)
+    assert gen.main(quiet=True, hedge=True) == 0
+
+    assert calls.count("Topic: topic1") == 2
+    assert "fast" in (paths.out / "d-topic1-sub.tex").read_text(encoding="utf-8")
+    with RunHistory(paths.logs / "history.sqlite") as history:
+        attempts = {r["entry"]: r["attempts"] for r in history.conn.execute("SELECT entry, attempts FROM rows")}
+    assert attempts == {"d-topic0-sub": 1, "d-topic1-sub": 1, "d-topic2-sub": 1}
@@ -0,0 +1,105 @@
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+repo_root = Path(__file__).resolve().parents[1]
+sys.path.extend([str(repo_root), str(repo_root / "scripts")])
+import scripts.generate as gen
+import scripts.history as history
+from history import HISTORY_NAME, RunHistory, error_class
+
+
+def row(entry, status="success", latency=1.0, **extra):
+    return {"entry": entry, "stage": "generate", "status": status, "latency": latency, **extra}
+
+
+def test_error_class_buckets():
+    assert error_class(None) is None
+    assert error_class("Error code: 503 - overloaded") == "http_503"
+    assert error_class("Request timed out.") == "timeout"
+    assert error_class("Rate limit reached for gpt-4o-mini") == "rate_limit"
+    assert error_class("response is missing section Definition") == "validation"
+    assert error_class("boom") == "other"
+
+
+def test_compare_flags_slowdowns_and_new_failures(tmp_path):
+    with RunHistory(tmp_path / "h.sqlite") as h:
+        for latency in (1.0, 1.2, 5.0):
+            h.record_run("generate", [row("a", latency=latency), row("b"), row("c", "failure")], started=0)
+        h.record_run("compile", [row("a", latency=60.0)], started=0)
+        run = h.record_run(
+            "generate",
+            [row("a", latency=4.0), row("b", "failure", error_class="http_503"), row("c"), row("d", latency=9.0)],
+            started=0,
+        )
+
+        report = h.compare("generate", window=3)
+        assert report["run"] == run and len(report["baseline"]) == 3
+        assert report["latency"] == [{"entry": "a", "latency": 4.0, "baseline": 1.2}]
+        assert report["failures"] == [{"entry": "b", "error_class": "http_503"}]
+        assert report["fixed"] == [{"entry": "c"}]
+
+        assert h.compare("generate", window=3, min_latency=3.0)["latency"] == []
+        assert h.compare("generate", window=1)["latency"] == []
+        assert [r["failures"] for r in h.runs("generate")] == [1, 1, 1, 1]
+
+        indexes = {r[0] for r in h.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {"rows_run_stage", "rows_entry"} <= indexes
+
+
+def test_report_exit_status(tmp_path, capsys):
+    db = tmp_path / "h.sqlite"
+    assert history.main(["--db", str(db)]) == 0
+    with RunHistory(db) as h:
+        h.record_run("generate", [row("a")], started=0)
+        assert history.main(["--db", str(db)]) == 0
+        h.record_run("generate", [row("a", "failure", error_class="timeout")], started=0)
+
+    assert history.main(["--db", str(db)]) == 1
+    assert "FAILING  a (timeout)" in capsys.readouterr().out
+    assert history.main(["--db", str(db), "--run", "1"]) == 0
+    capsys.readouterr()
+    assert history.main(["--db", str(db), "--list", "--json"]) == 0
+    assert [r["id"] for r in json.loads(capsys.readouterr().out)] == [2, 1]
+
+
+def test_generate_records_each_row(pipeline, monkeypatch):
+    logs = pipeline({
+        "domain": ["d", "d"],
+        "topic": ["a", "b"],
+        "subtopic": ["s", "s"],
+        "prompt_type": ["definition", "definition"],
+    }).logs
+
+    def fake(prompt, **kwargs):
+        if prompt.endswith("b"):
+            return None, "Error code: 429 - Rate limit reached"
+        return "content", None
+
+    monkeypatch.setattr(gen, "generate_content", fake)
+    assert gen.main(quiet=True) == 1
+
+    conn = sqlite3.connect(logs / HISTORY_NAME)
+    rows = conn.execute(
+        "SELECT entry, stage, prompt_type, status, error_class, latency IS NOT NULL FROM rows ORDER BY entry"
+    ).fetchall()
+    assert rows == [
+        ("d-a-s", "generate", "definition", "success", None, 1),
+        ("d-b-s", "generate", "definition", "failure", "http_429", 1),
+    ]
+    assert conn.execute("SELECT command, finished >= started FROM runs").fetchall() == [("generate", 1)]
+
+
+def test_generate_records_api_time_not_wall_time(pipeline, monkeypatch):
+    logs = pipeline({"domain": ["d"], "topic": ["a"], "subtopic": ["s"], "prompt_type": ["definition"]}).logs
+
+    def fake(prompt, *, usage, **kwargs):
+        usage.update(prompt_tokens=10, completion_tokens=20, seconds=2.5)
+        return "content", None
+
+    monkeypatch.setattr(gen, "generate_content", fake)
+    assert gen.main(quiet=True) == 0
+
+    with RunHistory(logs / HISTORY_NAME) as h:
+        assert [tuple(r) for r in h.conn.execute("SELECT entry, latency, attempts FROM rows")] == [("d-a-s", 2.5, 1)]
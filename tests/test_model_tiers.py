@@ -0,0 +1,130 @@
+import json
+import sys
+from pathlib import Path
+
+repo_root = Path(__file__).resolve().parents[1]
+sys.path.extend([str(repo_root), str(repo_root / "scripts")])
+import scripts.generate as gen
+from registry import ModelTier, TemplateRegistry
+
+REGISTRY = """
+[templates]
+definition = "prompts/definition.txt"
+
+[models.default]
+models = ["small"]
+
+[models.definition]
+models = ["fast", "strong"]
+max_tokens = 100
+timeout = 5
+retries = 1
+
+[pricing]
+fast = { input = 1.0, output = 2.0 }
+"""
+
+
+def test_registry_loads_tiers_and_pricing(tmp_path):
+    path = tmp_path / "registry.toml"
+    path.write_text(REGISTRY, encoding="utf-8")
+    registry = TemplateRegistry.from_toml(path, base_dir=tmp_path)
+
+    assert registry.get("definition") == (tmp_path / "prompts" / "definition.txt").resolve()
+    assert registry.tier("definition") == ModelTier(["fast", "strong"], 100, 5, 1)
+    assert registry.tier("computation").models == ["small"]
+    assert registry.cost("fast", 1_000_000, 500_000) == 2.0
+    assert registry.cost("strong", 10, 10) is None
+
+
+def test_repo_registry_defines_every_prompt_type():
+    registry = TemplateRegistry.from_toml(repo_root / "prompt_registry.toml", base_dir=repo_root)
+    for prompt_type in ("definition", "abstract", "computation"):
+        assert registry.get(prompt_type).exists()
+        tier = registry.tier(prompt_type)
+        assert tier.models
+        assert all(model in registry.pricing for model in tier.models)
+        assert tier.models[0] == gen.MODEL
+
+
+def test_fallback_moves_to_next_model():
+    registry = TemplateRegistry()
+    registry.pricing = {"strong": {"input": 1.0, "output": 1.0}}
+    calls = []
+
+    def call(**opts):
+        calls.append(opts)
+        if opts["model"] == "fast":
+            return None, "Request timed out."
+        opts["usage"].update(prompt_tokens=10, completion_tokens=20)
+        return "ok", None
+
+    attempts = []
+    result = gen.generate_with_fallback(
+        call, ModelTier(["fast", "strong"], max_tokens=50, timeout=3), retries=4,
+        registry=registry, attempts=attempts,
+    )
+
+    assert result == ("ok", None)
+    assert [c["model"] for c in calls] == ["fast", "strong"]
+    assert calls[0]["retries"] == 4 and calls[0]["max_tokens"] == 50 and calls[0]["timeout"] == 3
+    assert [a["model"] for a in attempts] == ["fast", "strong"]
+    assert attempts[0]["error"] == "Request timed out."
+    assert attempts[0]["cost"] is None
+    assert attempts[1]["cost"] == 0.00003
+
+
+def test_fallback_without_tier_uses_plain_call():
+    def call(*, retries, usage):
+        usage.update(prompt_tokens=10, completion_tokens=5, seconds=1.5)
+        return f"retries={retries}", None
+
+    attempts = []
+    result = gen.generate_with_fallback(call, None, retries=2, registry=TemplateRegistry(), attempts=attempts)
+    assert result == ("retries=2", None)
+    assert [(a["model"], a["latency"], a["prompt_tokens"]) for a in attempts] == [(gen.MODEL, 1.5, 10)]
+
+
+def test_explicit_retries_override_tier():
+    seen = []
+
+    def call(**opts):
+        seen.append(opts["retries"])
+        return "ok", None
+
+    tier = ModelTier(["fast"], retries=1)
+    for retries in (None, 5):
+        gen.generate_with_fallback(call, tier, retries=retries, registry=TemplateRegistry(), attempts=[])
+    gen.generate_with_fallback(call, ModelTier(["fast"]), retries=None, registry=TemplateRegistry(), attempts=[])
+    gen.generate_with_fallback(call, None, retries=None, registry=TemplateRegistry(), attempts=[])
+    assert seen == [1, 5, gen.DEFAULT_RETRIES, gen.DEFAULT_RETRIES]
+
+
+def test_main_records_models_per_row(pipeline, tmp_path, monkeypatch):
+    logs = pipeline(
+        {
+            "domain": ["d", "d"],
+            "topic": ["a", "b"],
+            "subtopic": ["s", "s"],
+            "prompt_type": ["definition", "definition"],
+        },
+        registry=REGISTRY,
+    ).logs
+    metrics_file = tmp_path / "metrics.json"
+
+    def fake(prompt, *, model, usage, **kwargs):
+        if model == "fast" and prompt.endswith("a"):
+            return None, "Error code: 503 - overloaded"
+        usage.update(prompt_tokens=100, completion_tokens=100)
+        return "c", None
+
+    monkeypatch.setattr(gen, "generate_content", fake)
+    assert gen.main(quiet=True, metrics_file=str(metrics_file)) == 0
+
+    records = [json.loads(line) for line in (logs / "log.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert [[m["model"] for m in r["models"]] for r in records] == [["fast", "strong"], ["fast"]]
+    models = json.loads(metrics_file.read_text(encoding="utf-8"))["models"]
+    assert models["fast"]["calls"] == 2
+    assert models["fast"]["failures"] == 1
+    assert models["fast"]["cost"] == 0.0003
+    assert models["strong"] == {"calls": 1, "failures": 0, "latency": models["strong"]["latency"], "cost": 0.0}
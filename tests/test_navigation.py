@@ -0,0 +1,127 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+repo_root = Path(__file__).resolve().parents[1]
+sys.path.extend([str(repo_root), str(repo_root / "scripts")])
+import scripts.generate as gen
+import scripts.navigation as navigation
+from navigation import NavigationIndex, load_or_build
+from utils import entry_stem
+
+CSV = """id,domain,topic,subtopic,prompt_type
+A.1,Algebra,Groups,Subgroups,definition
+A.1,Algebra,Groups,Cosets,definition
+A.1,Algebra,Groups,Normal Subgroups,abstract
+A.2,Algebra,Rings,Ideals,definition
+A.2,Algebra,Rings,Ideals,definition
+G.1,Geometry,Circles,Chords,computation
+G.1,Geometry,Circles,Cosets,definition
+X.1,Geometry,Circles,"%s",definition
+X.2,Geometry,Circles,???,definition
+""" % ("x" * 80)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "topics.csv"
+    path.write_text(CSV, encoding="utf-8")
+    return path
+
+
+def test_tree_has_parents_and_sibling_order(csv_path):
+    index = NavigationIndex.from_csv(csv_path)
+
+    assert index.roots == ["algebra", "geometry"]
+    groups = index.node("algebra/groups")
+    assert groups.slug == "algebra-groups" and groups.parent == "algebra"
+    assert [n.title for n in index.children("algebra/groups")] == ["Subgroups", "Cosets", "Normal Subgroups"]
+    ideals = index.node("algebra-rings-ideals")
+    assert (ideals.id, ideals.index, ideals.ref, ideals.prompt_type) == ("algebra/rings/ideals", 0, "A.2", "definition")
+    assert [n.title for n in index.breadcrumbs("algebra-groups-cosets")] == ["Algebra", "Groups", "Cosets"]
+    long_entry = index.node(entry_stem("Geometry", "Circles", "x" * 80))
+    assert long_entry.title == "x" * 80 and long_entry.ref == "X.1"
+    assert [n.title for n in index.children("geometry/circles")][-1] == "x" * 80
+    assert len(index) == 2 + 3 + 7
+
+
+def test_ids_survive_reordering(csv_path, tmp_path):
+    lines = csv_path.read_text(encoding="utf-8").splitlines()
+    shuffled = tmp_path / "shuffled.csv"
+    shuffled.write_text("\n".join([lines[0], *reversed(lines[1:])]), encoding="utf-8")
+
+    before = NavigationIndex.from_csv(csv_path)
+    after = NavigationIndex.from_csv(shuffled)
+
+    assert set(before.nodes) == set(after.nodes)
+    assert after.roots == ["geometry", "algebra"]
+    assert after.node("algebra/groups/subgroups").index == 2
+
+
+def test_cross_links(csv_path):
+    index = NavigationIndex.from_csv(csv_path)
+
+    before, after = index.neighbours("algebra-groups-cosets")
+    assert (before.title, after.title) == ("Subgroups", "Normal Subgroups")
+    assert [n.title for n in index.see_also("algebra-groups-normal-subgroups", limit=1)] == ["Cosets"]
+    assert index.resolve("  normal   SUBGROUPS ").slug == "algebra-groups-normal-subgroups"
+    assert index.resolve("Cosets") is None
+    text = "Every ideal is a subgroup; see Normal Subgroups, then Subgroups and Chords and cosets."
+    assert [n.title for n in index.mentions(text, exclude="geometry-circles-chords")] == [
+        "Normal Subgroups",
+        "Subgroups",
+    ]
+    with pytest.raises(KeyError):
+        index.node("missing")
+
+
+def test_json_is_rebuilt_once_per_catalogue_version(csv_path, tmp_path):
+    out = tmp_path / "site" / "navigation.json"
+
+    index, built = load_or_build(csv_path, out, href_prefix="/entries/")
+    assert built
+    data = json.loads(out.read_text(encoding="utf-8"))
+    assert data["catalogue"] == index.catalogue
+    assert data["nodes"]["algebra/rings"]["children"] == ["algebra/rings/ideals"]
+    algebra = data["tree"][0]
+    assert algebra["id"] == "algebra" and "href" not in algebra
+    assert algebra["children"][1]["children"] == [
+        {"id": "algebra/rings/ideals", "label": "Ideals", "href": "/entries/algebra-rings-ideals"}
+    ]
+
+    cached, built = load_or_build(csv_path, out, href_prefix="/entries/")
+    assert not built and cached.nodes == index.nodes
+    _, built = load_or_build(csv_path, out, href_prefix="/wiki/")
+    assert built and json.loads(out.read_text(encoding="utf-8"))["href_prefix"] == "/wiki/"
+    _, built = load_or_build(csv_path, out)
+    assert built and "href" not in json.dumps(json.loads(out.read_text(encoding="utf-8"))["tree"])
+    csv_path.write_text(CSV + "G.2,Geometry,Lines,Parallels,definition\n", encoding="utf-8")
+    rebuilt, built = load_or_build(csv_path, out)
+    assert built and "geometry/lines/parallels" in rebuilt
+
+    assert navigation.main(["--csv", str(csv_path), "--out", str(out), "--quiet"]) == 0
+
+
+def test_generate_appends_see_also(pipeline, monkeypatch):
+    out = pipeline(
+        {
+            "domain": ["d", "d", "d"],
+            "topic": ["t", "t", "t"],
+            "subtopic": ["One", "Two", "Three & Four"],
+            "prompt_type": ["definition"] * 3,
+        },
+        config="start_index = 0\nmax_entries = 1\n",
+        templates={"definition": "Define $subtopic"},
+    ).out
+    monkeypatch.setattr(gen, "generate_content", lambda prompt, **kwargs: ("Body", None))
+
+    assert gen.main(quiet=True, enable_log=False, see_also=2) == 0
+    tex = (out / "d-t-one.tex").read_text(encoding="utf-8")
+    assert "Body\n\n\\section*{See also}" in tex
+    assert tex.index("\\item Two") < tex.index("\\item Three \\& Four")
+
+    assert gen.main(quiet=True, enable_log=False, overwrite=True, fmt="html", see_also=1) == 0
+    html = (out / "d-t-one.html").read_text(encoding="utf-8")
+    assert '<a href="d-t-two.html">Two</a>' in html and "Three" not in html
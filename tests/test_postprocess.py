@@ -0,0 +1,109 @@
+import json
+import sys
+from pathlib import Path
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject
+
+repo_root = Path(__file__).resolve().parents[1]
+sys.path.extend([str(repo_root), str(repo_root / "scripts")])
+import scripts.postprocess as pp
+
+CSV = """id,domain,topic,subtopic,prompt_type
+1,Algebra,Groups,Subgroups,definition
+1,Algebra,Groups,Cosets,definition
+2,Algebra,Rings,Ideals,definition
+2,Algebra,Rings,Ideals,definition
+3,Geometry,Circles,Chords,definition
+"""
+
+
+def make_pdf(path, text, pages=1):
+    writer = PdfWriter()
+    for _ in range(pages):
+        page = writer.add_blank_page(200, 200)
+        stream = DecodedStreamObject()
+        stream.set_data(f"BT /F1 12 Tf 10 100 Td ({text}) Tj ET\n".encode() * 50)
+        page.replace_contents(stream)
+    writer.write(path)
+
+
+def test_recompress_shrinks_in_place(tmp_path):
+    make_pdf(tmp_path / "a.pdf", "alpha", pages=2)
+    make_pdf(tmp_path / "b.pdf", "beta")
+
+    summary = pp.recompress_all(sorted(tmp_path.glob("*.pdf")), jobs=2)
+
+    assert summary["files"] == 2
+    assert summary["bytes_after"] < summary["bytes_before"]
+    assert summary["saved_pct"] > 50
+    assert len(PdfReader(tmp_path / "a.pdf").pages) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.pdf", "b.pdf"]
+
+
+def test_recompress_keeps_smaller_original(tmp_path):
+    make_pdf(tmp_path / "a.pdf", "alpha")
+    pp.recompress_pdf(tmp_path / "a.pdf")
+    size = (tmp_path / "a.pdf").stat().st_size
+    assert pp.recompress_pdf(tmp_path / "a.pdf") == ("a.pdf", size, size)
+
+
+def test_taxonomy_keeps_catalogue_order(tmp_path):
+    csv_path = tmp_path / "topics.csv"
+    long_domain = "Philosophy " * 8
+    csv_path.write_text(CSV + f"4,{long_domain},Logic,Proof,definition\n4,Maths,Sets,???,definition\n", encoding="utf-8")
+    taxonomy = pp.load_taxonomy(csv_path)
+    assert taxonomy.pop(long_domain) == {"Logic": [("Proof", pp.entry_stem(long_domain, "Logic", "Proof"))]}
+    assert taxonomy == {
+        "Algebra": {
+            "Groups": [("Subgroups", "algebra-groups-subgroups"), ("Cosets", "algebra-groups-cosets")],
+            "Rings": [("Ideals", "algebra-rings-ideals")],
+        },
+        "Geometry": {"Circles": [("Chords", "geometry-circles-chords")]},
+    }
+
+
+def test_volume_outline_follows_taxonomy(tmp_path):
+    pdfs = tmp_path / "pdf"
+    pdfs.mkdir()
+    make_pdf(pdfs / "algebra-groups-subgroups.pdf", "sub", pages=2)
+    make_pdf(pdfs / "algebra-rings-ideals.pdf", "ideal")
+    csv_path = tmp_path / "topics.csv"
+    csv_path.write_text(CSV, encoding="utf-8")
+
+    volumes = pp.assemble_volumes(pp.load_taxonomy(csv_path), pdfs, tmp_path / "vol", jobs=1)
+
+    algebra, geometry = volumes
+    assert algebra["file"] == "algebra.pdf"
+    assert (algebra["entries"], algebra["missing"], algebra["pages"]) == (2, 1, 3)
+    assert algebra["pages_per_second"] > 0
+    assert geometry["file"] is None and not (tmp_path / "vol" / "geometry.pdf").exists()
+
+    reader = PdfReader(tmp_path / "vol" / "algebra.pdf")
+    assert len(reader.pages) == 3
+    groups, group_items, rings, ring_items = reader.outline
+    assert (groups.title, rings.title) == ("Groups", "Rings")
+    assert [item.title for item in group_items] == ["Subgroups"]
+    assert [item.title for item in ring_items] == ["Ideals"]
+    assert reader.get_destination_page_number(rings) == 2
+
+
+def test_main_reports_both_stages(tmp_path, monkeypatch):
+    pdfs = tmp_path / "pdf"
+    pdfs.mkdir()
+    make_pdf(pdfs / "geometry-circles-chords.pdf", "chord")
+    csv_path = tmp_path / "topics.csv"
+    csv_path.write_text(CSV, encoding="utf-8")
+    monkeypatch.setattr(pp, "PDF_DIR", pdfs)
+    metrics = tmp_path / "report.json"
+
+    rc = pp.main([
+        "--csv", str(csv_path), "--out", str(tmp_path / "vol"), "--domain", "Geometry",
+        "--jobs", "1", "--metrics-json", str(metrics), "--quiet",
+    ])
+
+    assert rc == 0
+    report = json.loads(metrics.read_text(encoding="utf-8"))
+    assert report["recompress"]["files"] == 1
+    assert [v["domain"] for v in report["volumes"]] == ["Geometry"]
+    assert (tmp_path / "vol" / "geometry.pdf").exists()
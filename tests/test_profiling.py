@@ -0,0 +1,73 @@
+import cProfile
+import json
+import pstats
+import sys
+import time
+from pathlib import Path
+
+repo_root = Path(__file__).resolve().parents[1]
+sys.path.extend([str(repo_root), str(repo_root / "scripts")])
+import scripts.generate as gen
+from profiling import StageProfiler, collapsed_stacks
+
+
+def busy(n):
+    return sum(i * i for i in range(n))
+
+
+def outer():
+    return busy(200_000) + busy(100_000)
+
+
+def test_collapsed_stacks_follow_call_paths():
+    profile = cProfile.Profile()
+    profile.enable()
+    outer()
+    profile.disable()
+
+    stacks = collapsed_stacks(pstats.Stats(profile))
+
+    paths = [stack.split(";") for stack in stacks]
+    assert any(p[-1].startswith("busy_(") and p[-2].startswith("outer_(") for p in paths)
+    assert all(" " not in stack for stack in stacks)
+    total = sum(stacks.values())
+    under_outer = sum(us for stack, us in stacks.items() if "outer_(" in stack)
+    assert under_outer > 0.9 * total
+
+
+def test_stage_profiler_separates_waiting_from_work(tmp_path):
+    profiler = StageProfiler(tmp_path, prefix="run")
+    with profiler.stage("sleep"):
+        time.sleep(0.1)
+    with profiler.stage("work"):
+        outer()
+    summary = json.loads(profiler.write_summary().read_text(encoding="utf-8"))
+
+    assert summary["sleep"]["cpu_ratio"] < 0.5
+    assert summary["work"]["cpu_ratio"] > summary["sleep"]["cpu_ratio"]
+    for stage in ("sleep", "work"):
+        assert (tmp_path / f"run-{stage}.pstats").exists()
+        assert (tmp_path / f"run-{stage}.folded").exists()
+    assert pstats.Stats(str(tmp_path / "run-work.pstats")).total_calls > 0
+    assert len(profiler.report()) == 2
+
+
+def test_disabled_profiler_writes_nothing(tmp_path):
+    profiler = StageProfiler(None)
+    with profiler.stage("x"):
+        pass
+    assert profiler.stages == {}
+    assert profiler.write_summary() is None
+
+
+def test_generate_profile_writes_every_stage(pipeline, tmp_path, monkeypatch):
+    pipeline({"domain": ["d"], "topic": ["a"], "subtopic": ["s"], "prompt_type": ["definition"]})
+    monkeypatch.setattr(gen, "generate_content", lambda prompt, **kwargs: ("ok", None))
+
+    profile_dir = tmp_path / "profile"
+    assert gen.main(quiet=True, enable_log=False, profile=str(profile_dir)) == 0
+
+    stages = json.loads((profile_dir / "generate-stages.json").read_text(encoding="utf-8"))
+    assert list(stages) == ["load", "plan", "generate", "finish"]
+    assert all({"wall", "cpu", "children_cpu", "cpu_ratio"} <= set(t) for t in stages.values())
+    assert (profile_dir / "generate-plan.folded").read_text(encoding="utf-8")
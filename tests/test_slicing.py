@@ -36,7 +36,7 @@ def setup_env(tmp_path, monkeypatch, config_start, config_limit):
     monkeypatch.setattr(gen, "CONFIG_FILE", config_path)
     monkeypatch.setattr(gen, "OUTPUT_DIR", out_dir)
     monkeypatch.setattr(gen, "PROMPT_TEMPLATES", {"definition": template})
-    monkeypatch.setattr(gen, "generate_content", lambda prompt: ("content", None))
+    monkeypatch.setattr(gen, "generate_content", lambda prompt, **kwargs: ("content", None))
 
     return out_dir
 
@@ -0,0 +1,160 @@
+import sys
+import types
+from pathlib import Path
+
+repo_root = Path(__file__).resolve().parents[1]
+sys.path.extend([str(repo_root), str(repo_root / "scripts")])
+
+import scripts.generate as gen
+from generate import convert_markdown_to_latex
+from streaming import (
+    IncrementalConverter,
+    StreamValidator,
+    consume_stream,
+    required_sections,
+)
+from utils import render_prompt
+
+RESPONSE = (
+    "\\section*{Sets}\n\\subsection*{Definition}\nA **set** is a collection $x_1 & x_2$.\n\n"
+    "\\subsection*{Core Principles}\nSee *Cantor* and\n\\[\na = b\n\n\\]\nfor 50% more...\n\n"
+    "\\subsection*{Further Reading}\nHalmos -- Naive Set Theory.\n"
+)
+
+
+def chunked(text, size=7):
+    for i in range(0, len(text), size):
+        yield text[i : i + size]
+
+
+def test_required_sections_from_template():
+    template = (repo_root / "prompts" / "prompt_template_definition.txt").read_text(encoding="utf-8")
+    prompt = render_prompt(template, domain="D", topic="T", subtopic="S")
+    sections = required_sections(prompt)
+    assert sections[:3] == ["Domain", "Subfield", "Definition"]
+    assert sections[-1] == "Further Reading"
+
+
+def test_incremental_converter_matches_batch_conversion():
+    converter = IncrementalConverter(convert_markdown_to_latex)
+    out = "".join(converter.feed(c) for c in chunked(RESPONSE)) + converter.flush()
+    assert out == convert_markdown_to_latex(RESPONSE)
+
+
+def test_consume_stream_writes_atomically(tmp_path):
+    dest = tmp_path / "entry.tex"
+    validator = StreamValidator(["Definition", "Core Principles", "Further Reading"])
+    content, err = consume_stream(
+        chunked(RESPONSE),
+        dest,
+        convert=convert_markdown_to_latex,
+        validator=validator,
+        header="<",
+        footer=">",
+    )
+    assert err is None
+    assert content == RESPONSE
+    assert dest.read_text(encoding="utf-8") == "<" + convert_markdown_to_latex(RESPONSE) + ">"
+    assert list(tmp_path.iterdir()) == [dest]
+
+
+def test_missing_section_cancels_early(tmp_path):
+    consumed = []
+
+    def chunks():
+        for c in chunked(RESPONSE + "x" * 10_000):
+            consumed.append(c)
+            yield c
+
+    validator = StreamValidator(["Definition", "Worked Example", "Further Reading"])
+    content, err = consume_stream(
+        chunks(), tmp_path / "e.tex", convert=str, validator=validator
+    )
+    assert content is None
+    assert err == "missing section 'Worked Example'"
+    assert len("".join(consumed)) < len(RESPONSE)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_off_format_and_length_cap():
+    assert StreamValidator().feed("```latex") == "response does not start with \\section*"
+    validator = StreamValidator(max_chars=20)
+    assert validator.feed("\\section*{A}\n") is None
+    assert validator.feed("y" * 20) == "response exceeds 20 characters"
+
+
+def test_missing_trailing_section_reported_at_finish():
+    validator = StreamValidator(["Definition", "Connections"])
+    for c in chunked(RESPONSE):
+        assert validator.feed(c) is None
+    assert validator.finish() == "missing section 'Connections'"
+
+
+def test_main_stream_mode_uses_streaming_call(pipeline, monkeypatch):
+    out_dir = pipeline({
+        "domain": ["d", "d"],
+        "topic": ["t", "t"],
+        "subtopic": ["a", "b"],
+        "prompt_type": ["definition", "definition"],
+    }).out
+    monkeypatch.setattr(gen.renderers.LatexRenderer, "TEX_WRAPPER", "{body}")
+
+    calls = []
+
+    def fake_stream(prompt, dest, *, fmt, max_chars, **kwargs):
+        calls.append((dest.name, max_chars))
+        dest.write_text("streamed", encoding="utf-8")
+        return "raw", None
+
+    monkeypatch.setattr(gen, "generate_content_stream", fake_stream)
+    assert gen.main(enable_log=False, quiet=True, stream=True, max_chars=500) == 0
+
+    # Both rows render the same prompt: one streamed call, the other reuses it.
+    assert calls == [("d-t-a.tex", 500)]
+    assert (out_dir / "d-t-a.tex").read_text(encoding="utf-8") == "streamed"
+    assert (out_dir / "d-t-b.tex").read_text(encoding="utf-8") == "raw"
+
+
+def fake_openai(chunks, requests):
+    """An ``openai`` module whose client streams *chunks* and records requests."""
+
+    class Stream:
+        closed = False
+
+        def __iter__(self):
+            for text in chunks:
+                delta = types.SimpleNamespace(content=text)
+                yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)], usage=None)
+            usage = types.SimpleNamespace(prompt_tokens=12, completion_tokens=34)
+            yield types.SimpleNamespace(choices=[], usage=usage)
+
+        def close(self):
+            self.closed = True
+
+    def create(**kwargs):
+        requests.append(kwargs)
+        return Stream()
+
+    class OpenAI:
+        def __init__(self, **kwargs):
+            self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=create))
+
+    return types.SimpleNamespace(OpenAI=OpenAI)
+
+
+def test_generate_content_stream_wraps_document(tmp_path, monkeypatch):
+    requests = []
+    monkeypatch.setitem(sys.modules, "openai", fake_openai(list(chunked(RESPONSE)), requests))
+    dest = tmp_path / "entry.tex"
+    usage = {}
+
+    content, err = gen.generate_content_stream("Write it", dest, max_chars=5000, usage=usage)
+
+    assert (content, err) == (RESPONSE, None)
+    assert requests[0]["stream"] and requests[0]["messages"] == [{"role": "user", "content": "Write it"}]
+    assert (usage["prompt_tokens"], usage["completion_tokens"]) == (12, 34) and usage["seconds"] >= 0
+    text = dest.read_text(encoding="utf-8")
+    assert text.startswith("\n\\documentclass[12pt]{article}") and "% Title: entry\n" in text
+    assert text == gen.renderers.LatexRenderer().wrap(
+        title="entry", id="", domain="", topic="", body=convert_markdown_to_latex(RESPONSE)
+    )
@@ -0,0 +1,78 @@
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "scripts"))
+from texlog import parse_log, parse_log_file
+
+
+SAMPLE_LOG = r"""This is pdfTeX, Version 3.141592653-2.6-1.40.27
+LaTeX Font Info:    Trying to load font information for OMS+cmr on input line 2
+0.
+
+! Misplaced alignment tab character &.
+l.21 ...n\} Mathematical Logic \textbackslash\{\}&
+                                                   Foundations
+I can't figure out why you would want to use a tab mark
+
+! LaTeX Error: File `tikz-cd.sty' not found.
+
+Type X to quit or <RETURN> to proceed,
+l.7 \usepackage
+               {geometry}^^M
+Overfull \hbox (13.45134pt too wide) in paragraph at lines 55--59
+Underfull \vbox (badness 10000) has occurred while \output is active []
+
+LaTeX Warning: Reference `fig:1' on page 1 undefined on input line 42.
+
+Package rerunfilecheck Warning: File `foundations-preliminaries-mathematical-lo
+gic-proof-techniques-predicate-logic.out' has changed.
+(rerunfilecheck)                Rerun to get outlines right
+(rerunfilecheck)                or use package `bookmark'.
+
+ )
+"""
+
+
+def test_parse_log_extracts_records():
+    report = parse_log(SAMPLE_LOG.splitlines(keepends=True))
+
+    assert [(e.message, e.line) for e in report.errors] == [
+        ("Misplaced alignment tab character &.", 21),
+        ("LaTeX Error: File `tikz-cd.sty' not found.", 7),
+    ]
+    assert report.missing_packages == ["tikz-cd.sty"]
+
+    boxes = report.of_kind("box")
+    assert len(boxes) == 2
+    assert boxes[0].line == 55
+
+    warnings = report.of_kind("warning")
+    assert [(w.message, w.line) for w in warnings] == [
+        ("Reference `fig:1' on page 1 undefined on input line 42.", 42)
+    ]
+
+
+def test_parse_log_detects_rerun_across_wrapped_lines():
+    report = parse_log(SAMPLE_LOG.splitlines(keepends=True))
+    assert report.needs_rerun
+    (rerun,) = report.of_kind("rerun")
+    assert "predicate-logic.out' has changed" in rerun.message
+    assert "Rerun to get outlines right" in rerun.message
+
+
+def test_clean_log_needs_no_rerun():
+    report = parse_log(["This is pdfTeX\n", "Output written on x.pdf (1 page).\n"])
+    assert not report.needs_rerun
+    assert report.entries == []
+    assert report.summary() == ""
+
+
+def test_summary_lists_missing_packages_and_errors():
+    report = parse_log(SAMPLE_LOG.splitlines(keepends=True))
+    summary = report.summary(limit=1)
+    assert summary.startswith("missing tikz-cd.sty; l.21: Misplaced")
+    assert "(+1 more errors)" in summary
+
+
+def test_parse_log_file_missing(tmp_path):
+    assert parse_log_file(tmp_path / "nope.log").entries == []
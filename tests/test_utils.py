@@ -3,7 +3,7 @@ import sys
 import pytest
 
 sys.path.append(str(Path(__file__).resolve().parents[1] / "scripts"))
-from utils import slugify, dedupe_path, normalize_artifacts
+from utils import slugify, dedupe_path, entry_stem, normalize_artifacts, MAX_SLUG_LENGTH
 
 
 def test_slugify_rejects_too_long():
@@ -17,6 +17,18 @@ def test_slugify_rejects_empty():
         slugify("!!!")
 
 
+def test_entry_stem_shortens_long_names():
+    long_a = "Properties of Operations (commutativity, associativity, distributivity) " * 2
+    long_b = long_a + "and more"
+    stem = entry_stem("Maths", "Algebra", long_a)
+    part = stem[len("maths-algebra-"):]
+    assert len(part) == MAX_SLUG_LENGTH and part.startswith("properties-of-operations-")
+    assert entry_stem("Maths", "Algebra", long_a) == stem
+    assert entry_stem("Maths", "Algebra", long_b) != stem
+    with pytest.raises(ValueError):
+        entry_stem("Maths", "Algebra", "!!!")
+
+
 def test_dedupe_path_appends_suffix(tmp_path: Path):
     first = tmp_path / "entry.tex"
     first.touch()
@@ -0,0 +1,161 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+repo_root = Path(__file__).resolve().parents[1]
+sys.path.extend([str(repo_root), str(repo_root / "scripts")])
+import scripts.generate as gen
+import scripts.watch as watch
+from catalogue import save_snapshot
+
+
+def test_polling_watcher_reports_changes(tmp_path):
+    (tmp_path / "a.tex").write_text("a", encoding="utf-8")
+    (tmp_path / "b.tex").write_text("b", encoding="utf-8")
+    watcher = watch.PollingWatcher([tmp_path], interval=0.01)
+
+    assert watcher.changes(timeout=0.02) == set()
+    (tmp_path / "a.tex").write_text("changed", encoding="utf-8")
+    (tmp_path / "b.tex").unlink()
+    (tmp_path / "c.tex").write_text("c", encoding="utf-8")
+    (tmp_path / ".c.tex.part").write_text("tmp", encoding="utf-8")
+
+    assert watcher.changes(timeout=1) == {tmp_path / "a.tex", tmp_path / "b.tex", tmp_path / "c.tex"}
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+def test_inotify_watcher_reports_changes(tmp_path):
+    watcher = watch.InotifyWatcher([tmp_path])
+    try:
+        assert watcher.changes(timeout=0.01) == set()
+        (tmp_path / "a.tex").write_text("a", encoding="utf-8")
+        assert watcher.changes(timeout=1) == {tmp_path / "a.tex"}
+    finally:
+        watcher.close()
+
+
+def test_debounce_merges_bursts():
+    class Scripted:
+        def __init__(self, batches):
+            self.batches = list(batches)
+            self.timeouts = []
+
+        def changes(self, timeout):
+            self.timeouts.append(timeout)
+            return self.batches.pop(0)
+
+    watcher = Scripted([{Path("a")}, {Path("b")}, set(), {Path("c")}, set()])
+    batches = watch.debounced(watcher, quiet=0.3)
+
+    assert next(batches) == {Path("a"), Path("b")}
+    assert next(batches) == {Path("c")}
+    assert watcher.timeouts == [None, 0.3, 0.3, None, 0.3]
+
+
+@pytest.fixture
+def rebuilder(tmp_path, monkeypatch):
+    csv_path = tmp_path / "data" / "topics.csv"
+    csv_path.parent.mkdir()
+    csv_path.write_text("domain,topic,subtopic,prompt_type\n", encoding="utf-8")
+    config_path = tmp_path / "config.toml"
+    config_path.write_text("start_index = 0\nmax_entries = 1\n", encoding="utf-8")
+    prompts = tmp_path / "prompts"
+    prompts.mkdir()
+    monkeypatch.setattr(gen, "DATA_FILE", csv_path)
+    monkeypatch.setattr(gen, "CONFIG_FILE", config_path)
+    monkeypatch.setattr(gen, "OUTPUT_DIR", tmp_path / "out")
+    monkeypatch.setattr(
+        gen, "PROMPT_TEMPLATES", {"definition": prompts / "def.txt", "abstract": prompts / "abs.txt"}
+    )
+    (tmp_path / "out").mkdir()
+    return watch.Rebuilder(quiet=True)
+
+
+def test_classify_maps_changes_to_actions(rebuilder, tmp_path):
+    plan = rebuilder.classify([
+        tmp_path / "prompts" / "abs.txt",
+        tmp_path / "out" / "x.tex",
+        tmp_path / "out" / "x.pdf",
+        rebuilder.renderer_source,
+    ])
+    assert plan == {
+        "prompt_types": {"abstract"},
+        "catalogue": False,
+        "rerender": True,
+        "recompile": {(tmp_path / "out" / "x.tex").resolve()},
+    }
+    assert rebuilder.classify([tmp_path / "data" / "topics.csv"])["catalogue"]
+    assert (tmp_path / "out").resolve() in rebuilder.directories()
+
+
+def test_rebuild_regenerates_and_recompiles(rebuilder, tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(gen, "main", lambda **kwargs: calls.append(("generate", kwargs)) or 0)
+    monkeypatch.setattr(
+        watch.compile_pdf, "compile_file", lambda path, **kwargs: calls.append(("compile", path.name)) or (True, "")
+    )
+    tex = tmp_path / "out" / "x.tex"
+    tex.write_text("x", encoding="utf-8")
+
+    summary = rebuilder.rebuild([tmp_path / "prompts" / "def.txt", tex, tmp_path / "out" / "gone.tex"])
+
+    assert calls == [("generate", {"incremental": True, "entries": set(), "quiet": True}), ("compile", "x.tex")]
+    assert summary == {"regenerated": 0, "rerendered": 0, "compiled": 1, "failed": 0}
+
+
+def test_regeneration_is_limited_to_affected_entries(rebuilder, tmp_path, monkeypatch):
+    csv_path = tmp_path / "data" / "topics.csv"
+    header = "domain,topic,subtopic,prompt_type\n"
+    csv_path.write_text(
+        header + "d,t,a,definition\nd,t,b,definition\nd,t,c,abstract\nd,t,%s,definition\n" % ("x" * 80),
+        encoding="utf-8",
+    )
+    rebuilder.rows = rebuilder.read_catalogue()
+    (tmp_path / "out" / "d-t-a.tex").write_text("a", encoding="utf-8")
+    calls = []
+    monkeypatch.setattr(gen, "main", lambda **kwargs: calls.append(kwargs["entries"]) or 0)
+
+    # Only the generated entry of the edited template's prompt type.
+    rebuilder.rebuild([tmp_path / "prompts" / "def.txt"])
+    # Only the rows edited or added in the CSV.
+    csv_path.write_text(header + "d,t,a,definition\nd,t,b,abstract\nd,t,c,abstract\nd,t,e,definition\n", encoding="utf-8")
+    rebuilder.rebuild([csv_path])
+
+    assert calls == [{"d-t-a"}, {"d-t-b", "d-t-e"}]
+
+
+def test_rerender_rewraps_outputs_with_metadata(rebuilder, tmp_path):
+    out = tmp_path / "out"
+    original = rebuilder.renderer.wrap(title="old", id="7", domain="d", topic="t", body="Body text")
+    (out / "d-t-s.tex").write_text(original, encoding="utf-8")
+    (out / "plain.tex").write_text(
+        "\\documentclass{article}\n\\begin{document}\nPlain\n\\end{document}", encoding="utf-8"
+    )
+    save_snapshot(
+        out / gen.SNAPSHOT_NAME,
+        {"d-t-s": {"id": "7", "domain": "d", "topic": "t", "subtopic": "s", "prompt_type": "definition", "hash": "h"}},
+    )
+
+    written = rebuilder.rerender()
+
+    assert written == [out / "d-t-s.tex", out / "plain.tex"]
+    text = (out / "d-t-s.tex").read_text(encoding="utf-8")
+    assert "% Title: s" in text and text.count("Body text") == 1
+    assert watch.extract_body(text) == "Body text"
+    assert watch.extract_body((out / "plain.tex").read_text(encoding="utf-8")) == "Plain"
+    assert rebuilder.rerender() == []
+
+
+def test_generated_outputs_already_match_rerender(rebuilder, tmp_path, monkeypatch):
+    (tmp_path / "data" / "topics.csv").write_text(
+        "id,domain,topic,subtopic,prompt_type\n7,d,t,s,definition\n", encoding="utf-8"
+    )
+    (tmp_path / "prompts" / "def.txt").write_text("Define $subtopic", encoding="utf-8")
+    monkeypatch.setattr(gen, "generate_content", lambda prompt, **kwargs: ("Body text", None))
+
+    assert gen.main(quiet=True, enable_log=False) == 0
+    text = (tmp_path / "out" / "d-t-s.tex").read_text(encoding="utf-8")
+    assert "% Title: s\n% ID: 7\n" in text and watch.extract_body(text) == "Body text"
+    assert watch.extract_meta(text) == {"subtopic": "s", "id": "7", "domain": "d", "topic": "t"}
+    assert rebuilder.rerender() == []
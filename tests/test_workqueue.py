@@ -0,0 +1,143 @@
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+repo_root = Path(__file__).resolve().parents[1]
+sys.path.extend([str(repo_root), str(repo_root / "scripts")])
+import scripts.generate as gen
+from workqueue import LeaseQueue, parse_shard
+
+KEYS = [f"entry-{i}" for i in range(40)]
+
+
+def _worker(queue_dir, record_dir, name):
+    queue = LeaseQueue(Path(queue_dir), ttl=30, owner=name)
+    done = []
+    for key in KEYS:
+        if queue.claim(key):
+            time.sleep(0.001)
+            done.append(key)
+            queue.complete(key)
+    (Path(record_dir) / name).write_text("\n".join(done), encoding="utf-8")
+
+
+def test_queue_rejected_with_streaming(tmp_path):
+    with pytest.raises(ValueError):
+        gen.main(stream=True, queue_dir=str(tmp_path / "queue"))
+
+
+def test_parse_shard():
+    assert parse_shard("1/4") == (1, 4)
+    for bad in ("4/4", "x/2", "1", "-1/2", "0/0"):
+        with pytest.raises(ValueError):
+            parse_shard(bad)
+
+
+def test_processes_never_claim_the_same_entry(tmp_path):
+    queue_dir = tmp_path / "queue"
+    records = tmp_path / "records"
+    records.mkdir()
+    procs = [
+        multiprocessing.Process(target=_worker, args=(str(queue_dir), str(records), f"w{i}"))
+        for i in range(4)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(30)
+        assert p.exitcode == 0
+
+    claimed = [
+        key
+        for f in records.iterdir()
+        for key in f.read_text(encoding="utf-8").split("\n")
+        if key
+    ]
+    assert sorted(claimed) == sorted(KEYS)
+
+
+def test_expired_lease_is_stolen(tmp_path):
+    a = LeaseQueue(tmp_path, ttl=0.05, owner="a")
+    b = LeaseQueue(tmp_path, ttl=30, owner="b")
+
+    assert a.claim("k")
+    assert not b.claim("k")
+    time.sleep(0.1)
+    assert b.claim("k")
+    assert not a.holds("k")
+    assert b.holds("k")
+
+    b.complete("k")
+    assert not a.claim("k")
+
+
+def test_unwritten_lease_expires(tmp_path):
+    # A worker that died between creating its lease and writing it.
+    (tmp_path / "k.lease.0").touch()
+    b = LeaseQueue(tmp_path, ttl=0.05, owner="b")
+
+    assert not b.claim("k")
+    time.sleep(0.1)
+    assert b.claim("k")
+    assert b.holds("k")
+
+
+def test_heartbeat_keeps_lease(tmp_path):
+    a = LeaseQueue(tmp_path, ttl=0.2, owner="a")
+    b = LeaseQueue(tmp_path, ttl=30, owner="b")
+    assert a.claim("k")
+    a.start_heartbeat(0.05)
+    try:
+        time.sleep(0.4)
+        assert not b.claim("k")
+    finally:
+        a.stop_heartbeat()
+
+
+def test_released_entry_can_be_retried(tmp_path):
+    a = LeaseQueue(tmp_path, owner="a")
+    b = LeaseQueue(tmp_path, owner="b")
+    assert a.claim("k")
+    a.release("k")
+    assert b.claim("k")
+
+
+ROWS = {
+    "domain": ["d"] * 10,
+    "topic": [f"topic{i}" for i in range(10)],
+    "subtopic": ["sub"] * 10,
+    "prompt_type": ["definition"] * 10,
+}
+
+
+def test_shards_partition_rows(pipeline, monkeypatch):
+    out_dir = pipeline(ROWS).out
+    prompts = []
+    monkeypatch.setattr(gen, "generate_content", lambda prompt, **kwargs: (prompts.append(prompt), ("c", None))[1])
+
+    for i in range(3):
+        gen.main(enable_log=False, quiet=True, shard=(i, 3))
+
+    assert len(prompts) == 10
+    assert len(set(prompts)) == 10
+    assert len(list(out_dir.glob("*.tex"))) == 10
+
+
+def test_queue_skips_entries_done_elsewhere(pipeline, tmp_path, monkeypatch):
+    pipeline(ROWS)
+    queue_dir = tmp_path / "queue"
+    other = LeaseQueue(queue_dir, owner="other")
+    other.complete("d-topic0-sub")
+    other.claim("d-topic1-sub")
+    prompts = []
+    monkeypatch.setattr(gen, "generate_content", lambda prompt, **kwargs: (prompts.append(prompt), ("c", None))[1])
+
+    gen.main(enable_log=False, quiet=True, shard=(0, 2), queue_dir=str(queue_dir))
+
+    assert "Topic: topic0" not in prompts
+    assert "Topic: topic1" not in prompts
+    assert len(prompts) == 8
+    assert (queue_dir / "d-topic2-sub.done").exists()